@@ -0,0 +1,44 @@
+import sys
+from app.database import SessionLocal, upgrade_schema
+from app.models.user import User
+from app.models.transaction import Transaction
+
+BATCH_SIZE = 1000
+
+
+def assign_transaction_owner(username: str, batch_size: int = BATCH_SIZE):
+    """Give every transaction without an owner to `username`, in batches.
+
+    Transactions imported before user ownership existed have no user_id and are
+    invisible to the per-user endpoints until this has been run.
+    """
+    upgrade_schema()
+    db = SessionLocal()
+    assigned = 0
+    try:
+        user = db.query(User).filter(User.username == username).first()
+        if not user:
+            raise SystemExit(f"User {username} not found")
+
+        while True:
+            ids = [
+                transaction_id for (transaction_id,) in db.query(Transaction.id).filter(
+                    Transaction.user_id.is_(None)
+                ).order_by(Transaction.id).limit(batch_size)
+            ]
+            if not ids:
+                break
+            db.query(Transaction).filter(Transaction.id.in_(ids)).update(
+                {Transaction.user_id: user.id}, synchronize_session=False
+            )
+            db.commit()
+            assigned += len(ids)
+            print(f"Assigned {assigned} transactions to {username}")
+    finally:
+        db.close()
+    return assigned
+
+
+if __name__ == "__main__":
+    assign_transaction_owner(sys.argv[1] if len(sys.argv) > 1 else "user_good")
+    print("Transaction owners have been assigned.")
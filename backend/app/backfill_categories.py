@@ -0,0 +1,54 @@
+from app.database import SessionLocal, upgrade_schema
+from app.models import user  # register the users table before upgrade_schema()
+from app.models.transaction import Transaction
+from app.models.category import TransactionCategory
+from app.categories import parse_categories
+
+BATCH_SIZE = 1000
+
+
+def backfill_categories(batch_size: int = BATCH_SIZE):
+    """Populate transaction_categories from the JSON `category` column in id-ordered batches.
+
+    Transactions that already have category rows are skipped, so the script can be
+    re-run safely after an interruption.
+    """
+    upgrade_schema()
+    db = SessionLocal()
+    last_id = 0
+    inserted = 0
+    try:
+        while True:
+            batch = db.query(Transaction.id, Transaction.category).filter(
+                Transaction.id > last_id
+            ).order_by(Transaction.id).limit(batch_size).all()
+            if not batch:
+                break
+
+            ids = [row.id for row in batch]
+            done = {
+                transaction_id for (transaction_id,) in db.query(TransactionCategory.transaction_id).filter(
+                    TransactionCategory.transaction_id.in_(ids)
+                ).distinct()
+            }
+
+            rows = [
+                {"transaction_id": row.id, "category": name, "depth": depth}
+                for row in batch if row.id not in done
+                for depth, name in enumerate(parse_categories(row.category))
+            ]
+            if rows:
+                db.execute(TransactionCategory.__table__.insert(), rows)
+            db.commit()
+
+            inserted += len(rows)
+            last_id = ids[-1]
+            print(f"Backfilled up to transaction {last_id} ({inserted} category rows)")
+    finally:
+        db.close()
+    return inserted
+
+
+if __name__ == "__main__":
+    backfill_categories()
+    print("Transaction categories have been backfilled.")
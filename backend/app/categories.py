@@ -0,0 +1,66 @@
+import json
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.models.transaction import Transaction
+from app.models.category import TransactionCategory
+
+# Plaid categories the budgeting endpoints track
+FOOD = "Food and Drink"
+ENTERTAINMENT = "Entertainment"
+TRAVEL = "Travel"
+
+
+def parse_categories(raw):
+    """Turn a stored category value (JSON string or list) into a clean list of names."""
+    if raw is None:
+        return []
+    if isinstance(raw, list):
+        categories = raw
+    elif isinstance(raw, str):
+        try:
+            categories = json.loads(raw)
+        except json.JSONDecodeError:
+            # Fallback: remove brackets and quotes, then split by comma
+            categories = raw.strip('[]').replace('"', '').split(',')
+    else:
+        return []
+
+    if not isinstance(categories, list):
+        return []
+
+    cleaned = []
+    for cat in categories:
+        if isinstance(cat, str) and cat.strip() and cat.strip() not in cleaned:
+            cleaned.append(cat.strip())
+    return cleaned
+
+
+def category_rows(categories):
+    """Build association rows for a transaction, keeping the Plaid hierarchy order."""
+    return [TransactionCategory(category=name, depth=depth) for depth, name in enumerate(categories)]
+
+
+def top_categories(db: Session, user_id: int, limit: int = 2):
+    """Most frequent categories across a user's transactions as (category, count) pairs."""
+    count = func.count(TransactionCategory.transaction_id)
+    return db.query(TransactionCategory.category, count).join(
+        Transaction, Transaction.id == TransactionCategory.transaction_id
+    ).filter(
+        Transaction.user_id == user_id
+    ).group_by(
+        TransactionCategory.category
+    ).order_by(count.desc()).limit(limit).all()
+
+
+def primary_categories(db: Session, categories):
+    """The names in `categories` that some transaction has as its primary (depth 0) category.
+
+    Plaid nests subcategories under a primary one, so only primaries can be summed
+    without counting spend twice.
+    """
+    if not categories:
+        return set()
+    return set(db.scalars(select(TransactionCategory.category).where(
+        TransactionCategory.category.in_(categories),
+        TransactionCategory.depth == 0,
+    ).distinct()))
@@ -1,14 +1,105 @@
-from sqlalchemy import create_engine
+import os
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-# Database URL (SQLite for now)
-DATABASE_URL = "sqlite:///./plaid_app.db"
+load_dotenv()
+
+# Database URL, SQLite unless DATABASE_URL points at a server database
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./plaid_app.db")
+
+# Async driver used for the same database by the async read path
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg", "mysql": "aiomysql"}
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+
+# SQLite: WAL lets readers run alongside the single writer, and with synchronous=NORMAL
+# a commit no longer fsyncs the database file (only checkpoints do). Writers that find
+# the database locked wait up to the busy timeout instead of failing straight away.
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+# Server databases (Postgres, MySQL): connection pool sizing
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+
+def sqlite_pragmas(journal_mode=SQLITE_JOURNAL_MODE, synchronous=SQLITE_SYNCHRONOUS,
+                   cache_size_kb=SQLITE_CACHE_SIZE_KB, busy_timeout_ms=SQLITE_BUSY_TIMEOUT_MS):
+    return [
+        f"PRAGMA journal_mode={journal_mode}",
+        f"PRAGMA synchronous={synchronous}",
+        f"PRAGMA cache_size=-{cache_size_kb}",  # negative = size in KiB, per connection
+        f"PRAGMA busy_timeout={busy_timeout_ms}",
+        "PRAGMA foreign_keys=ON",
+    ]
+
+
+def server_pool_options():
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,  # drop connections the server closed while idle
+    }
+
+
+def apply_pragmas(engine, pragmas):
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+def create_app_engine(url: str = DATABASE_URL, **sqlite_options):
+    """Engine for `url`: per-connection pragmas on SQLite, a sized pool elsewhere."""
+    if make_url(url).get_backend_name() != "sqlite":
+        return create_engine(url, **server_pool_options())
+
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+    )
+    apply_pragmas(engine, sqlite_pragmas(**sqlite_options))
+    return engine
+
+
+def async_url(url: str):
+    """`url` with its driver swapped for the asyncio one, e.g. sqlite:// -> sqlite+aiosqlite://"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+def create_async_app_engine(url: str = None, **sqlite_options):
+    """Async engine for the same database, configured like create_app_engine."""
+    url = url or ASYNC_DATABASE_URL or async_url(DATABASE_URL)
+    if make_url(url).get_backend_name() != "sqlite":
+        return create_async_engine(url, **server_pool_options())
+
+    async_engine = create_async_engine(url, connect_args={"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000})
+    # Pragmas run on the driver's sync-facing adapter connection
+    apply_pragmas(async_engine.sync_engine, sqlite_pragmas(**sqlite_options))
+    return async_engine
+
 
 # Create a database engine
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+engine = create_app_engine()
+
+# Async engine for endpoints that only read; connections are opened on first use
+async_engine = create_async_app_engine()
 
 # Session maker
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 # Base class for models
 Base = declarative_base()
@@ -20,3 +111,27 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Same as get_db for `async def` endpoints
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Bring an existing database up to date with the models. create_all only
+# creates missing tables, so new columns and indexes on existing tables are
+# added here (new columns must be nullable).
+def upgrade_schema():
+    Base.metadata.create_all(bind=engine)
+
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
@@ -0,0 +1,276 @@
+"""Local stand-in for the Plaid sandbox endpoints this app calls.
+
+Run:  uvicorn app.fake_plaid:app --port 8001
+and start the backend with PLAID_BASE_URL=http://127.0.0.1:8001. Credentials are not
+checked. Every exchanged item starts with FAKE_PLAID_HISTORY transactions; POST
+/fake/advance to generate new activity for the next /transactions/sync.
+
+FAKE_PLAID_LATENCY_MS adds a delay to every response and FAKE_PLAID_FAILURE_RATE makes
+that fraction of calls fail with a retryable 429 or 500, to exercise app.plaid_client.
+
+Items created with options.webhook get ES256-signed TRANSACTIONS webhooks, like Plaid
+sends them: SYNC_UPDATES_AVAILABLE after every /fake/advance, or any code through
+/sandbox/item/fire_webhook. The signing key is served by /webhook_verification_key/get.
+"""
+import os
+import json
+import time
+import uuid
+import random
+import asyncio
+import hashlib
+import threading
+from datetime import date, timedelta
+from typing import Optional
+import httpx
+from fastapi import BackgroundTasks, FastAPI, Request
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+HISTORY = int(os.getenv("FAKE_PLAID_HISTORY", "500"))
+HISTORY_DAYS = 90
+LATENCY_MS = float(os.getenv("FAKE_PLAID_LATENCY_MS", "0"))
+FAILURE_RATE = float(os.getenv("FAKE_PLAID_FAILURE_RATE", "0"))
+
+MERCHANTS = [
+    ("McDonald's", ["Food and Drink", "Restaurants", "Fast Food"], "in store"),
+    ("Starbucks", ["Food and Drink", "Restaurants", "Coffee Shop"], "in store"),
+    ("Uber", ["Travel", "Taxi"], "online"),
+    ("United Airlines", ["Travel", "Airlines and Aviation Services"], "online"),
+    ("AMC Theatres", ["Entertainment"], "in store"),
+    ("Netflix", ["Service", "Subscription"], "online"),
+    ("Target", ["Shops"], "in store"),
+]
+
+app = FastAPI(title="Fake Plaid")
+
+
+@app.middleware("http")
+async def network_conditions(request: Request, call_next):
+    if LATENCY_MS:
+        await asyncio.sleep(LATENCY_MS / 1000)
+    if not request.url.path.startswith("/fake/") and random.random() < FAILURE_RATE:
+        if random.random() < 0.5:
+            return JSONResponse(status_code=429, content={
+                "error_type": "RATE_LIMIT_EXCEEDED", "error_code": "RATE_LIMIT_EXCEEDED", "error_message": "slow down",
+            })
+        return JSONResponse(status_code=500, content={
+            "error_type": "API_ERROR", "error_code": "INTERNAL_SERVER_ERROR", "error_message": "try again",
+        })
+    return await call_next(request)
+
+
+class FakeItem:
+    """One linked item: its accounts and an append-only log of transaction changes.
+
+    A /transactions/sync cursor is simply a position in the log.
+    """
+
+    def __init__(self, seed: int, webhook: str = None):
+        self.item_id = f"item-fake-{uuid.uuid4()}"
+        self.webhook = webhook
+        self.accounts = [f"acc-fake-{uuid.uuid4().hex[:12]}" for _ in range(2)]
+        self.random = random.Random(seed)
+        self.log = []  # ("added" | "modified" | "removed", transaction)
+        self.live = {}  # transaction_id -> current transaction
+
+    def new_transaction(self, day: date):
+        merchant, category, channel = self.random.choice(MERCHANTS)
+        return {
+            "transaction_id": uuid.uuid4().hex,
+            "account_id": self.random.choice(self.accounts),
+            "name": merchant,
+            "merchant_name": merchant,
+            "amount": round(self.random.uniform(2, 150), 2),
+            "date": day.isoformat(),
+            "category": category,
+            "payment_channel": channel,
+            "iso_currency_code": "USD",
+            "pending": False,
+        }
+
+    def add(self, tx):
+        self.live[tx["transaction_id"]] = tx
+        self.log.append(("added", tx))
+
+    def advance(self, added: int, modified: int, removed: int):
+        for _ in range(added):
+            self.add(self.new_transaction(date.today()))
+        for transaction_id in self.random.sample(list(self.live), min(modified, len(self.live))):
+            tx = dict(self.live[transaction_id], amount=round(self.random.uniform(2, 150), 2))
+            self.live[transaction_id] = tx
+            self.log.append(("modified", tx))
+        for transaction_id in self.random.sample(list(self.live), min(removed, len(self.live))):
+            tx = self.live.pop(transaction_id)
+            self.log.append(("removed", {"transaction_id": transaction_id, "account_id": tx["account_id"]}))
+
+
+items = {}  # access_token -> FakeItem
+public_tokens = {}  # public_token -> webhook URL of the item it will create
+lock = threading.Lock()
+
+_signing_key = None  # (key_id, private key), created on first use
+
+
+def signing_key():
+    global _signing_key
+    if _signing_key is None:
+        from cryptography.hazmat.primitives.asymmetric import ec
+        _signing_key = (uuid.uuid4().hex, ec.generate_private_key(ec.SECP256R1()))
+    return _signing_key
+
+
+async def send_webhook(url: str, event: dict):
+    """POST the event with a Plaid-Verification JWT over the exact bytes sent."""
+    import jwt
+
+    key_id, private_key = signing_key()
+    body = json.dumps(event).encode()
+    token = jwt.encode(
+        {"iat": int(time.time()), "request_body_sha256": hashlib.sha256(body).hexdigest()},
+        private_key, algorithm="ES256", headers={"kid": key_id},
+    )
+    headers = {"Content-Type": "application/json", "Plaid-Verification": token}
+    try:
+        async with httpx.AsyncClient(timeout=10) as client:
+            await client.post(url, content=body, headers=headers)
+    except httpx.HTTPError as e:
+        print(f"Webhook delivery to {url} failed: {str(e)}")
+
+
+def transactions_webhook(item: FakeItem, code: str):
+    return {
+        "webhook_type": "TRANSACTIONS", "webhook_code": code, "item_id": item.item_id,
+        "initial_update_complete": True, "historical_update_complete": True, "environment": "sandbox",
+    }
+
+
+class PlaidRequest(BaseModel):
+    client_id: Optional[str] = None
+    secret: Optional[str] = None
+
+
+class PublicTokenRequest(PlaidRequest):
+    public_token: str
+
+
+class SandboxPublicTokenRequest(PlaidRequest):
+    options: dict = {}
+
+
+class KeyRequest(PlaidRequest):
+    key_id: str
+
+
+class ItemRequest(PlaidRequest):
+    access_token: str
+
+
+class SyncRequest(ItemRequest):
+    cursor: Optional[str] = None
+    count: int = 100
+
+
+class FireWebhookRequest(ItemRequest):
+    webhook_code: str = "SYNC_UPDATES_AVAILABLE"
+
+
+class AdvanceRequest(BaseModel):
+    access_token: str
+    added: int = 5
+    modified: int = 1
+    removed: int = 1
+
+
+def plaid_error(error_code: str, message: str):
+    return JSONResponse(status_code=400, content={
+        "error_type": "INVALID_INPUT", "error_code": error_code, "error_message": message,
+    })
+
+
+@app.post("/link/token/create")
+def create_link_token(data: PlaidRequest):
+    return {"link_token": f"link-fake-{uuid.uuid4()}"}
+
+
+@app.post("/sandbox/public_token/create")
+def create_public_token(data: SandboxPublicTokenRequest):
+    token = f"public-fake-{uuid.uuid4()}"
+    public_tokens[token] = data.options.get("webhook")
+    return {"public_token": token}
+
+
+@app.post("/item/public_token/exchange")
+def exchange_public_token(data: PublicTokenRequest):
+    if data.public_token not in public_tokens:
+        return plaid_error("INVALID_PUBLIC_TOKEN", "public token not recognised")
+    webhook = public_tokens.pop(data.public_token)
+
+    access_token = f"access-fake-{uuid.uuid4()}"
+    item = FakeItem(seed=len(items), webhook=webhook)
+    today = date.today()
+    for i in range(HISTORY):
+        item.add(item.new_transaction(today - timedelta(days=i * HISTORY_DAYS // max(HISTORY, 1))))
+    with lock:
+        items[access_token] = item
+    return {"access_token": access_token, "item_id": item.item_id}
+
+
+@app.post("/accounts/get")
+def get_accounts(data: ItemRequest):
+    item = items.get(data.access_token)
+    if item is None:
+        return plaid_error("INVALID_ACCESS_TOKEN", "access token not recognised")
+    return {"accounts": [{"account_id": account_id} for account_id in item.accounts], "item": {"item_id": item.item_id}}
+
+
+@app.post("/transactions/sync")
+def sync_transactions(data: SyncRequest):
+    item = items.get(data.access_token)
+    if item is None:
+        return plaid_error("INVALID_ACCESS_TOKEN", "access token not recognised")
+
+    with lock:
+        start = int(data.cursor or 0)
+        page = item.log[start:start + min(data.count, 500)]
+        end = start + len(page)
+        has_more = end < len(item.log)
+
+    changes = {"added": [], "modified": [], "removed": []}
+    for kind, tx in page:
+        changes[kind].append(tx)
+    return {**changes, "next_cursor": str(end), "has_more": has_more, "transactions_update_status": "HISTORICAL_UPDATE_COMPLETE"}
+
+
+@app.post("/webhook_verification_key/get")
+def get_verification_key(data: KeyRequest):
+    import jwt
+
+    key_id, private_key = signing_key()
+    if data.key_id != key_id:
+        return plaid_error("INVALID_WEBHOOK_VERIFICATION_KEY_ID", "key id not recognised")
+    key = jwt.algorithms.ECAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
+    return {"key": {**key, "alg": "ES256", "kid": key_id, "use": "sig", "created_at": 0, "expired_at": None}}
+
+
+@app.post("/sandbox/item/fire_webhook")
+def fire_webhook(data: FireWebhookRequest, background: BackgroundTasks):
+    item = items.get(data.access_token)
+    if item is None:
+        return plaid_error("INVALID_ACCESS_TOKEN", "access token not recognised")
+    if not item.webhook:
+        return plaid_error("SANDBOX_WEBHOOK_INVALID", "item has no webhook URL")
+    background.add_task(send_webhook, item.webhook, transactions_webhook(item, data.webhook_code))
+    return {"webhook_fired": True}
+
+
+@app.post("/fake/advance")
+def advance(data: AdvanceRequest, background: BackgroundTasks):
+    item = items.get(data.access_token)
+    if item is None:
+        return plaid_error("INVALID_ACCESS_TOKEN", "access token not recognised")
+    with lock:
+        item.advance(data.added, data.modified, data.removed)
+    if item.webhook:
+        background.add_task(send_webhook, item.webhook, transactions_webhook(item, "SYNC_UPDATES_AVAILABLE"))
+    return {"log_size": len(item.log)}
@@ -0,0 +1,115 @@
+from datetime import datetime
+import numpy as np
+from dateutil.relativedelta import relativedelta
+from sqlalchemy.orm import Session
+from app.models.user import User
+from app.models.regression import CategoryRegressionState
+from app.categories import FOOD, ENTERTAINMENT, TRAVEL, primary_categories
+from app.rollup import ALL_CATEGORIES
+from app.metrics import write_metrics
+from app.response_cache import data_versions
+
+# Categories every forecast covers, whether or not the user has spent in them this month
+TRACKED_CATEGORIES = (FOOD, ENTERTAINMENT, TRAVEL)
+
+PREDICTION_DAY = 28  # Month-end day the regression is evaluated at
+MONTHLY_BUDGET = 1000  # Spend limit before the saving goal is taken out
+
+
+def month_bounds(today=None):
+    """First day of the current month and of the next one."""
+    first_day = (today or datetime.now().date()).replace(day=1)
+    return first_day, first_day + relativedelta(months=1)
+
+
+def load_states(db: Session, user_id: int, month, categories=None):
+    """Regression state rows of the month, for the given categories or all of them, in one query."""
+    query = db.query(CategoryRegressionState).filter(
+        CategoryRegressionState.user_id == user_id,
+        CategoryRegressionState.month == month,
+    )
+    if categories is not None:
+        query = query.filter(CategoryRegressionState.category.in_(categories))
+    return query.all()
+
+
+def predict_month_end(n, sum_x, sum_y, sum_xy, sum_xx, day: int = PREDICTION_DAY):
+    """Closed-form least-squares line through (day, cumulative spend), evaluated at `day`.
+
+    Takes arrays of running sums, one entry per category. Categories with fewer than
+    2 points predict 0.
+    """
+    denom = n * sum_xx - sum_x * sum_x
+    fitted = (n >= 2) & (denom != 0)
+    safe_denom = np.where(fitted, denom, 1.0)
+    safe_n = np.where(fitted, n, 1.0)
+    slope = np.where(fitted, (n * sum_xy - sum_x * sum_y) / safe_denom, 0.0)
+    intercept = np.where(fitted, (sum_y - slope * sum_x) / safe_n, 0.0)
+    return np.where(fitted, slope * day + intercept, 0.0)
+
+
+def compute_forecast(db: Session, user: User, today=None):
+    """Predicted, actual and goal spend for every category the user spent in this month.
+
+    Always covers TRACKED_CATEGORIES, plus ALL_CATEGORIES for the totals. Reads one
+    regression state row per category; the cost does not depend on how many
+    transactions the user has this month.
+    """
+    first_day, _ = month_bounds(today)
+    states = {state.category: state for state in load_states(db, user.id, first_day)}
+    categories = list(TRACKED_CATEGORIES) + sorted(set(states) - set(TRACKED_CATEGORIES) - {ALL_CATEGORIES})
+
+    sums = np.zeros((6, len(categories)))
+    for i, category in enumerate(categories):
+        state = states.get(category)
+        if state is not None:
+            sums[:, i] = (state.n, state.sum_x, state.sum_y, state.sum_xy, state.sum_xx, state.last_total)
+    points, actual = sums[0], sums[5]
+    predicted = predict_month_end(*sums[:5])
+
+    # Subcategory spend is also counted in its primary category, so totals use primaries only
+    primaries = primary_categories(db, categories)
+    primary = np.array([category in primaries for category in categories], dtype=bool)
+    predicted_total = float(predicted[primary].sum())
+
+    # Split what's left after saving into per-category goals, proportional to predictions
+    spend_limit = MONTHLY_BUDGET - (user.saving_goal or 0)
+    ratio = spend_limit / predicted_total if predicted_total else 0
+
+    forecast = {
+        category: {
+            "predicted": float(predicted[i]),
+            "actual": float(actual[i]),
+            "goal": float(predicted[i]) * ratio,
+            "points": int(points[i]),
+            "primary": bool(primary[i]),
+        }
+        for i, category in enumerate(categories)
+    }
+    total = states.get(ALL_CATEGORIES)
+    forecast[ALL_CATEGORIES] = {
+        "predicted": predicted_total,
+        "actual": total.last_total if total else 0.0,
+        "goal": predicted_total * ratio,
+        "points": total.n if total else 0,
+        "primary": False,
+    }
+    return forecast
+
+
+def refresh_forecast(db: Session, user: User, today=None):
+    """Recompute the forecast and store the month's metrics rows that changed, in one commit."""
+    forecast = compute_forecast(db, user, today)
+    first_day, _ = month_bounds(today)
+    changed = write_metrics(db, user.id, first_day, {
+        category: {"spending": values["actual"], "spending_goal": values["goal"], "predicted": values["predicted"]}
+        for category, values in forecast.items()
+    })
+    if changed:  # an unchanged forecast keeps the user's cached responses valid
+        data_versions.bump(db, user.id)
+    db.commit()
+    return forecast
+
+
+def total_predicted(forecast):
+    return forecast[ALL_CATEGORIES]["predicted"]
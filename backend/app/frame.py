@@ -0,0 +1,132 @@
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models.transaction import Transaction
+from app.categories import parse_categories
+
+# One record per transaction. category/subcategory (Plaid levels 0 and 1) and merchant are
+# codes into the frame's dictionaries; -1 means none.
+FRAME_DTYPE = np.dtype([
+    ("id", "i8"),
+    ("date", "M8[D]"),
+    ("amount", "f8"),
+    ("category", "i4"),
+    ("subcategory", "i4"),
+    ("merchant", "i4"),
+])
+
+
+class TransactionFrame:
+    """A user's transactions as one structured NumPy array, ordered by (date, id).
+
+    Category and merchant names are dictionary-encoded: `categories[code]` and
+    `merchants[code]` give them back. Aggregations run vectorized over the columns.
+    """
+
+    __slots__ = ("rows", "categories", "merchants")
+
+    def __init__(self, rows: np.ndarray, categories, merchants):
+        self.rows = rows
+        self.categories = list(categories)
+        self.merchants = list(merchants)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def category_code(self, category: str):
+        try:
+            return self.categories.index(category)
+        except ValueError:
+            return -1
+
+    def between(self, start=None, end=None):
+        """Rows with start <= date <= end (either bound optional), as a view."""
+        dates = self.rows["date"]
+        lo = np.searchsorted(dates, np.datetime64(start, "D")) if start is not None else 0
+        hi = np.searchsorted(dates, np.datetime64(end, "D"), side="right") if end is not None else len(dates)
+        return TransactionFrame(self.rows[lo:hi], self.categories, self.merchants)
+
+    def in_category(self, category: str):
+        """Boolean mask of rows filed under `category` at either level."""
+        code = self.category_code(category)
+        if code < 0:
+            return np.zeros(len(self.rows), dtype=bool)
+        return (self.rows["category"] == code) | (self.rows["subcategory"] == code)
+
+    def totals_by(self, unit: str = "D", category: str = None):
+        """(periods, totals) summing amounts per day ("D"), week ("W") or month ("M"), in order."""
+        rows = self.rows if category is None else self.rows[self.in_category(category)]
+        periods, index = np.unique(rows["date"].astype(f"M8[{unit}]"), return_inverse=True)
+        return periods, np.bincount(index, weights=rows["amount"], minlength=len(periods))
+
+    def totals_by_category(self, unit: str = "M"):
+        """(periods, totals, {category: totals}) per period, overall and per primary category.
+
+        Every category's totals line up with `periods`, zero where it had no spending.
+        """
+        periods, index = np.unique(self.rows["date"].astype(f"M8[{unit}]"), return_inverse=True)
+        amounts = self.rows["amount"]
+        codes = self.rows["category"]
+        by_category = {}
+        for code in np.unique(codes[codes >= 0]):
+            mask = codes == code
+            by_category[self.categories[code]] = np.bincount(index[mask], weights=amounts[mask], minlength=len(periods))
+        return periods, np.bincount(index, weights=amounts, minlength=len(periods)), by_category
+
+    def to_pandas(self):
+        """DataFrame with categorical category/subcategory/merchant columns (needs pandas)."""
+        import pandas as pd
+
+        return pd.DataFrame({
+            "id": self.rows["id"],
+            "date": self.rows["date"],
+            "amount": self.rows["amount"],
+            "category": pd.Categorical.from_codes(self.rows["category"], self.categories),
+            "subcategory": pd.Categorical.from_codes(self.rows["subcategory"], self.categories),
+            "merchant": pd.Categorical.from_codes(self.rows["merchant"], self.merchants),
+        })
+
+
+def frame_query(user_id: int, start=None, end=None, transaction_ids=None):
+    """SELECT of just the columns a frame holds, for one user, ordered by (date, id)."""
+    query = select(
+        Transaction.id, Transaction.date, Transaction.amount, Transaction.category, Transaction.merchant_name
+    ).where(Transaction.user_id == user_id)
+    if start is not None:
+        query = query.where(Transaction.date >= start)
+    if end is not None:
+        query = query.where(Transaction.date <= end)
+    if transaction_ids is not None:
+        query = query.where(Transaction.transaction_id.in_(transaction_ids))
+    return query.order_by(Transaction.date, Transaction.id)
+
+
+def build_frame(rows):
+    """TransactionFrame from (id, date, amount, category, merchant_name) rows; category as stored (JSON).
+
+    Each distinct category string is parsed once, however many rows share it.
+    """
+    categories, merchants, parsed = {}, {}, {}
+    records = []
+    for transaction_id, day, amount, category, merchant in rows:
+        codes = parsed.get(category)
+        if codes is None:
+            names = parse_categories(category)
+            codes = parsed[category] = (
+                categories.setdefault(names[0], len(categories)) if names else -1,
+                categories.setdefault(names[1], len(categories)) if len(names) > 1 else -1,
+            )
+        records.append((
+            transaction_id, day, amount or 0.0, *codes,
+            merchants.setdefault(merchant, len(merchants)) if merchant else -1,
+        ))
+    return TransactionFrame(np.array(records, dtype=FRAME_DTYPE), categories, merchants)
+
+
+def load_frame(db: Session, user_id: int, start=None, end=None, transaction_ids=None):
+    return build_frame(db.execute(frame_query(user_id, start, end, transaction_ids)))
+
+
+async def load_frame_async(db: AsyncSession, user_id: int, start=None, end=None, transaction_ids=None):
+    return build_frame(await db.execute(frame_query(user_id, start, end, transaction_ids)))
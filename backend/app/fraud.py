@@ -0,0 +1,175 @@
+import os
+import pickle
+import threading
+import time
+from pathlib import Path
+import numpy as np
+from app.categories import parse_categories
+
+# Column order the XGBoost model was trained with
+FEATURES = ['merchant', 'category', 'amt', 'trans_num', 'hour', 'day_of_week', 'day_of_month', 'month']
+CATEGORICAL = ['merchant', 'category', 'trans_num']
+
+# Plaid gives no time of day or card transaction number, so these stay fixed
+PLACEHOLDER_TRANS_NUM = 'ce303c21bbecc75334b69a642c9716c3'
+PLACEHOLDER_HOUR = 3
+
+# Code for labels the encoder never saw (most real Plaid merchants). XGBoost treats
+# NaN as a missing value and routes it down each split's default branch.
+UNKNOWN = np.nan
+
+# Model files live in backend/, whatever the working directory
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+MODEL_PATH = Path(os.getenv("FRAUD_MODEL_PATH", BACKEND_DIR / "xgbmodel.json"))
+ENCODER_PATH = Path(os.getenv("FRAUD_ENCODER_PATH", BACKEND_DIR / "encoder.pkl"))
+
+
+def compile_lookups(label_encoders):
+    """Turn fitted LabelEncoders into plain label -> code dicts.
+
+    LabelEncoder.transform binary-searches a sorted array through pandas/NumPy and raises
+    on unseen labels; a dict lookup is O(1) and lets unseen labels fall into UNKNOWN.
+    """
+    return {
+        col: {label: float(code) for code, label in enumerate(label_encoders[col].classes_.tolist())}
+        for col in CATEGORICAL
+    }
+
+
+class ModelUnavailable(Exception):
+    """The fraud model or its encoder is missing or cannot be loaded."""
+
+
+class ModelRegistry:
+    """Loads the fraud model and encoder on first use (or on warm()), once per process.
+
+    xgboost and sklearn (pulled in by unpickling the encoder) are imported here rather
+    than at module level, so endpoints that never score transactions don't pay for them.
+    Raises ModelUnavailable, and retries on the next use, if the files can't be loaded.
+    """
+
+    def __init__(self, model_path: Path = MODEL_PATH, encoder_path: Path = ENCODER_PATH):
+        self.model_path = model_path
+        self.encoder_path = encoder_path
+        self.load_seconds = None
+        self._model = None
+        self._encoder = None
+        self._lookups = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._model is not None
+
+    def missing_files(self):
+        return [str(path) for path in (self.model_path, self.encoder_path) if not Path(path).is_file()]
+
+    def _load(self):
+        missing = self.missing_files()
+        if missing:
+            raise ModelUnavailable(f"Fraud model files not found: {', '.join(missing)}")
+        start = time.perf_counter()
+        try:
+            import xgboost as xgb
+
+            model = xgb.XGBClassifier()
+            model.load_model(str(self.model_path))
+            with open(self.encoder_path, "rb") as file:
+                encoder = pickle.load(file)
+        except (ImportError, OSError, ValueError, pickle.UnpicklingError) as e:
+            raise ModelUnavailable(f"Fraud model could not be loaded: {e}")
+
+        self._encoder = encoder
+        self._lookups = compile_lookups(encoder)
+        self._model = model
+        self.load_seconds = time.perf_counter() - start
+
+    def warm(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._load()
+        return self
+
+    @property
+    def model(self):
+        return self.warm()._model
+
+    @property
+    def encoder(self):
+        return self.warm()._encoder
+
+    @property
+    def lookups(self):
+        return self.warm()._lookups
+
+    def status(self):
+        return {"loaded": self.loaded, "load_seconds": self.load_seconds, "missing_files": self.missing_files()}
+
+
+registry = ModelRegistry()
+
+
+def first_category(transaction):
+    if transaction.categories:
+        return transaction.categories[0].category
+    categories = parse_categories(transaction.category)
+    return categories[0] if categories else None
+
+
+def encode(col: str, values):
+    lookup = registry.lookups[col]
+    return np.fromiter((lookup.get(value, UNKNOWN) for value in values), dtype=float, count=len(values))
+
+
+def feature_matrix(transactions):
+    """Model-ready float matrix, one row per transaction, columns in FEATURES order."""
+    rows = len(transactions)
+    matrix = np.empty((rows, len(FEATURES)))
+    matrix[:, 0] = encode('merchant', [tx.merchant_name for tx in transactions])
+    matrix[:, 1] = encode('category', [first_category(tx) for tx in transactions])
+    matrix[:, 2] = [tx.amount or 0 for tx in transactions]
+    matrix[:, 3] = registry.lookups['trans_num'].get(PLACEHOLDER_TRANS_NUM, UNKNOWN)
+    matrix[:, 4] = PLACEHOLDER_HOUR
+    matrix[:, 5] = [tx.date.weekday() for tx in transactions]  # 0 = Monday
+    matrix[:, 6] = [tx.date.day for tx in transactions]
+    matrix[:, 7] = [tx.date.month for tx in transactions]
+    return matrix
+
+
+def encode_codes(col: str, names, codes):
+    """Model codes for dictionary-encoded values; each distinct name is looked up once, -1 maps to UNKNOWN."""
+    lookup = registry.lookups[col]
+    table = np.array([lookup.get(name, UNKNOWN) for name in names] + [UNKNOWN], dtype=float)
+    return table[codes]
+
+
+def frame_feature_matrix(frame):
+    """feature_matrix for a TransactionFrame, computed column-wise without per-row Python."""
+    rows = frame.rows
+    dates = rows["date"]
+    months = dates.astype("M8[M]")
+    matrix = np.empty((len(rows), len(FEATURES)))
+    matrix[:, 0] = encode_codes('merchant', frame.merchants, rows["merchant"])
+    matrix[:, 1] = encode_codes('category', frame.categories, rows["category"])
+    matrix[:, 2] = rows["amount"]
+    matrix[:, 3] = registry.lookups['trans_num'].get(PLACEHOLDER_TRANS_NUM, UNKNOWN)
+    matrix[:, 4] = PLACEHOLDER_HOUR
+    matrix[:, 5] = (dates.astype("i8") + 3) % 7  # 1970-01-01 was a Thursday; 0 = Monday
+    matrix[:, 6] = (dates - months).astype("i8") + 1
+    matrix[:, 7] = months.astype("i8") % 12 + 1
+    return matrix
+
+
+def score_frame(frame):
+    """Fraud predictions (0/1) for every row of a TransactionFrame in a single model call."""
+    if not len(frame):
+        return np.zeros(0, dtype=int)
+    return registry.model.predict(frame_feature_matrix(frame))
+
+
+def score_transactions(transactions):
+    """Fraud predictions (0/1) for all transactions in a single model call."""
+    if not transactions:
+        return np.zeros(0, dtype=int)
+    return registry.model.predict(feature_matrix(transactions))
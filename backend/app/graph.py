@@ -0,0 +1,52 @@
+import numpy as np
+from datetime import timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.rollup import daily_spend_async
+
+BUCKETS = ("day", "week", "month")
+MAX_POINTS = 1000  # upper bound on the ?points budget
+
+
+def bucket_starts(days: np.ndarray, bucket: str):
+    """First day of each day's bucket; weeks start on Monday."""
+    if bucket == "month":
+        return days.astype("M8[M]").astype("M8[D]")
+    if bucket == "week":
+        ordinal = days.astype("i8")
+        return (ordinal - (ordinal + 3) % 7).astype("M8[D]")  # 1970-01-01 was a Thursday
+    return days
+
+
+def downsample(count: int, points: int):
+    """Indices of at most `points` evenly spaced samples out of `count`, always keeping the last."""
+    if points is None or count <= points:
+        return np.arange(count)
+    return np.unique(np.linspace(0, count - 1, points).round().astype(int))
+
+
+def cumulative_series(daily_totals, bucket: str = "day", points: int = None):
+    """Running total keyed by bucket start date ("YYYY-MM-DD") from ordered (day, amount) rows.
+
+    Daily sums are grouped into buckets and prefix-summed with np.cumsum. With a `points`
+    budget, long series are thinned to that many evenly spaced buckets; each kept value is
+    still the exact running total at that bucket.
+    """
+    if not daily_totals:
+        return {}
+    days = np.array([day for day, _ in daily_totals], dtype="M8[D]")
+    amounts = np.array([amount for _, amount in daily_totals], dtype=float)
+    starts, index = np.unique(bucket_starts(days, bucket), return_inverse=True)
+    running = np.cumsum(np.bincount(index, weights=amounts, minlength=len(starts)))
+    keep = downsample(len(starts), points)
+    return dict(zip(starts[keep].astype(str).tolist(), running[keep].tolist()))
+
+
+async def graph_series(db: AsyncSession, user_id: int, category: str, start, end=None,
+                       bucket: str = "day", points: int = None):
+    """Cumulative spend of one rollup category from start to end (inclusive), in one query.
+
+    Reads the daily_category_spend rollup, so the query returns at most one row per day
+    whatever the number of transactions.
+    """
+    daily_totals = await daily_spend_async(db, user_id, category, start, end + timedelta(days=1) if end else None)
+    return cumulative_series(daily_totals, bucket, points)
@@ -0,0 +1,100 @@
+"""Idempotency-Key support for the write endpoints.
+
+A client that retries a write sends the same Idempotency-Key header every time. The
+first request to commit saves its response under (user, key) in the same transaction
+as the write, so the two are stored together or not at all. Later requests with the
+key get that response back and do no work.
+
+Keys expire after IDEMPOTENCY_TTL_SECONDS. Recently used ones are kept in an in-process
+LRU as well, so most replays cost no query; the table stays authoritative across processes.
+"""
+import os
+import json
+import hashlib
+from datetime import datetime, timedelta
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models.idempotency import IdempotencyKey
+from app.response_cache import ResponseCache
+
+# How long a key is remembered, i.e. how late a retry can still be recognised
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600)))
+# Stored responses kept in process; 0 disables the in-memory front
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+MAX_KEY_LENGTH = 255
+
+# (user_id, key) -> (fingerprint, status code, body, created_at)
+stored_responses = ResponseCache(IDEMPOTENCY_CACHE_SIZE, IDEMPOTENCY_TTL_SECONDS)
+
+
+class IdempotencyKeyReused(Exception):
+    """The key was already used for a request with a different endpoint or parameters."""
+
+
+def request_fingerprint(endpoint: str, params) -> str:
+    canonical = json.dumps([endpoint, jsonable_encoder(params)], sort_keys=True)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _expired(created_at: datetime):
+    return created_at < datetime.now() - timedelta(seconds=IDEMPOTENCY_TTL_SECONDS)
+
+
+def stored_response(db: Session, user_id: int, key: str, fingerprint: str):
+    """The response saved for `key`, ready to return, or None if there is none.
+
+    Raises IdempotencyKeyReused if the key was saved for a different request.
+    """
+    if key is None:
+        return None
+    stored = stored_responses.get((user_id, key))
+    if stored is None:
+        row = db.get(IdempotencyKey, (user_id, key))
+        if row is None:
+            return None
+        stored = (row.fingerprint, row.status_code, row.response.encode(), row.created_at)
+        if _expired(row.created_at):
+            # Free the key in this transaction, so the write can save it again
+            db.delete(row)
+            db.flush()
+            return None
+        stored_responses.put((user_id, key), stored)
+    saved_fingerprint, status_code, body, created_at = stored
+    if _expired(created_at):
+        return None
+    if saved_fingerprint != fingerprint:
+        raise IdempotencyKeyReused(key)
+    return Response(body, status_code=status_code, media_type="application/json",
+                    headers={"Idempotent-Replayed": "true"})
+
+
+def commit_with_key(db: Session, user_id: int, key: str, fingerprint: str, content, status_code: int = 200):
+    """Commit the session, saving `content` as the response for `key` in the same transaction.
+
+    Returns None once committed. If another request with the same key committed first,
+    this one is rolled back and the other's response is returned instead.
+    """
+    if key is None:
+        db.commit()
+        return None
+    now = datetime.now()
+    body = JSONResponse(jsonable_encoder(content)).body  # the bytes FastAPI would send
+    db.execute(delete(IdempotencyKey).where(
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.created_at < now - timedelta(seconds=IDEMPOTENCY_TTL_SECONDS),
+    ))
+    db.add(IdempotencyKey(user_id=user_id, key=key, fingerprint=fingerprint, status_code=status_code,
+                          response=body.decode(), created_at=now))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        replay = stored_response(db, user_id, key, fingerprint)
+        if replay is None:
+            raise
+        return replay
+    stored_responses.put((user_id, key), (fingerprint, status_code, body, now))
+    return None
@@ -0,0 +1,151 @@
+import os
+import json
+import time
+from datetime import datetime
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.orm import Session
+from app.models.transaction import Transaction
+from app.models.category import TransactionCategory
+from app.categories import parse_categories
+
+# Rows per INSERT ... ON CONFLICT statement
+CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "1000"))
+
+transaction_table = Transaction.__table__
+category_table = TransactionCategory.__table__
+
+# Columns a re-delivered transaction overwrites; id and the fraud flag are ours, and a
+# transaction never changes owner
+UPSERT_COLUMNS = [
+    column.name for column in transaction_table.columns
+    if column.name not in ("id", "transaction_id", "user_id", "is_fraud")
+]
+
+
+def transaction_fields(tx: dict, user_id: int):
+    """Transaction column values for a Plaid transaction object."""
+    return {
+        "user_id": user_id,
+        "transaction_id": tx["transaction_id"],
+        "account_id": tx["account_id"],
+        "name": tx["name"],
+        "merchant_name": tx.get("merchant_name"),
+        "amount": tx["amount"],
+        "date": datetime.strptime(tx["date"], "%Y-%m-%d").date(),
+        "category": json.dumps(tx.get("category") or []),
+        "payment_channel": tx.get("payment_channel"),
+        "currency": tx.get("iso_currency_code"),
+    }
+
+
+def _upsert_statement(dialect_name: str):
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        return None
+    statement = dialect_insert(transaction_table)
+    # A transaction_id already owned by another user is left alone rather than taken over
+    return statement.on_conflict_do_update(
+        index_elements=["transaction_id"],
+        set_={name: statement.excluded[name] for name in UPSERT_COLUMNS},
+        where=transaction_table.c.user_id == statement.excluded.user_id,
+    )
+
+
+def _write_chunk(db: Session, user_id: int, rows):
+    statement = _upsert_statement(db.get_bind().dialect.name)
+    if statement is not None:
+        db.execute(statement, rows)
+        return
+
+    # No ON CONFLICT: executemany UPDATE for known transaction_ids, INSERT for the rest.
+    # Known ids of another user are skipped, as with the upsert.
+    known = dict(db.execute(select(transaction_table.c.transaction_id, transaction_table.c.user_id).where(
+        transaction_table.c.transaction_id.in_([row["transaction_id"] for row in rows])
+    )).all())
+    updates = [dict(row, key=row["transaction_id"]) for row in rows if known.get(row["transaction_id"]) == user_id]
+    inserts = [row for row in rows if row["transaction_id"] not in known]
+    if updates:
+        db.execute(
+            update(transaction_table)
+            .where(transaction_table.c.transaction_id == bindparam("key"), transaction_table.c.user_id == user_id)
+            .values({name: bindparam(name) for name in UPSERT_COLUMNS}),
+            updates,
+        )
+    if inserts:
+        db.execute(insert(transaction_table), inserts)
+
+
+def upsert_transactions(db: Session, user_id: int, rows):
+    """Insert or update one chunk of a user's transaction rows (plain dicts) and replace their category rows.
+
+    Rows whose transaction_id belongs to another user are skipped. Does not commit.
+    Returns the number of distinct transactions written.
+    """
+    rows = list({row["transaction_id"]: row for row in rows}.values())  # last delivery wins
+    if not rows:
+        return 0
+    _write_chunk(db, user_id, rows)
+
+    ids = dict(db.execute(select(transaction_table.c.transaction_id, transaction_table.c.id).where(
+        transaction_table.c.transaction_id.in_([row["transaction_id"] for row in rows]),
+        transaction_table.c.user_id == user_id,
+    )).all())
+    db.execute(delete(category_table).where(category_table.c.transaction_id.in_(ids.values())))
+    category_rows = [
+        {"transaction_id": ids[row["transaction_id"]], "category": name, "depth": depth}
+        for row in rows if row["transaction_id"] in ids
+        for depth, name in enumerate(parse_categories(row["category"]))
+    ]
+    if category_rows:
+        db.execute(insert(category_table), category_rows)
+    return len(ids)
+
+
+def delete_transactions(db: Session, user_id: int, transaction_ids, chunk_size: int = CHUNK_SIZE):
+    """Delete a user's transactions by Plaid id; their category rows go with them (ON DELETE CASCADE).
+
+    Ids of other users' transactions are ignored. Does not commit.
+    """
+    deleted = 0
+    for start in range(0, len(transaction_ids), chunk_size):
+        chunk = transaction_ids[start:start + chunk_size]
+        deleted += db.execute(delete(transaction_table).where(
+            transaction_table.c.user_id == user_id, transaction_table.c.transaction_id.in_(chunk),
+        )).rowcount
+    return deleted
+
+
+def ingest_pages(db: Session, user_id: int, pages, chunk_size: int = CHUNK_SIZE):
+    """Write a stream of /transactions/sync pages for one user in chunks. Does not commit.
+
+    Only one page and at most `chunk_size` pending rows are held at a time, however long
+    the history. Pending upserts are written before any removal, so a transaction added
+    and then removed later in the stream ends up deleted.
+    """
+    stats = {"added": 0, "modified": 0, "removed": 0, "rows": 0}
+    pending = []
+    start = time.perf_counter()
+
+    def flush():
+        stats["rows"] += upsert_transactions(db, user_id, pending)
+        pending.clear()
+
+    for page in pages:
+        stats["added"] += len(page["added"])
+        stats["modified"] += len(page["modified"])
+        stats["removed"] += len(page["removed"])
+        for tx in page["added"] + page["modified"]:
+            pending.append(transaction_fields(tx, user_id))
+            if len(pending) >= chunk_size:
+                flush()
+        if page["removed"]:
+            flush()
+            stats["rows"] += delete_transactions(db, user_id, [tx["transaction_id"] for tx in page["removed"]], chunk_size)
+    flush()
+
+    stats["seconds"] = time.perf_counter() - start
+    stats["rows_per_second"] = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+    return stats
@@ -0,0 +1,186 @@
+"""Checkings and savings balances kept as an append-only ledger.
+
+The users table still holds each account's current balance, so reading it stays O(1).
+Every change is applied to that balance with a single conditional UPDATE and recorded
+in balance_ledger by the same commit. A row is never read, modified in Python and
+written back, so concurrent requests cannot lose each other's updates.
+
+balance_snapshots records an account's balance every SNAPSHOT_EVERY entries, at every
+"set" entry, and before its first entry. Any past balance is therefore the nearest
+snapshot plus at most SNAPSHOT_EVERY entries.
+"""
+import os
+import uuid
+from datetime import datetime
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models.user import User
+from app.models.ledger import BalanceEntry, BalanceSnapshot
+
+CHECKINGS = "checkings"
+SAVINGS = "savings"
+ACCOUNTS = (CHECKINGS, SAVINGS)
+
+INCOME = "income"
+TRANSFER = "transfer"
+SET = "set"
+
+# Ledger entries per account between two balance snapshots
+SNAPSHOT_EVERY = int(os.getenv("LEDGER_SNAPSHOT_EVERY", "100"))
+
+users_table = User.__table__
+
+
+class InsufficientFunds(Exception):
+    pass
+
+
+def _balance(account: str):
+    return func.coalesce(users_table.c[account], 0)  # no balance yet counts as 0
+
+
+def _update_balances(db: Session, user_id: int, values, require=None):
+    """Run one UPDATE of the user's balances and return them as {account: balance}.
+
+    `require` maps accounts to the minimum balance the UPDATE needs to match; returns
+    None when it did not.
+    """
+    statement = update(users_table).where(users_table.c.id == user_id).values(values)
+    for account, minimum in (require or {}).items():
+        statement = statement.where(_balance(account) >= minimum)
+    columns = [users_table.c[account] for account in ACCOUNTS]
+
+    if db.get_bind().dialect.update_returning:
+        row = db.execute(statement.returning(*columns)).first()
+    elif db.execute(statement).rowcount:
+        # The UPDATE holds the row (or the database) for the rest of the transaction
+        row = db.execute(select(*columns).where(users_table.c.id == user_id)).first()
+    else:
+        row = None
+    if row is None:
+        return None
+    # RETURNING hands back whole-number REALs as ints
+    return {account: None if value is None else float(value) for account, value in zip(ACCOUNTS, row)}
+
+
+def _record(db: Session, user_id: int, changes, kind: str, balances, transfer_id: str = None):
+    """Append one entry per changed account and take any snapshots that are due. Does not commit."""
+    now = datetime.now()
+    entries = [
+        BalanceEntry(user_id=user_id, account=account, amount=amount, kind=kind, transfer_id=transfer_id, created_at=now)
+        for account, amount in changes.items()
+    ]
+    db.add_all(entries)
+    db.flush()  # assigns the entry ids
+
+    for entry in entries:
+        balance = balances[entry.account] or 0.0
+        last = db.scalar(select(func.max(BalanceSnapshot.ledger_id)).where(
+            BalanceSnapshot.user_id == user_id, BalanceSnapshot.account == entry.account,
+        ))
+        if last is None:
+            # The account's balance from before it had a ledger
+            db.add(BalanceSnapshot(user_id=user_id, account=entry.account, ledger_id=0,
+                                   balance=balance - entry.amount, created_at=now))
+            last = 0
+        due = kind == SET or db.scalar(select(func.count()).where(
+            BalanceEntry.user_id == user_id, BalanceEntry.account == entry.account, BalanceEntry.id > last,
+        )) >= SNAPSHOT_EVERY
+        if due:
+            db.add(BalanceSnapshot(user_id=user_id, account=entry.account, ledger_id=entry.id,
+                                   balance=balance, created_at=now))
+
+
+def deposit(db: Session, user_id: int, account: str, amount: float, kind: str = INCOME):
+    """Add `amount` to an account. Does not commit. Returns the new {account: balance}."""
+    balances = _update_balances(db, user_id, {account: _balance(account) + amount})
+    _record(db, user_id, {account: amount}, kind, balances)
+    return balances
+
+
+def transfer(db: Session, user_id: int, source: str, target: str, amount: float):
+    """Move `amount` between two accounts of a user. Does not commit.
+
+    Raises InsufficientFunds, without changing anything, unless `source` holds at least
+    `amount` at the moment of the UPDATE. Returns the new {account: balance}.
+    """
+    balances = _update_balances(
+        db, user_id,
+        {source: _balance(source) - amount, target: _balance(target) + amount},
+        require={source: amount},
+    )
+    if balances is None:
+        raise InsufficientFunds(f"Insufficient funds in {source}")
+    _record(db, user_id, {source: -amount, target: amount}, TRANSFER, balances, transfer_id=str(uuid.uuid4()))
+    return balances
+
+
+def set_balance(db: Session, user_id: int, account: str, balance: float):
+    """Overwrite an account's balance. Does not commit. Returns the new {account: balance}.
+
+    The entry's amount is the change from the balance read just before. The snapshot
+    taken with it is exact even if another write slipped in between.
+    """
+    previous = db.scalar(select(_balance(account)).where(users_table.c.id == user_id))
+    balances = _update_balances(db, user_id, {account: balance})
+    _record(db, user_id, {account: balance - (previous or 0)}, SET, balances)
+    return balances
+
+
+def ledger_balance(db: Session, user_id: int, account: str):
+    """An account's balance rebuilt from its latest snapshot and the entries after it.
+
+    Matches the users table as long as every balance write goes through this module.
+    """
+    snapshot = db.execute(select(BalanceSnapshot.ledger_id, BalanceSnapshot.balance).where(
+        BalanceSnapshot.user_id == user_id, BalanceSnapshot.account == account,
+    ).order_by(BalanceSnapshot.ledger_id.desc()).limit(1)).first()
+    if snapshot is None:
+        return None
+    since = db.scalar(select(func.coalesce(func.sum(BalanceEntry.amount), 0)).where(
+        BalanceEntry.user_id == user_id, BalanceEntry.account == account, BalanceEntry.id > snapshot.ledger_id,
+    ))
+    return snapshot.balance + since
+
+
+async def balance_history(db: AsyncSession, user_id: int, account: str, before: int = None, limit: int = 50):
+    """Entries of one account, newest first, each with the balance right after it.
+
+    Keyset-paginated by entry id: pass the last entry's id as `before` for the next page.
+    """
+    query = select(BalanceEntry).where(BalanceEntry.user_id == user_id, BalanceEntry.account == account)
+    if before is not None:
+        query = query.where(BalanceEntry.id < before)
+    entries = list((await db.execute(query.order_by(BalanceEntry.id.desc()).limit(limit))).scalars())
+    if not entries:
+        return []
+    oldest, newest = entries[-1].id, entries[0].id
+
+    # Start from the last snapshot before the page and walk forward through it
+    anchor = (await db.execute(select(BalanceSnapshot.ledger_id, BalanceSnapshot.balance).where(
+        BalanceSnapshot.user_id == user_id, BalanceSnapshot.account == account, BalanceSnapshot.ledger_id < oldest,
+    ).order_by(BalanceSnapshot.ledger_id.desc()).limit(1))).first()
+    anchor_id, balance = anchor if anchor is not None else (0, 0.0)
+    balance += await db.scalar(select(func.coalesce(func.sum(BalanceEntry.amount), 0)).where(
+        BalanceEntry.user_id == user_id, BalanceEntry.account == account,
+        BalanceEntry.id > anchor_id, BalanceEntry.id < oldest,
+    ))
+    snapshots = dict((await db.execute(select(BalanceSnapshot.ledger_id, BalanceSnapshot.balance).where(
+        BalanceSnapshot.user_id == user_id, BalanceSnapshot.account == account,
+        BalanceSnapshot.ledger_id >= oldest, BalanceSnapshot.ledger_id <= newest,
+    ))).all())
+
+    history = []
+    for entry in reversed(entries):
+        balance = snapshots.get(entry.id, balance + entry.amount)
+        history.append({
+            "id": entry.id,
+            "amount": entry.amount,
+            "kind": entry.kind,
+            "transfer_id": entry.transfer_id,
+            "created_at": entry.created_at,
+            "balance": balance,
+        })
+    history.reverse()
+    return history
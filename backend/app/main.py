@@ -1,30 +1,115 @@
 import os
-import time
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from typing import Optional
 from dateutil.relativedelta import relativedelta
-import requests
+import httpx
 import json
-from fastapi import FastAPI, APIRouter, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query, Header, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
-from sqlalchemy import extract
+from sqlalchemy.ext.asyncio import AsyncSession
 from dotenv import load_dotenv
-from collections import Counter
-from sqlalchemy import func
+from sqlalchemy import select
 from pydantic import BaseModel
-import traceback
+from contextlib import asynccontextmanager
 
 # Import database and models
-from app.database import engine, get_db
+from app.database import async_engine, get_db, get_async_db, upgrade_schema
 from app.models.user import User  
 from app.models.transaction import Transaction
 from app.schemas.user import LoginRequest, ExchangePublicTokenRequest
+from app.categories import FOOD, ENTERTAINMENT, TRAVEL, parse_categories, category_rows, top_categories
+from app.rollup import ALL_CATEGORIES, record_transaction, forget_transaction
+from app.graph import MAX_POINTS as MAX_GRAPH_POINTS, graph_series
+from app.forecast import month_bounds, refresh_forecast, total_predicted
+from app.metrics import read_metrics_async, metrics_history_async
+from app.recompute import recompute_worker
+from app.fraud import ModelUnavailable, registry as model_registry
+from app.plaid_sync import SYNC_INTERVAL_SECONDS, PlaidSyncError, sync_scheduler, sync_user
+from app.models.plaid_sync import PlaidSyncState
+from app.plaid_client import PLAID_CLIENT_ID, PLAID_SECRET, PlaidError, plaid_client, async_plaid_client
+from app.transaction_pages import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor, transactions_query, transactions_page, stream_ndjson,
+)
+from app.plaid_webhook import PLAID_WEBHOOK_URL, WebhookVerificationError, verify_webhook, handle_webhook, webhook_queue
+from app.response_cache import RESPONSE_CACHE_TTL_SECONDS, data_versions, response_cache, etag_matches
+from app.users import find_user, find_user_async, find_user_id_async
+from app.ledger import CHECKINGS, SAVINGS, InsufficientFunds, deposit, transfer, set_balance, balance_history
+from app.idempotency import MAX_KEY_LENGTH, IdempotencyKeyReused, request_fingerprint, stored_response, commit_with_key
 
 
 # Load environment variables
 load_dotenv()
 
-app = FastAPI(title="Plaid Link With Database")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The fraud model loads on first use; set PREWARM_MODELS=1 to load it before serving
+    if os.getenv("PREWARM_MODELS", "0") == "1":
+        try:
+            model_registry.warm()
+        except ModelUnavailable as e:
+            print(f"Fraud model not prewarmed, /alert will answer 503: {str(e)}")
+    # Scheduled incremental Plaid sync, enabled by PLAID_SYNC_INTERVAL_SECONDS
+    if SYNC_INTERVAL_SECONDS > 0:
+        sync_scheduler.start()
+    yield
+    sync_scheduler.stop()
+    webhook_queue.stop()
+    # Don't leave users with stale predictions on shutdown
+    recompute_worker.stop()
+    await async_plaid_client.close()
+    await async_engine.dispose()
+
+app = FastAPI(title="Plaid Link With Database", lifespan=lifespan)
+
+# GET routes that only read the requesting user's data. Their responses carry an ETag
+# built from the user's data version and are cached under it, so a refresh with nothing
+# new written is answered without touching the database.
+CACHED_ROUTES = {
+    "/transactions", "/graph", "/graph_data", "/graph_data_food", "/graph_data_travel",
+    "/graph_data_entertainment", "/food_graph", "/entertainment_graph", "/travel_graph",
+    "/bank_balance", "/savings_balance", "/get_goal",
+    "/get_food_spending", "/get_entertainment_spending", "/get_travel_spending",
+    "/get_food_spending_goal", "/get_entertainment_spending_goal", "/get_travel_spending_goal",
+    "/get_food_predicted", "/get_entertainment_predicted", "/get_travel_predicted",
+    "/dashboard", "/category_metrics", "/category_metrics/history", "/balance_history",
+}
+
+# Registered before CORS so that cached and 304 answers still get CORS headers
+@app.middleware("http")
+async def conditional_get(request: Request, call_next):
+    username = request.query_params.get("username")
+    if (request.method != "GET" or request.url.path not in CACHED_ROUTES or not username
+            or RESPONSE_CACHE_TTL_SECONDS <= 0):
+        return await call_next(request)
+
+    # Read on the async engine, so async handlers behind the cache stay off the threadpool
+    data_version = await data_versions.get_async(username)
+    if data_version is None:
+        return await call_next(request)  # unknown user, the handler answers 404
+    # Default ranges (this month, the last 30 days) move at midnight without any write
+    version = f"{data_version}-{date.today():%Y%m%d}-{data_versions.bucket()}"
+    etag = f'"{version}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    key = (request.url.path, tuple(sorted(request.query_params.multi_items())), version)
+    body = response_cache.get(key)
+    if body is not None:
+        return Response(body, media_type="application/json", headers=headers)
+
+    response = await call_next(request)
+    if response.status_code != 200:
+        return response
+    if response.headers.get("content-type") != "application/json":
+        response.headers.update(headers)  # NDJSON exports stream through uncached
+        return response
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    response_cache.put(key, body)
+    return Response(body, media_type="application/json", headers=headers)
 
 # Allow frontend requests
 app.add_middleware(
@@ -39,21 +124,49 @@ app.add_middleware(
 # from app.models.user import Base  
 # Base.metadata.create_all(bind=engine)
 
-from app.models import user, transaction
+from app.models import user, transaction, category, rollup, regression, plaid_sync, metrics, ledger, idempotency
 
-user.Base.metadata.create_all(bind=engine)
-transaction.Base.metadata.create_all(bind=engine)
+# Also adds columns and indexes introduced since the database was created
+upgrade_schema()
 
-# Plaid Credentials
-PLAID_CLIENT_ID = os.getenv("PLAID_CLIENT_ID")
-PLAID_SECRET = os.getenv("PLAID_SECRET")
+# Plaid credentials and base URL live in app.plaid_client
 PLAID_ENV = "sandbox" 
-PLAID_SANDBOX_URL = "https://sandbox.plaid.com"
+
+# User lookups go through the cross-request username -> id cache in app.users, and
+# FastAPI resolves a dependency once per request, so a handler and all of its
+# sub-dependencies share a single lookup. Unknown users are a 404.
+def get_user(db: Session, username: str):
+    user = find_user(db, username)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+async def fetch_user(db: AsyncSession, username: str):
+    user = await find_user_async(db, username)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+def current_user(username: str, db: Session = Depends(get_db)):
+    return get_user(db, username)
+
+async def current_user_async(username: str, db: AsyncSession = Depends(get_async_db)):
+    return await fetch_user(db, username)
+
+# For handlers that only need the id: no query at all once the username is cached
+async def fetch_user_id(db: AsyncSession, username: str):
+    user_id = await find_user_id_async(db, username)
+    if user_id is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user_id
+
+async def current_user_id(username: str, db: AsyncSession = Depends(get_async_db)):
+    return await fetch_user_id(db, username)
 
 # Step 1: Validate user login or register user
 @app.post("/login")
 def login(data: LoginRequest, db: Session = Depends(get_db)):  # ✅ No more attribute errors
-    user = db.query(User).filter(User.username == data.username).first()
+    user = find_user(db, data.username)
 
     if user:
         if user.password != data.password:
@@ -68,77 +181,97 @@ def login(data: LoginRequest, db: Session = Depends(get_db)):  # ✅ No more att
 
 # Step 2: Create Plaid Link Token
 @app.post("/create_link_token")
-def create_link_token():
+async def create_link_token():
     if not PLAID_CLIENT_ID or not PLAID_SECRET:
         raise HTTPException(status_code=500, detail="Plaid API credentials not set")
 
-    url = f"{PLAID_SANDBOX_URL}/link/token/create"
     payload = {
-        "client_id": PLAID_CLIENT_ID,
-        "secret": PLAID_SECRET,
         "user": {"client_user_id": "12345"},
         "client_name": "My Plaid App",
         "products": ["auth", "transactions"],
         "country_codes": ["US"],
         "language": "en",
     }
-    response = requests.post(url, json=payload)
-    result = response.json()
-
-    if "link_token" not in result:
-        raise HTTPException(status_code=400, detail=f"Error creating link token: {result}")
+    if PLAID_WEBHOOK_URL:
+        payload["webhook"] = PLAID_WEBHOOK_URL
+    try:
+        result = await async_plaid_client.post("/link/token/create", payload)
+    except PlaidError as e:
+        raise HTTPException(status_code=400, detail=f"Error creating link token: {e.body}")
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=504, detail=f"Plaid unavailable: {str(e)}")
 
     return {"link_token": result["link_token"]}
 
 # Step 3: Exchange Public Token for Access Token & Store in DB
 @app.post("/exchange_public_token")
 def exchange_public_token(data: ExchangePublicTokenRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == data.username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    user = get_user(db, data.username)
 
-    url = f"{PLAID_SANDBOX_URL}/item/public_token/exchange"
-    payload = {
-        "client_id": PLAID_CLIENT_ID,
-        "secret": PLAID_SECRET,
-        "public_token": data.public_token,
-    }
-    response = requests.post(url, json=payload)
-    result = response.json()
-
-    if "access_token" not in result:
-        raise HTTPException(status_code=400, detail=f"Error exchanging token: {result}")
+    try:
+        result = plaid_client.post("/item/public_token/exchange", {"public_token": data.public_token})
+    except PlaidError as e:
+        raise HTTPException(status_code=400, detail=f"Error exchanging token: {e.body}")
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=504, detail=f"Plaid unavailable: {str(e)}")
 
-    # Store the access token in the database
+    # Store the access token in the database; a new item starts syncing from scratch
     user.access_token = result["access_token"]
+    user.plaid_item_id = result.get("item_id")
+    db.query(PlaidSyncState).filter(PlaidSyncState.user_id == user.id).delete()
     db.commit()
 
     return {"message": "Bank linked successfully", "access_token": result["access_token"]}
 
+# Pull transaction changes since the last sync (also run by the scheduler and app.plaid_sync)
+@app.post("/sync_transactions")
+def sync_transactions(user: User = Depends(current_user), db: Session = Depends(get_db)):
+    try:
+        return {"message": "Transactions synced", **sync_user(db, user)}
+    except PlaidSyncError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    except httpx.HTTPError as e:
+        db.rollback()
+        raise HTTPException(status_code=504, detail=f"Plaid unavailable: {str(e)}")
+
+# Plaid pushes item updates here; each one triggers an incremental sync of that item only
+@app.post("/plaid/webhook")
+async def plaid_webhook(request: Request):
+    body = await request.body()
+    try:
+        event_id = await verify_webhook(body, request.headers.get("Plaid-Verification"))
+    except (WebhookVerificationError, PlaidError) as e:
+        raise HTTPException(status_code=401, detail=f"Webhook verification failed: {str(e)}")
+    except httpx.HTTPError as e:
+        # Plaid retries webhooks that aren't acknowledged with a 200
+        raise HTTPException(status_code=503, detail=f"Plaid unavailable: {str(e)}")
+
+    try:
+        event = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Webhook body is not JSON")
+    return {"status": handle_webhook(event, event_id)}
+
 from app.schemas.user import SetGoalRequest
 
 @app.post("/set_goal")
 def set_goal(data: SetGoalRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == data.username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    user = get_user(db, data.username)
 
     
     user.amount = data.amount
     user.time_months = data.time_months
     saving_per_month = data.amount / data.time_months
     user.saving_goal = saving_per_month
+    data_versions.bump(db, user.id)
     db.commit()
 
 
     return {"message": "Goal set successfully", "saving_goal": user.saving_goal}
 
 @app.get("/get_goal")
-def get_goal(username: str, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
+async def get_goal(user: User = Depends(current_user_async)):
     if user.saving_goal is None:
         return {"message": "No goal set"}
 
@@ -151,78 +284,41 @@ def get_goal(username: str, db: Session = Depends(get_db)):
 
 
 @app.post("/top_spenders")
-def get_top_spender(username: str, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    # Get all transactions with categories
-    transactions = db.query(Transaction).filter(
-        Transaction.category.isnot(None)
-    ).all()
+def get_top_spender(user: User = Depends(current_user), db: Session = Depends(get_db)):
+    # Count categories in SQL and keep the 2 most common
+    top_categories_found = top_categories(db, user.id, limit=2)
 
-    if not transactions:
+    if not top_categories_found:
         return {"message": "No transactions found"}
 
-    # Flatten categories and count them
-    all_categories = []
-    for transaction in transactions:
-        # Handle string representation of list
-        if isinstance(transaction.category, str):
-            # Remove brackets and quotes, split by comma
-            categories = transaction.category.strip('[]').replace('"', '').split(',')
-            # Clean up whitespace
-            categories = [cat.strip() for cat in categories]
-            all_categories.extend(categories)
-        elif isinstance(transaction.category, list):
-            all_categories.extend(transaction.category)
-
-    # Count categories
-    category_counts = Counter(all_categories)
-    
-    # Get top 2 most common categories
-    top_categories = category_counts.most_common(2)
-    
-    if len(top_categories) < 2:
+    if len(top_categories_found) < 2:
         return {"message": "Not enough categories found"}
 
     # Update user's top spender fields
-    user.top_spender = top_categories[0][0]  # First most common category
-    user.top2_spender = top_categories[1][0]  # Second most common category
+    user.top_spender = top_categories_found[0][0]  # First most common category
+    user.top2_spender = top_categories_found[1][0]  # Second most common category
     db.commit()
 
     return {
         "message": "Top spenders updated",
         "top_spender": user.top_spender,
         "top2_spender": user.top2_spender,
-        "top_spender_count": top_categories[0][1],
-        "top2_spender_count": top_categories[1][1]
+        "top_spender_count": top_categories_found[0][1],
+        "top2_spender_count": top_categories_found[1][1]
     }
 
 @app.post("/day_paid")
-def get_day_paid(username: str, db: Session = Depends(get_db)):
-
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    #get current time
-    now = datetime.now()
-    prev_month = now - relativedelta(months=1)
-    current_year = prev_month.year
-    current_month = prev_month.month
-
-    #debug
-    all_transactions = db.query(Transaction).filter(
-        Transaction.amount<0
-    ).all()
-    print(f"Found {len(all_transactions)} total negative transactions")
+def get_day_paid(user: User = Depends(current_user), db: Session = Depends(get_db)):
+    #get previous month range
+    first_day = datetime.now().date().replace(day=1)
+    prev_month = first_day - relativedelta(months=1)
 
-    #query
+    #query (date range so the (user_id, date) index is used)
     incoming_transaction = db.query(Transaction).filter(
-        Transaction.amount<0,
-        extract('year', Transaction.date) == current_year,
-        extract('month', Transaction.date) == current_month
+        Transaction.user_id == user.id,
+        Transaction.date >= prev_month,
+        Transaction.date < first_day,
+        Transaction.amount<0
     ).order_by(Transaction.date).first()
 
     if not incoming_transaction:
@@ -236,67 +332,31 @@ def get_day_paid(username: str, db: Session = Depends(get_db)):
 
     return {"message": "Day Paid", "day_paid": user.day_paid}
 
-import pandas as pd
-import numpy as np
-import xgboost as xgb
-import pickle
-from sklearn.preprocessing import LabelEncoder
-
+from sqlalchemy import update, bindparam
+from app.fraud import score_transactions, score_frame
+from app.frame import load_frame
+from app.schemas.transaction import BatchAlertRequest
 
-model = xgb.XGBClassifier()
-model.load_model('xgbmodel.json')
-with open("encoder.pkl", "rb") as file:
-    encoder = pickle.load(file)
 @app.post("/alert")
-def get_alert(db: Session = Depends(get_db)):
-
+def get_alert(user: User = Depends(current_user), db: Session = Depends(get_db)):
     # Get most recent transaction
-    latest_transaction = db.query(Transaction).order_by(Transaction.id.desc()).first()
+    latest_transaction = db.query(Transaction).filter(
+        Transaction.user_id == user.id
+    ).order_by(Transaction.id.desc()).first()
     
     if not latest_transaction:
         return {"message": "No transactions found"}
 
-    #replace with ML model
-
-    #replace with ML model
-
-    # Get first category
-    if isinstance(latest_transaction.category, str):
-        try:
-            # Parse the string as JSON to get the actual array
-            categories = json.loads(latest_transaction.category)
-            first_category = categories[0] if categories else None
-        except json.JSONDecodeError:
-            # Fallback to the old method if JSON parsing fails
-            categories = latest_transaction.category.strip('[]').replace('"', '').split(',')
-            first_category = categories[0].strip() if categories else None
-    elif isinstance(latest_transaction.category, list):
-        first_category = latest_transaction.category[0] if latest_transaction.category else None
-
-    print(f"First category: {first_category}")
-
-    new_entry = pd.DataFrame({
-        'merchant': [latest_transaction.merchant_name],  # Example merchant
-        'category': [first_category],  # Example category
-        'amt': [latest_transaction.amount],  # Transaction amount
-        'trans_num': ['ce303c21bbecc75334b69a642c9716c3'],  # Example transaction number
-        'hour': [3],  # Transaction hour
-        'day_of_week': [0],  # Wednesday (0 = Monday, 6 = Sunday)
-        'day_of_month': [23],  # 15th day of the month
-        'month': [9],  # June
-    })
-
-    # Encode the new entry
-    for col in ['merchant', 'category', 'trans_num']:
-        new_entry[col] = encoder[col].transform(new_entry[col])  # Encode categorical values
-
     # Predict using the model
-    prediction = model.predict(new_entry)
-    pred = prediction[0]
-    print(f"Prediction: {pred}")
+    try:
+        pred = score_transactions([latest_transaction])[0]
+    except ModelUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
+    latest_transaction.is_fraud = bool(pred)
+    data_versions.bump(db, user.id)
     if pred==1:
-        user.isalert = 1
+        user.is_alert = 1
         db.commit()
         
         return {
@@ -306,11 +366,68 @@ def get_alert(db: Session = Depends(get_db)):
             "amount": latest_transaction.amount
         }
     
+    db.commit()
     return {"message": "No alert"}
 
+@app.post("/alert/batch")
+def batch_alert(data: BatchAlertRequest, db: Session = Depends(get_db)):
+    user = get_user(db, data.username)
+
+    if not data.transaction_ids and not (data.start_date or data.end_date):
+        raise HTTPException(status_code=400, detail="Provide transaction_ids or a date range")
+
+    # Only the scored columns, dictionary-encoded, instead of ORM objects with their categories
+    frame = load_frame(db, user.id, data.start_date, data.end_date, data.transaction_ids or None)
+
+    if not len(frame):
+        return {"message": "No transactions found", "scored": 0, "flagged": []}
+
+    # One feature matrix and one model call for the whole batch
+    try:
+        predictions = score_frame(frame)
+    except ModelUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    # Store the flags with a single executemany UPDATE
+    table = Transaction.__table__
+    db.execute(
+        update(table).where(table.c.id == bindparam("row_id")).values(is_fraud=bindparam("flag")),
+        [{"row_id": row_id, "flag": bool(pred)} for row_id, pred in zip(frame.rows["id"].tolist(), predictions)],
+    )
+
+    hits = frame.rows[predictions == 1]
+    plaid_ids = dict(db.execute(
+        select(Transaction.id, Transaction.transaction_id).where(Transaction.id.in_(hits["id"].tolist()))
+    ).all())
+    flagged = [
+        {
+            "transaction_id": plaid_ids[row_id],
+            "merchant": frame.merchants[merchant] if merchant >= 0 else None,
+            "amount": amount,
+            "date": day,
+        }
+        for row_id, merchant, amount, day in zip(
+            hits["id"].tolist(), hits["merchant"].tolist(), hits["amount"].tolist(), hits["date"].astype(str).tolist()
+        )
+    ]
+    if flagged:
+        user.is_alert = 1
+    data_versions.bump(db, user.id)
+    db.commit()
+
+    return {
+        "message": "Potential fraud detected" if flagged else "No alert",
+        "scored": len(frame),
+        "flagged": flagged,
+    }
+
+@app.get("/model_status")
+def model_status():
+    return {"message": "Model status", **model_registry.status()}
+
 @app.get("/alert_status")
-def alert_status(db: Session = Depends(get_db)):
-    user = db.query(User).first()  # Get the first user for now
+async def alert_status(username: str, db: AsyncSession = Depends(get_async_db)):
+    user = await find_user_async(db, username)
     if not user:
         return {"message": "User not found", "isalert": 0}
     
@@ -319,9 +436,9 @@ def alert_status(db: Session = Depends(get_db)):
 
     
 @app.post("/alert_resolve")
-def resolve_alert(action: dict, db: Session = Depends(get_db)):
+def resolve_alert(username: str, action: dict, db: Session = Depends(get_db)):
     try:
-        user = db.query(User).first()
+        user = find_user(db, username)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
@@ -338,32 +455,38 @@ def resolve_alert(action: dict, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/transactions")
-def get_transactions(db: Session = Depends(get_db)):
-    # Calculate date 30 days ago
-    thirty_days_ago = datetime.now() - timedelta(days=30)
-    
-    # Query transactions
-    transactions = db.query(Transaction).filter(
-        Transaction.date >= thirty_days_ago
-    ).order_by(Transaction.date.desc()).all()
-    
-    if not transactions:
-        return {"message": "No transactions found"}
-    
-    # Format transactions for response
-    transactions_list = []
-    for tx in transactions:
-        transactions_list.append({
-            "date": tx.date.strftime("%Y-%m-%d"),
-            "amount": tx.amount,
-            "category": tx.category,
-            "merchant_name": tx.merchant_name,
-        })
-    
+async def get_transactions(
+    user_id: int = Depends(current_user_id),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    account_id: Optional[str] = None,
+    category: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    # Last 30 days unless a range is given; pass next_cursor back to get the following page
+    if start_date is None and end_date is None:
+        start_date = datetime.now().date() - timedelta(days=30)
+    try:
+        query = transactions_query(user_id, start_date, end_date, account_id, category, cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # One JSON object per line, streamed without building the whole list (exports)
+    if format == "ndjson":
+        return StreamingResponse(stream_ndjson(query, limit), media_type="application/x-ndjson")
+
+    transactions_list, next_cursor = await transactions_page(db, query, limit or DEFAULT_PAGE_SIZE)
+    if not transactions_list and cursor is None:
+        return {"message": "No transactions found", "transactions": [], "next_cursor": None}
+
     return {
         "message": "Transactions retrieved successfully",
         "transactions": transactions_list,
-        "total_count": len(transactions_list)
+        "total_count": len(transactions_list),
+        "next_cursor": next_cursor,
     }
 
 
@@ -373,14 +496,30 @@ from app.schemas.transaction import AddTransactionRequest
 class PredictionRequest(BaseModel):
     username: str
 
+# Write endpoints that take an Idempotency-Key header. A retry carrying the key of a
+# request that already committed gets that request's response back, and nothing is
+# written or recomputed again (see app.idempotency).
+IdempotencyKeyHeader = Header(None, alias="Idempotency-Key", max_length=MAX_KEY_LENGTH)
+
+@app.exception_handler(IdempotencyKeyReused)
+async def idempotency_key_reused(request: Request, exc: IdempotencyKeyReused):
+    return JSONResponse(status_code=422, content={"detail": "Idempotency-Key was already used for a different request"})
+
 @app.post("/add_transaction")
-def add_transaction(data: AddTransactionRequest, db: Session = Depends(get_db)):
+def add_transaction(data: AddTransactionRequest, idempotency_key: Optional[str] = IdempotencyKeyHeader, db: Session = Depends(get_db)):
+    user = get_user(db, data.username)
+    fingerprint = request_fingerprint("/add_transaction", data.model_dump())
+    replay = stored_response(db, user.id, idempotency_key, fingerprint)
+    if replay is not None:
+        return replay
+
     try:
         # Add transaction
         transaction_id = str(uuid.uuid4())
         category = json.dumps(data.category) if isinstance(data.category, list) else data.category
         
         new_transaction = Transaction(
+            user_id=user.id,
             transaction_id=transaction_id,
             account_id="9Ba75DR7nRcq4dBxBkdEfx1J1vwmGyi4xbVKr",
             name=data.name,
@@ -389,817 +528,419 @@ def add_transaction(data: AddTransactionRequest, db: Session = Depends(get_db)):
             date=data.date,
             category=category,
             payment_channel=data.payment_channel,
-            currency=data.currency
+            currency=data.currency,
+            categories=category_rows(parse_categories(data.category))
         )
         db.add(new_transaction)
-        db.commit()
-        db.refresh(new_transaction)
-
-        username = "user_good"  # Use string directly
-        
-        try:
-            # Call prediction endpoints with proper request body
-            get_food_model(username, db)  # This is your /food_predicted POST handler
-            get_entertainment_model(username, db)  # This is your /entertainment_predicted POST handler
-            get_travel_model(username, db)  # This is your /travel_predicted POST handler
-            
-            # Call actual spending handlers
-            post_actual_food(username, db)
-            post_actual_entertainment(username, db)
-            post_actual_travel(username, db)
-            
-            # Update adaptive spending
-            adaptive_spending(username, db)
-            
-            print("All predictions and actuals updated successfully")
-            
-        except Exception as inner_e:
-            print(f"Error in updates: {str(inner_e)}")
-            traceback.print_exc()  # Print full error trace
+        record_transaction(db, new_transaction)  # same commit as the insert
 
         # Handle alert
         if data.amount and data.amount > 100:
-            user = db.query(User).first()
-            if user:
-                user.is_alert = 1
-                db.commit()
+            user.is_alert = 1
 
-        return new_transaction
+        # The response is stored with the key, so it is built before the commit
+        db.flush()
+        db.refresh(new_transaction)
+        content = jsonable_encoder(new_transaction)
+        data_versions.bump(db, user.id)
+        replay = commit_with_key(db, user.id, idempotency_key, fingerprint, content)
+        if replay is not None:
+            return replay  # a concurrent retry committed first
+
+        # Predicted, actual and goal spending are refreshed in the background,
+        # coalescing bursts of inserts into one recompute
+        recompute_worker.schedule(user.id)
+
+        return content
+    except IdempotencyKeyReused:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/delete_transaction")
-def delete_transaction(transaction_id: str, db: Session = Depends(get_db)):
-    transaction = db.query(Transaction).filter(Transaction.transaction_id == transaction_id).first()
+def delete_transaction(username: str, transaction_id: str, user: User = Depends(current_user), db: Session = Depends(get_db)):
+    transaction = db.query(Transaction).filter(
+        Transaction.user_id == user.id,
+        Transaction.transaction_id == transaction_id
+    ).first()
     if not transaction:
         return {"message": "Transaction not found"}
+    forget_transaction(db, transaction)  # same commit as the delete
     db.delete(transaction)
+    data_versions.bump(db, user.id)
     db.commit()
+    recompute_worker.schedule(user.id)
     return {"message": "Transaction deleted successfully"}
 
 
 
-@app.get("/graph_data")
-def get_graph_data(db: Session = Depends(get_db)):
-    today = datetime.now()
-    first_day = today.replace(day=1)
-    
-    transactions = db.query(Transaction).filter(
-        Transaction.date >= first_day
-    ).order_by(Transaction.date.asc()).all()
-
-    if not transactions:
-        return {"message": "No transactions found"}
-
-    cumulative_spending = {}
-    running_total = 0
-    
-    for tx in transactions:
-        date_str = tx.date.strftime("%Y-%m-%d")
-        running_total += tx.amount
-        cumulative_spending[date_str] = running_total
+# One parameterized, cumulative spending series; the older graph routes below are aliases
+@app.get("/graph")
+async def get_graph(
+    user_id: int = Depends(current_user_id),
+    category: Optional[str] = None,  # Plaid category name; all spending when omitted
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    bucket: str = Query("day", pattern="^(day|week|month)$"),
+    points: Optional[int] = Query(None, ge=2, le=MAX_GRAPH_POINTS),
+    db: AsyncSession = Depends(get_async_db),
+):
+    start = start_date or datetime.now().date().replace(day=1)
+    cumulative = await graph_series(db, user_id, category or ALL_CATEGORIES, start, end_date, bucket, points)
 
     return {
-        "message": "Total spending data retrieved successfully",
-        "cumulative_spending": cumulative_spending
+        "message": "Spending data retrieved successfully",
+        "category": category,
+        "bucket": bucket,
+        "cumulative_spending": cumulative,
     }
 
+async def graph_alias(db: AsyncSession, username: str, category: str, message: str, whole_month: bool = False):
+    # This month's daily series, as the per-category routes have always returned it
+    user_id = await fetch_user_id(db, username)
 
-import uuid
-from app.schemas.transaction import AddTransactionRequest
-@app.post("/add_transaction")
-def add_transaction(data: AddTransactionRequest, db: Session = Depends(get_db)):
-    try:
-        transaction_id = str(uuid.uuid4())
-        
-        # Convert category list to string if it's a list
-        category = json.dumps(data.category) if isinstance(data.category, list) else data.category
-        
-        new_transaction = Transaction(
-            transaction_id=transaction_id,
-            account_id="9Ba75DR7nRcq4dBxBkdEfx1J1vwmGyi4xbVKr",
-            name=data.name,
-            merchant_name=data.merchant_name,
-            amount=data.amount or 0,
-            date=data.date,
-            category=category,
-            payment_channel=data.payment_channel,
-            currency=data.currency
-        )
-        db.add(new_transaction)
-        db.commit()
-        db.refresh(new_transaction)
-
-        username = "user_good"
-        
-        try:
-            # Call the actual POST endpoint handlers
-            get_food_model(username, db)  # This is your /food_predicted POST handler
-            get_entertainment_model(username, db)  # This is your /entertainment_predicted POST handler
-            get_travel_model(username, db)  # This is your /travel_predicted POST handler
-            
-            # Call actual spending handlers
-            post_actual_food(username, db)
-            post_actual_entertainment(username, db)
-            post_actual_travel(username, db)
-            
-            # Update adaptive spending
-            adaptive_spending(username, db)
-        except Exception as inner_e:
-            print(f"Error in updates: {str(inner_e)}")
-
-        if data.amount and data.amount > 100:
-            user = db.query(User).first()
-            if user:
-                user.is_alert = 1
-                db.commit()
+    first_day = datetime.now().date().replace(day=1)
+    end = first_day + relativedelta(months=1) - timedelta(days=1) if whole_month else None
+    cumulative = await graph_series(db, user_id, category, first_day, end)
 
-        return new_transaction
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.delete("/delete_transaction")
-def delete_transaction(transaction_id: str, db: Session = Depends(get_db)):
-    transaction = db.query(Transaction).filter(Transaction.transaction_id == transaction_id).first()
-    if not transaction:
-        return {"message": "Transaction not found"}
-    db.delete(transaction)
-    db.commit()
-    return {"message": "Transaction deleted successfully"}
-
-@app.get("/graph_data")
-def get_graph_data(db: Session = Depends(get_db)):
-    today = datetime.now()
-    first_day = today.replace(day=1)
-    
-    transactions = db.query(Transaction).filter(
-        Transaction.date >= first_day
-    ).order_by(Transaction.date.asc()).all()
-
-    if not transactions:
+    if not cumulative and not whole_month:
         return {"message": "No transactions found"}
 
-    cumulative_spending = {}
-    running_total = 0
-    
-    for tx in transactions:
-        date_str = tx.date.strftime("%Y-%m-%d")
-        running_total += tx.amount
-        cumulative_spending[date_str] = running_total
+    return {"message": message, "cumulative_spending": cumulative}
 
-    return {
-        "message": "Total spending data retrieved successfully",
-        "cumulative_spending": cumulative_spending
-    }
+@app.get("/graph_data")
+async def get_graph_data(username: str, db: AsyncSession = Depends(get_async_db)):
+    return await graph_alias(db, username, ALL_CATEGORIES, "Total spending data retrieved successfully")
 
 @app.get("/graph_data_food")
-def get_graph_data_food(db: Session = Depends(get_db)):
-    today = datetime.now()
-    first_day = today.replace(day=1)
-    
-    transactions = db.query(Transaction).filter(
-        Transaction.date >= first_day
-    ).order_by(Transaction.date.asc()).all()
-
-    if not transactions:
-        return {"message": "No transactions found"}
-
-    cumulative_spending = {}
-    running_total = 0
-    
-    for tx in transactions:
-        # Handle both string and list formats of category
-        categories = []
-        if isinstance(tx.category, str):
-            try:
-                categories = json.loads(tx.category)
-            except json.JSONDecodeError:
-                categories = [tx.category]
-        elif isinstance(tx.category, list):
-            categories = tx.category
-
-        # Check if "Food and Drink" is in the categories
-        if any(cat.strip() == "Food and Drink" for cat in categories):
-            date_str = tx.date.strftime("%Y-%m-%d")
-            running_total += tx.amount
-            cumulative_spending[date_str] = running_total
-
-    return {
-        "message": "Food and Drink spending data retrieved successfully",
-        "cumulative_spending": cumulative_spending
-    }
+async def get_graph_data_food(username: str, db: AsyncSession = Depends(get_async_db)):
+    return await graph_alias(db, username, FOOD, "Food and Drink spending data retrieved successfully")
 
 @app.get("/graph_data_travel")
-def get_graph_data_travel(db: Session = Depends(get_db)):
-    today = datetime.now()
-    first_day = today.replace(day=1)
-    
-    transactions = db.query(Transaction).filter(
-        Transaction.date >= first_day
-    ).order_by(Transaction.date.asc()).all()
-
-    if not transactions:
-        return {"message": "No transactions found"}
-
-    cumulative_spending = {}
-    running_total = 0
-    
-    for tx in transactions:
-        # Handle both string and list formats of category
-        categories = []
-        if isinstance(tx.category, str):
-            try:
-                categories = json.loads(tx.category)
-            except json.JSONDecodeError:
-                categories = [tx.category]
-        elif isinstance(tx.category, list):
-            categories = tx.category
-
-        # Check if "Travel" is in the categories
-        if any(cat.strip() == "Travel" for cat in categories):
-            date_str = tx.date.strftime("%Y-%m-%d")
-            running_total += tx.amount
-            cumulative_spending[date_str] = running_total
-
-    return {
-        "message": "Travel spending data retrieved successfully",
-        "cumulative_spending": cumulative_spending
-    }
+async def get_graph_data_travel(username: str, db: AsyncSession = Depends(get_async_db)):
+    return await graph_alias(db, username, TRAVEL, "Travel spending data retrieved successfully")
 
 @app.get("/graph_data_entertainment")
-def get_graph_data_entertainment(db: Session = Depends(get_db)):
-    today = datetime.now()
-    first_day = today.replace(day=1)
-    
-    transactions = db.query(Transaction).filter(
-        Transaction.date >= first_day
-    ).order_by(Transaction.date.asc()).all()
-
-    if not transactions:
-        return {"message": "No transactions found"}
-
-    cumulative_spending = {}
-    running_total = 0
-    
-    for tx in transactions:
-        # Handle both string and list formats of category
-        categories = []
-        if isinstance(tx.category, str):
-            try:
-                categories = json.loads(tx.category)
-            except json.JSONDecodeError:
-                categories = [tx.category]
-        elif isinstance(tx.category, list):
-            categories = tx.category
-
-        # Check if "Entertainment" is in the categories
-        if any(cat.strip() == "Entertainment" for cat in categories):
-            date_str = tx.date.strftime("%Y-%m-%d")
-            running_total += tx.amount
-            cumulative_spending[date_str] = running_total
-
-    return {
-        "message": "Entertainment spending data retrieved successfully",
-        "cumulative_spending": cumulative_spending
-    }
+async def get_graph_data_entertainment(username: str, db: AsyncSession = Depends(get_async_db)):
+    return await graph_alias(db, username, ENTERTAINMENT, "Entertainment spending data retrieved successfully")
 
 @app.get("/bank_balance")
-def get_bank_balance(username: str, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+async def get_bank_balance(user: User = Depends(current_user_async)):
     return {"bank_balance": user.checkings}
 
 @app.post("/set_bank_balance")
-def set_bank_balance(username: str, balance: float, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    user.checkings = balance
+def set_bank_balance(username: str, balance: float, user: User = Depends(current_user), db: Session = Depends(get_db)):
+    balances = set_balance(db, user.id, CHECKINGS, balance)
+    data_versions.bump(db, user.id)
     db.commit()
-    return {"message": "Bank balance updated", "bank_balance": user.checkings}
+    return {"message": "Bank balance updated", "bank_balance": balances[CHECKINGS]}
 
 @app.get("/savings_balance")
-def get_savings_balance(username: str, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+async def get_savings_balance(user: User = Depends(current_user_async)):
     return {"savings_balance": user.savings}
 
 @app.post("/set_savings_balance")
-def set_savings_balance(username: str, balance: float, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    user.savings = balance
+def set_savings_balance(username: str, balance: float, user: User = Depends(current_user), db: Session = Depends(get_db)):
+    balances = set_balance(db, user.id, SAVINGS, balance)
+    data_versions.bump(db, user.id)
     db.commit()
-    return {"message": "Savings balance updated", "savings_balance": user.savings}
-
-
-
-def get_food_data(username: str, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    # Calculate the current month range
-    today = datetime.now()
-    first_day = today.replace(day=1)
-    next_month = first_day + relativedelta(months=1)
-
-    # Filter transactions only in the current month
-    transactions = db.query(Transaction).filter(
-        Transaction.date >= first_day,
-        Transaction.date < next_month
-    ).all()
-
-    cumulative_spending = {}
-    running_total = 0
-
-    for tx in transactions:
-        # Ensure we have a valid list of categories
-        if tx.category is None:
-            categories = []
-        elif isinstance(tx.category, str):
-            try:
-                # Attempt to parse the string as JSON.
-                categories = json.loads(tx.category)
-            except json.JSONDecodeError:
-                # Fallback: remove brackets and quotes, then split by comma
-                categories = tx.category.strip('[]').replace('"', '').split(',')
-                categories = [cat.strip() for cat in categories if cat.strip()]
-        elif isinstance(tx.category, list):
-            categories = tx.category
-        else:
-            categories = []
-        
-        # Now safely check if "Food and Drink" is in the category list
-        if any(isinstance(cat, str) and cat.strip() == "Food and Drink" for cat in categories):
-            date_str = tx.date.strftime("%Y-%m-%d")
-            running_total += tx.amount
-            cumulative_spending[date_str] = running_total
-
+    return {"message": "Savings balance updated", "savings_balance": balances[SAVINGS]}
+
+# Ledger entries of one account, newest first, with the balance after each;
+# pass next_before back as `before` for the following page
+@app.get("/balance_history")
+async def get_balance_history(
+    account: str = Query(CHECKINGS, pattern="^(checkings|savings)$"),
+    limit: int = Query(50, ge=1, le=500),
+    before: Optional[int] = None,
+    user_id: int = Depends(current_user_id),
+    db: AsyncSession = Depends(get_async_db),
+):
+    history = await balance_history(db, user_id, account, before, limit)
     return {
-        "message": "Food spending data retrieved successfully",
-        "cumulative_spending": cumulative_spending
+        "message": "Balance history retrieved successfully",
+        "account": account,
+        "history": history,
+        "next_before": history[-1]["id"] if len(history) == limit else None,
     }
 
-@app.get("/food_graph")
-def get_food_graph(username: str, db: Session = Depends(get_db)):
-    food_data = get_food_data(username, db)
-    return food_data
-
 
-def get_food_predicted(username: str, db: Session = Depends(get_db)):
-    # Get the food spending data
-    food_data = get_food_data(username, db)
-    cumulative_spending = food_data["cumulative_spending"]
-    
-    if not cumulative_spending:
-        return {"message": "No food spending data found"}
 
-    # Convert data to arrays for regression
-    dates = [datetime.strptime(date, "%Y-%m-%d").day for date in cumulative_spending.keys()]
-    amounts = list(cumulative_spending.values())
-    
-    # Perform linear regression
-    x = np.array(dates).reshape(-1, 1)
-    y = np.array(amounts)
-    
-    if len(x) < 2:
-        return {"message": "Not enough data points for prediction"}
-        
-    coefficients = np.polyfit(x.flatten(), y, 1)
-    slope = coefficients[0]
-    intercept = coefficients[1]
-    
-    # Predict spending for day 28
-    predicted_spending = slope * 28 + intercept
-    
-    return {
-        "message": "Food spending prediction calculated",
-        "predicted_spending": predicted_spending
-    }
+@app.get("/food_graph")
+async def get_food_graph(username: str, db: AsyncSession = Depends(get_async_db)):
+    return await graph_alias(db, username, FOOD, "Food spending data retrieved successfully", whole_month=True)
 
 @app.post("/food_predicted")
-def get_food_model(username: str, db: Session = Depends(get_db)):
-    food_predicted = get_food_predicted(username, db)
-    food_ps = food_predicted.get("predicted_spending", 0)
-    user = db.query(User).filter(User.username == username).first()
-    if user:
-        user.food_spending_predicted = food_ps
-        db.commit()
-    return {"predicted_spending": food_ps}
-
-from dateutil.relativedelta import relativedelta
+def get_food_model(user: User = Depends(current_user), db: Session = Depends(get_db)):
+    forecast = refresh_forecast(db, user)
+    return {"predicted_spending": forecast[FOOD]["predicted"]}
 
 # ------------------------------------------------------------------
 # Entertainment Category Endpoints
 # ------------------------------------------------------------------
-def get_entertainment_data(username: str, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    # Calculate the current month range
-    today = datetime.now()
-    first_day = today.replace(day=1)
-    next_month = first_day + relativedelta(months=1)
-
-    # Filter transactions only in the current month
-    transactions = db.query(Transaction).filter(
-        Transaction.date >= first_day,
-        Transaction.date < next_month
-    ).all()
-
-    cumulative_spending = {}
-    running_total = 0
-
-    for tx in transactions:
-        # Ensure we have a valid list of categories
-        if tx.category is None:
-            categories = []
-        elif isinstance(tx.category, str):
-            try:
-                categories = json.loads(tx.category)
-            except json.JSONDecodeError:
-                categories = tx.category.strip('[]').replace('"', '').split(',')
-                categories = [cat.strip() for cat in categories if cat.strip()]
-        elif isinstance(tx.category, list):
-            categories = tx.category
-        else:
-            categories = []
-        
-        # Check if "Entertainment" is in the category list
-        if any(isinstance(cat, str) and cat.strip() == "Entertainment" for cat in categories):
-            date_str = tx.date.strftime("%Y-%m-%d")
-            running_total += tx.amount
-            cumulative_spending[date_str] = running_total
-
-    return {
-        "message": "Entertainment spending data retrieved successfully",
-        "cumulative_spending": cumulative_spending
-    }
-
 @app.get("/entertainment_graph")
-def get_entertainment_graph(username: str, db: Session = Depends(get_db)):
-    entertainment_data = get_entertainment_data(username, db)
-    return entertainment_data
-
-def get_entertainment_predicted(username: str, db: Session = Depends(get_db)):
-    # Get the entertainment spending data
-    entertainment_data = get_entertainment_data(username, db)
-    cumulative_spending = entertainment_data["cumulative_spending"]
-    
-    if not cumulative_spending:
-        return {"message": "No entertainment spending data found"}
-    
-    # Convert data to arrays for regression
-    dates = [datetime.strptime(date, "%Y-%m-%d").day for date in cumulative_spending.keys()]
-    amounts = list(cumulative_spending.values())
-    
-    # Perform linear regression
-    x = np.array(dates).reshape(-1, 1)
-    y = np.array(amounts)
-    
-    if len(x) < 2:
-        return {"message": "Not enough data points for prediction"}
-        
-    coefficients = np.polyfit(x.flatten(), y, 1)
-    slope = coefficients[0]
-    intercept = coefficients[1]
-    
-    # Predict spending for day 28
-    predicted_spending = slope * 28 + intercept
-    
-    return {
-        "message": "Entertainment spending prediction calculated",
-        "predicted_spending": predicted_spending
-    }
+async def get_entertainment_graph(username: str, db: AsyncSession = Depends(get_async_db)):
+    return await graph_alias(db, username, ENTERTAINMENT, "Entertainment spending data retrieved successfully", whole_month=True)
 
 @app.post("/entertainment_predicted")
-def get_entertainment_model(username: str, db: Session = Depends(get_db)):
-    entertainment_predicted = get_entertainment_predicted(username, db)
-    entertainment_ps = entertainment_predicted.get("predicted_spending", 0)
-    user = db.query(User).filter(User.username == username).first()
-    if user:
-        user.entertainment_spending_predicted = entertainment_ps
-        db.commit()
-    return {"predicted_spending": entertainment_ps}
+def get_entertainment_model(user: User = Depends(current_user), db: Session = Depends(get_db)):
+    forecast = refresh_forecast(db, user)
+    return {"predicted_spending": forecast[ENTERTAINMENT]["predicted"]}
 
 # ------------------------------------------------------------------
 # Travel Category Endpoints
 # ------------------------------------------------------------------
-def get_travel_data(username: str, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    # Calculate the current month range
-    today = datetime.now()
-    first_day = today.replace(day=1)
-    next_month = first_day + relativedelta(months=1)
-
-    # Filter transactions only in the current month
-    transactions = db.query(Transaction).filter(
-        Transaction.date >= first_day,
-        Transaction.date < next_month
-    ).all()
-
-    cumulative_spending = {}
-    running_total = 0
-
-    for tx in transactions:
-        # Ensure we have a valid list of categories
-        if tx.category is None:
-            categories = []
-        elif isinstance(tx.category, str):
-            try:
-                categories = json.loads(tx.category)
-            except json.JSONDecodeError:
-                categories = tx.category.strip('[]').replace('"', '').split(',')
-                categories = [cat.strip() for cat in categories if cat.strip()]
-        elif isinstance(tx.category, list):
-            categories = tx.category
-        else:
-            categories = []
-        
-        # Check if "Travel" is in the category list
-        if any(isinstance(cat, str) and cat.strip() == "Travel" for cat in categories):
-            date_str = tx.date.strftime("%Y-%m-%d")
-            running_total += tx.amount
-            cumulative_spending[date_str] = running_total
-
-    return {
-        "message": "Travel spending data retrieved successfully",
-        "cumulative_spending": cumulative_spending
-    }
-
 @app.get("/travel_graph")
-def get_travel_graph(username: str, db: Session = Depends(get_db)):
-    travel_data = get_travel_data(username, db)
-    return travel_data
-
-def get_travel_predicted(username: str, db: Session = Depends(get_db)):
-    # Get the travel spending data
-    travel_data = get_travel_data(username, db)
-    cumulative_spending = travel_data["cumulative_spending"]
-    
-    if not cumulative_spending:
-        return {"message": "No travel spending data found"}
-    
-    # Convert data to arrays for regression
-    dates = [datetime.strptime(date, "%Y-%m-%d").day for date in cumulative_spending.keys()]
-    amounts = list(cumulative_spending.values())
-    
-    # Perform linear regression
-    x = np.array(dates).reshape(-1, 1)
-    y = np.array(amounts)
-    
-    if len(x) < 2:
-        return {"message": "Not enough data points for prediction"}
-        
-    coefficients = np.polyfit(x.flatten(), y, 1)
-    slope = coefficients[0]
-    intercept = coefficients[1]
-    
-    # Predict spending for day 28
-    predicted_spending = slope * 28 + intercept
-    
-    return {
-        "message": "Travel spending prediction calculated",
-        "predicted_spending": predicted_spending
-    }
+async def get_travel_graph(username: str, db: AsyncSession = Depends(get_async_db)):
+    return await graph_alias(db, username, TRAVEL, "Travel spending data retrieved successfully", whole_month=True)
 
 @app.post("/travel_predicted")
-def get_travel_model(username: str, db: Session = Depends(get_db)):
-    travel_predicted = get_travel_predicted(username, db)
-    travel_ps = travel_predicted.get("predicted_spending", 0)
-    user = db.query(User).filter(User.username == username).first()
-    if user:
-        user.travel_spending_predicted = travel_ps
-        db.commit()
-    return {"predicted_spending": travel_ps}
+def get_travel_model(user: User = Depends(current_user), db: Session = Depends(get_db)):
+    forecast = refresh_forecast(db, user)
+    return {"predicted_spending": forecast[TRAVEL]["predicted"]}
+
+@app.get("/forecast_status")
+async def forecast_status(user_id: int = Depends(current_user_id)):
+    # stale: predicted/actual/goal values don't reflect the latest transactions yet
+    return {"message": "Forecast status", **recompute_worker.status(user_id)}
+
+# This month's stored value of one metric, as the per-category routes below return it
+async def stored_metric(db: AsyncSession, user_id: int, category: str, field: str):
+    metrics = await read_metrics_async(db, user_id, month_bounds()[0], [category])
+    return metrics.get(category, {}).get(field)
 
 @app.get("/get_food_predicted")
-def set_food_predicted(username: str, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user.food_spending_predicted
+async def set_food_predicted(user_id: int = Depends(current_user_id), db: AsyncSession = Depends(get_async_db)):
+    return await stored_metric(db, user_id, FOOD, "predicted")
 
 @app.get("/get_entertainment_predicted")
-def set_entertainment_predicted(username: str, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user.entertainment_spending_predicted
+async def set_entertainment_predicted(user_id: int = Depends(current_user_id), db: AsyncSession = Depends(get_async_db)):
+    return await stored_metric(db, user_id, ENTERTAINMENT, "predicted")
 
 @app.get("/get_travel_predicted")
-def set_travel_predicted(username: str, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user.travel_spending_predicted   
+async def set_travel_predicted(user_id: int = Depends(current_user_id), db: AsyncSession = Depends(get_async_db)):
+    return await stored_metric(db, user_id, TRAVEL, "predicted")
 
 @app.post("/post_actual_food")
-def post_actual_food(username: str, db: Session = Depends(get_db)):
-    food_data = get_food_data(username, db)
-    cumulative_spending = food_data["cumulative_spending"]
-    if cumulative_spending:
-        last_value = list(cumulative_spending.values())[-1]
-        user = db.query(User).filter(User.username == username).first()
-        user.food_spending = last_value
-        db.commit()
-        return {"message": "Food spending updated", "food_spending": last_value}
+def post_actual_food(user: User = Depends(current_user), db: Session = Depends(get_db)):
+    forecast = refresh_forecast(db, user)[FOOD]
+    if forecast["points"]:
+        return {"message": "Food spending updated", "food_spending": forecast["actual"]}
     return {"message": "No food spending data found"}
 
 @app.post("/post_actual_entertainment")
-def post_actual_entertainment(username: str, db: Session = Depends(get_db)):
-    entertainment_data = get_entertainment_data(username, db)
-    cumulative_spending = entertainment_data["cumulative_spending"]
-    if cumulative_spending:
-        last_value = list(cumulative_spending.values())[-1]
-        user = db.query(User).filter(User.username == username).first()
-        user.entertainment_spending = last_value
-        db.commit()
-        return {"message": "Entertainment spending updated", "entertainment_spending": last_value}
+def post_actual_entertainment(user: User = Depends(current_user), db: Session = Depends(get_db)):
+    forecast = refresh_forecast(db, user)[ENTERTAINMENT]
+    if forecast["points"]:
+        return {"message": "Entertainment spending updated", "entertainment_spending": forecast["actual"]}
     return {"message": "No entertainment spending data found"}
 
 @app.post("/post_actual_travel")
-def post_actual_travel(username: str, db: Session = Depends(get_db)):
-    travel_data = get_travel_data(username, db)
-    cumulative_spending = travel_data["cumulative_spending"]
-    if cumulative_spending:
-        last_value = list(cumulative_spending.values())[-1]
-        user = db.query(User).filter(User.username == username).first()
-        user.travel_spending = last_value
-        db.commit()
-        return {"message": "Travel spending updated", "travel_spending": last_value}
+def post_actual_travel(user: User = Depends(current_user), db: Session = Depends(get_db)):
+    forecast = refresh_forecast(db, user)[TRAVEL]
+    if forecast["points"]:
+        return {"message": "Travel spending updated", "travel_spending": forecast["actual"]}
     return {"message": "No travel spending data found"}
 
 @app.get("/get_food_spending")
-def get_food_spending(username: str, db: Session = Depends(get_db)):
-    user_instance = db.query(User).filter(User.username == username).first()
-    if not user_instance:
-       raise HTTPException(status_code=404, detail="User not found")
-    return {"food_spending": user_instance.food_spending}
+async def get_food_spending(user_id: int = Depends(current_user_id), db: AsyncSession = Depends(get_async_db)):
+    return {"food_spending": await stored_metric(db, user_id, FOOD, "spending")}
 
 @app.get("/get_entertainment_spending")
-def get_entertainment_spending(username: str, db: Session = Depends(get_db)):
-    user_instance = db.query(User).filter(User.username == username).first()
-    if not user_instance:
-       raise HTTPException(status_code=404, detail="User not found")
-    return {"entertainment_spending": user_instance.entertainment_spending}
+async def get_entertainment_spending(user_id: int = Depends(current_user_id), db: AsyncSession = Depends(get_async_db)):
+    return {"entertainment_spending": await stored_metric(db, user_id, ENTERTAINMENT, "spending")}
 
 @app.get("/get_travel_spending")
-def get_travel_spending(username: str, db: Session = Depends(get_db)):
-    user_instance = db.query(User).filter(User.username == username).first()
-    if not user_instance:
-       raise HTTPException(status_code=404, detail="User not found")
-    return {"travel_spending": user_instance.travel_spending}
+async def get_travel_spending(user_id: int = Depends(current_user_id), db: AsyncSession = Depends(get_async_db)):
+    return {"travel_spending": await stored_metric(db, user_id, TRAVEL, "spending")}
 
 @app.post("/adaptive_spending")
-def adaptive_spending(username: str, db: Session = Depends(get_db)):
-    user_instance = db.query(User).filter(User.username == username).first()
-    if not user_instance:
-       raise HTTPException(status_code=404, detail="User not found")
-    
-    # Set default saving_goal to 0 if None
-    saving_goal = user_instance.saving_goal or 0
-    spend_limit = 1000 - saving_goal
-    
-    food_predicted = get_food_model(username, db)
-    entertainment_predicted = get_entertainment_model(username, db)
-    travel_predicted = get_travel_model(username, db)
-    
-    # Safely extract predicted_spending values using .get (defaulting to 0 if missing)
-    food_ps = food_predicted.get("predicted_spending", 0)
-    entertainment_ps = entertainment_predicted.get("predicted_spending", 0)
-    travel_ps = travel_predicted.get("predicted_spending", 0)
-    
-    predicted_spending = food_ps + entertainment_ps + travel_ps
-
-    # Calculate ratio only if predicted_spending is non-zero
-    ratio = spend_limit / predicted_spending if predicted_spending else 0
-
-    user_instance.food_spending_goal = food_ps * ratio
-    user_instance.entertainment_spending_goal = entertainment_ps * ratio
-    user_instance.travel_spending_goal = travel_ps * ratio
-    db.commit()
+def adaptive_spending(user_instance: User = Depends(current_user), db: Session = Depends(get_db)):
+    # Predictions, actuals and goals for every category are written in one commit
+    forecast = refresh_forecast(db, user_instance)
 
-    return {"message": "Adaptive spending updated", "predicted_spending": predicted_spending}
+    return {"message": "Adaptive spending updated", "predicted_spending": total_predicted(forecast)}
     
 @app.get("/get_all_predicted")
-def total_spending_predicted(username: str, db: Session = Depends(get_db)):
-    user_instance = db.query(User).filter(User.username == username).first()
-    if not user_instance:
-        raise HTTPException(status_code=404, detail="User not found")
-        
-    food_predicted = get_food_model(username, db)
-    entertainment_predicted = get_entertainment_model(username, db)
-    travel_predicted = get_travel_model(username, db)
-
-    # Use .get with default of 0 if key is missing
-    food_ps = food_predicted.get("predicted_spending", 0)
-    entertainment_ps = entertainment_predicted.get("predicted_spending", 0)
-    travel_ps = travel_predicted.get("predicted_spending", 0)
-
-    predicted_spending = food_ps + entertainment_ps + travel_ps
-    spend_limit = 1000 - user_instance.saving_goal  # Assuming saving_goal exists
-
-    return predicted_spending
-
+def get_all_predicted(user_instance: User = Depends(current_user), db: Session = Depends(get_db)):
+    forecast = refresh_forecast(db, user_instance)
+    return total_predicted(forecast)
 
 
 @app.get("/total_spending_predicted")
-def total_spending_predicted(username: str, db: Session = Depends(get_db)):
-    user_instance = db.query(User).filter(User.username == username).first()
-    if not user_instance:
-        raise HTTPException(status_code=404, detail="User not found")
-        
-    food_predicted = get_food_model(username, db)
-    entertainment_predicted = get_entertainment_model(username, db)
-    travel_predicted = get_travel_model(username, db)
-
-    # Use .get with default of 0 if key is missing
-    food_ps = food_predicted.get("predicted_spending", 0)
-    entertainment_ps = entertainment_predicted.get("predicted_spending", 0)
-    travel_ps = travel_predicted.get("predicted_spending", 0)
-
-    predicted_spending = food_ps + entertainment_ps + travel_ps
-    spend_limit = 1000 - user_instance.saving_goal  # Assuming saving_goal exists
-
-    return {"message": 0, "predicted_spending": predicted_spending}
+def total_spending_predicted(user_instance: User = Depends(current_user), db: Session = Depends(get_db)):
+    forecast = refresh_forecast(db, user_instance)
+    return {"message": 0, "predicted_spending": total_predicted(forecast)}
 
 
 @app.get("/get_food_spending_goal")
-def get_food_spending_goal(username: str, db: Session = Depends(get_db)):
-    user_instance = db.query(User).filter(User.username == username).first()
-    if not user_instance:
-       raise HTTPException(status_code=404, detail="User not found")
-    return {"food_spending_goal": user_instance.food_spending_goal}
+async def get_food_spending_goal(user_id: int = Depends(current_user_id), db: AsyncSession = Depends(get_async_db)):
+    return {"food_spending_goal": await stored_metric(db, user_id, FOOD, "spending_goal")}
 
 @app.get("/get_entertainment_spending_goal")
-def get_entertainment_spending_goal(username: str, db: Session = Depends(get_db)):
-    user_instance = db.query(User).filter(User.username == username).first()
-    if not user_instance:
-       raise HTTPException(status_code=404, detail="User not found")
-    return {"entertainment_spending_goal": user_instance.entertainment_spending_goal}
+async def get_entertainment_spending_goal(user_id: int = Depends(current_user_id), db: AsyncSession = Depends(get_async_db)):
+    return {"entertainment_spending_goal": await stored_metric(db, user_id, ENTERTAINMENT, "spending_goal")}
 
 @app.get("/get_travel_spending_goal")
-def get_travel_spending_goal(username: str, db: Session = Depends(get_db)):
-    user_instance = db.query(User).filter(User.username == username).first()
-    if not user_instance:
-       raise HTTPException(status_code=404, detail="User not found")
-    return {"travel_spending_goal": user_instance.travel_spending_goal}
+async def get_travel_spending_goal(user_id: int = Depends(current_user_id), db: AsyncSession = Depends(get_async_db)):
+    return {"travel_spending_goal": await stored_metric(db, user_id, TRAVEL, "spending_goal")}
+
+# ------------------------------------------------------------------
+# Generic per-category metrics, for any Plaid category
+# ------------------------------------------------------------------
+def metric_values(values):
+    return {"spending": values["actual"], "spending_goal": values["goal"], "predicted": values["predicted"]}
+
+@app.get("/category_metrics")
+async def get_category_metrics(
+    user_id: int = Depends(current_user_id),
+    month: Optional[date] = None,  # any day of the month; this month when omitted
+    categories: Optional[str] = None,  # comma-separated; every category when omitted
+    db: AsyncSession = Depends(get_async_db),
+):
+    first_day, _ = month_bounds(month)
+    names = [name.strip() for name in categories.split(",") if name.strip()] if categories else None
+    metrics = await read_metrics_async(db, user_id, first_day, names)
+    total = metrics.pop(ALL_CATEGORIES, None)  # across primary categories
+
+    return {"message": "Category metrics retrieved successfully", "month": first_day, "metrics": metrics, "total": total}
+
+@app.get("/category_metrics/history")
+async def get_category_metrics_history(
+    category: str,
+    months: int = Query(12, ge=1, le=120),
+    user_id: int = Depends(current_user_id),
+    db: AsyncSession = Depends(get_async_db),
+):
+    since = month_bounds()[0] - relativedelta(months=months - 1)
+    history = await metrics_history_async(db, user_id, category, since)
+    return {"message": "Category history retrieved successfully", "category": category, "history": history}
+
+from app.snapshot import read_snapshot, snapshot_info
+
+# Month-by-month spending over a long range, from the user's analytics snapshot (written by
+# python -m app.snapshot) so the scan stays off the live database. Users without a snapshot
+# are read from the database instead; "as_of" says how fresh a snapshot answer is.
+@app.get("/spending_report")
+def get_spending_report(
+    months: int = Query(12, ge=1, le=120),
+    user: User = Depends(current_user),
+    db: Session = Depends(get_db),
+):
+    since = month_bounds()[0] - relativedelta(months=months - 1)
+    info = snapshot_info(user.id)
+    frame = read_snapshot(user.id, since) if info is not None else None
+    if frame is None:  # no snapshot, or it was being swapped
+        info = None
+        frame = load_frame(db, user.id, since)
+    periods, totals, by_category = frame.totals_by_category("M")
+    return {
+        "message": "Spending report retrieved successfully",
+        "source": "snapshot" if info is not None else "database",
+        "as_of": info["written_at"] if info is not None else None,
+        "months": [str(period) for period in periods],
+        "total": totals.tolist(),
+        "categories": {category: values.tolist() for category, values in by_category.items()},
+    }
+
+@app.post("/category_metrics/refresh")
+def refresh_category_metrics(user: User = Depends(current_user), db: Session = Depends(get_db)):
+    forecast = refresh_forecast(db, user)
+    total = forecast.pop(ALL_CATEGORIES)
+    return {
+        "message": "Category metrics updated",
+        "metrics": {category: metric_values(values) for category, values in forecast.items()},
+        "total": metric_values(total),
+    }
+
+from app.schemas.dashboard import DashboardResponse, SavingGoal, CategorySpending
+
+DASHBOARD_FIELDS = set(DashboardResponse.model_fields)
+
+# Everything the home screen shows in one request: one user lookup, one metrics query
+# and one rollup query for the graph. ?fields=bank_balance,goal returns just those fields.
+@app.get("/dashboard", response_model=DashboardResponse, response_model_exclude_unset=True)
+async def get_dashboard(username: str, fields: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
+    selected = {field.strip() for field in fields.split(",") if field.strip()} if fields else DASHBOARD_FIELDS
+    unknown = selected - DASHBOARD_FIELDS
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    user = await fetch_user(db, username)
+
+    values = {}
+    if "bank_balance" in selected:
+        values["bank_balance"] = user.checkings
+    if "savings_balance" in selected:
+        values["savings_balance"] = user.savings
+    if "goal" in selected:
+        values["goal"] = None if user.saving_goal is None else SavingGoal(
+            amount=user.amount, time_months=user.time_months, saving_goal=user.saving_goal
+        )
+    if "categories" in selected or "predicted_spending" in selected:
+        metrics = await read_metrics_async(db, user.id, month_bounds()[0])
+        total = metrics.pop(ALL_CATEGORIES, {})
+        if "categories" in selected:
+            values["categories"] = {category: CategorySpending(**metric) for category, metric in metrics.items()}
+        if "predicted_spending" in selected:
+            values["predicted_spending"] = total.get("predicted")
+    if "cumulative_spending" in selected:
+        first_day = datetime.now().date().replace(day=1)
+        values["cumulative_spending"] = await graph_series(db, user.id, ALL_CATEGORIES, first_day)
+
+    return DashboardResponse(**values)
 
 @app.post("/simulate_income")
-def simulate_income(username: str, amt: float, db: Session = Depends(get_db)):
-    user_instance = db.query(User).filter(User.username == username).first()
-    if not user_instance:
-        raise HTTPException(status_code=404, detail="User not found")
+def simulate_income(username: str, amt: float, idempotency_key: Optional[str] = IdempotencyKeyHeader,
+                    user_instance: User = Depends(current_user), db: Session = Depends(get_db)):
     
     if amt < 0:
         raise HTTPException(status_code=400, detail="Amount cannot be negative")
+    fingerprint = request_fingerprint("/simulate_income", {"username": username, "amt": amt})
+    replay = stored_response(db, user_instance.id, idempotency_key, fingerprint)
+    if replay is not None:
+        return replay
         
     # Add income to checkings
-    if user_instance.checkings is None:
-        user_instance.checkings = amt
-    else:
-        user_instance.checkings += amt
-    
-    db.commit()
-    return {"message": "Income added to checkings", "amount": amt}
+    deposit(db, user_instance.id, CHECKINGS, amt)
+    data_versions.bump(db, user_instance.id)
+    content = {"message": "Income added to checkings", "amount": amt}
+    replay = commit_with_key(db, user_instance.id, idempotency_key, fingerprint, content)
+    if replay is not None:
+        return replay
+    return content
 
 @app.post("/transfer_to_savings") 
-def transfer_to_savings(username: str, transfer_amt: float, db: Session = Depends(get_db)):
-    user_instance = db.query(User).filter(User.username == username).first()
-    if not user_instance:
-        raise HTTPException(status_code=404, detail="User not found")
+def transfer_to_savings(username: str, transfer_amt: float, idempotency_key: Optional[str] = IdempotencyKeyHeader,
+                        user_instance: User = Depends(current_user), db: Session = Depends(get_db)):
         
     if transfer_amt < 0:
         raise HTTPException(status_code=400, detail="Transfer amount cannot be negative")
+    fingerprint = request_fingerprint("/transfer_to_savings", {"username": username, "transfer_amt": transfer_amt})
+    replay = stored_response(db, user_instance.id, idempotency_key, fingerprint)
+    if replay is not None:
+        return replay
         
-    if user_instance.checkings < transfer_amt:
+    # Transfer money from checkings to savings; the balance check is part of the UPDATE.
+    # A rejected transfer is not stored, so a retry with the same key checks again.
+    try:
+        balances = transfer(db, user_instance.id, CHECKINGS, SAVINGS, transfer_amt)
+    except InsufficientFunds:
+        db.rollback()
         raise HTTPException(status_code=400, detail="Insufficient funds in checkings")
-        
-    # Transfer money from checkings to savings
-    user_instance.checkings -= transfer_amt
-    if user_instance.savings is None:
-        user_instance.savings = transfer_amt
-    else:
-        user_instance.savings += transfer_amt
-        
-    db.commit()
-    return {
+
+    content = {
         "message": "Transfer successful",
         "amount": transfer_amt,
-        "new_checkings_balance": user_instance.checkings,
-        "new_savings_balance": user_instance.savings
+        "new_checkings_balance": balances[CHECKINGS],
+        "new_savings_balance": balances[SAVINGS]
     }
+    data_versions.bump(db, user_instance.id)
+    replay = commit_with_key(db, user_instance.id, idempotency_key, fingerprint, content)
+    if replay is not None:
+        return replay
+    return content
 
 
 
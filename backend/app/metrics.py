@@ -0,0 +1,93 @@
+from sqlalchemy import and_, bindparam, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models.metrics import UserCategoryMetrics
+
+METRIC_FIELDS = ("spending", "spending_goal", "predicted")
+
+metrics_table = UserCategoryMetrics.__table__
+
+
+def metrics_query(user_id: int, month=None, categories=None):
+    """SELECT of (category, month, *METRIC_FIELDS) rows; month and categories are optional filters."""
+    c = metrics_table.c
+    query = select(c.category, c.month, *(c[field] for field in METRIC_FIELDS)).where(c.user_id == user_id)
+    if month is not None:
+        query = query.where(c.month == month)
+    if categories is not None:
+        query = query.where(c.category.in_(categories))
+    return query.order_by(c.category, c.month)
+
+
+def _by_category(rows):
+    return {row.category: {field: row._mapping[field] for field in METRIC_FIELDS} for row in rows}
+
+
+def _history(rows):
+    return [{"month": row.month, **{field: row._mapping[field] for field in METRIC_FIELDS}} for row in rows]
+
+
+def read_metrics(db: Session, user_id: int, month, categories=None):
+    """{category: {spending, spending_goal, predicted}} for one month, in one query."""
+    return _by_category(db.execute(metrics_query(user_id, month, categories)))
+
+
+async def read_metrics_async(db: AsyncSession, user_id: int, month, categories=None):
+    return _by_category(await db.execute(metrics_query(user_id, month, categories)))
+
+
+async def metrics_history_async(db: AsyncSession, user_id: int, category: str, since=None):
+    """Month-by-month metrics of one category, oldest first, from `since` (a month start) on."""
+    query = metrics_query(user_id, categories=[category])
+    if since is not None:
+        query = query.where(metrics_table.c.month >= since)
+    return _history(await db.execute(query))
+
+
+def _upsert_statement(dialect_name: str):
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        return None
+    statement = dialect_insert(metrics_table)
+    return statement.on_conflict_do_update(
+        index_elements=["user_id", "category", "month"],
+        set_={field: statement.excluded[field] for field in METRIC_FIELDS},
+    )
+
+
+def write_metrics(db: Session, user_id: int, month, values):
+    """Store {category: {spending, spending_goal, predicted}} for one month. Does not commit.
+
+    Only rows whose values differ from what is stored are written. Returns how many.
+    """
+    existing = read_metrics(db, user_id, month, list(values))
+    rows = [
+        {"user_id": user_id, "category": category, "month": month, **{field: fields[field] for field in METRIC_FIELDS}}
+        for category, fields in values.items()
+        if existing.get(category) != {field: fields[field] for field in METRIC_FIELDS}
+    ]
+    if not rows:
+        return 0
+
+    statement = _upsert_statement(db.get_bind().dialect.name)
+    if statement is not None:
+        db.execute(statement, rows)
+        return len(rows)
+
+    # No ON CONFLICT: executemany UPDATE for stored categories, INSERT for the rest
+    updates = [dict(row, key=row["category"]) for row in rows if row["category"] in existing]
+    inserts = [row for row in rows if row["category"] not in existing]
+    if updates:
+        c = metrics_table.c
+        db.execute(
+            update(metrics_table)
+            .where(and_(c.user_id == user_id, c.month == month, c.category == bindparam("key")))
+            .values({field: bindparam(field) for field in METRIC_FIELDS}),
+            updates,
+        )
+    if inserts:
+        db.execute(insert(metrics_table), inserts)
+    return len(rows)
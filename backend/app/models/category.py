@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
+from app.database import Base
+
+
+class TransactionCategory(Base):
+    __tablename__ = "transaction_categories"
+
+    transaction_id = Column(Integer, ForeignKey("transactions.id", ondelete="CASCADE"), primary_key=True)
+    category = Column(String, primary_key=True)
+    depth = Column(Integer, nullable=False)  # 0 = primary Plaid category, 1 = secondary, ...
+
+    __table_args__ = (
+        Index("ix_transaction_categories_category_transaction", "category", "transaction_id"),
+        Index("ix_transaction_categories_category_depth", "category", "depth"),
+    )
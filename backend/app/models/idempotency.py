@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Index
+from app.database import Base
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    # The response a write endpoint gave to the first request carrying a client's Idempotency-Key
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    key = Column(String, primary_key=True)
+    fingerprint = Column(String, nullable=False)  # sha256 of the endpoint and its parameters
+    status_code = Column(Integer, nullable=False)
+    response = Column(Text, nullable=False)  # JSON body, replayed byte for byte
+    created_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_idempotency_keys_user_created", "user_id", "created_at"),
+    )
@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Index
+from app.database import Base
+
+
+class BalanceEntry(Base):
+    __tablename__ = "balance_ledger"
+
+    # One signed change to a user's checkings or savings balance. Rows are only ever appended.
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    account = Column(String, nullable=False)  # "checkings" or "savings"
+    amount = Column(Float, nullable=False)
+    kind = Column(String, nullable=False)  # income, transfer or set
+    transfer_id = Column(String, nullable=True)  # pairs the two legs of a transfer
+    created_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_balance_ledger_user_account_id", "user_id", "account", "id"),
+    )
+
+
+class BalanceSnapshot(Base):
+    __tablename__ = "balance_snapshots"
+
+    # An account's balance right after ledger entry `ledger_id` (0: before its first entry)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    account = Column(String, primary_key=True)
+    ledger_id = Column(Integer, primary_key=True)
+    balance = Column(Float, nullable=False)
+    created_at = Column(DateTime, nullable=False)
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Date, Index
+from app.database import Base
+
+
+class UserCategoryMetrics(Base):
+    __tablename__ = "user_category_metrics"
+
+    # A user's budget figures for one Plaid category in one month, as of the last forecast.
+    # Category "*" holds the totals across primary categories.
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    category = Column(String, primary_key=True)
+    month = Column(Date, primary_key=True)  # first day of the month
+    spending = Column(Float, nullable=True)  # actual spend so far
+    spending_goal = Column(Float, nullable=True)
+    predicted = Column(Float, nullable=True)  # predicted month-end spend
+
+    __table_args__ = (
+        Index("ix_user_category_metrics_user_month", "user_id", "month"),
+    )
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from app.database import Base
+
+
+class PlaidSyncState(Base):
+    __tablename__ = "plaid_sync_state"
+
+    # Where /transactions/sync left off for a user's linked item
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    cursor = Column(String, nullable=True)  # None until the first full pull completes
+    last_synced_at = Column(DateTime, nullable=True)
+    added = Column(Integer, nullable=False, default=0)  # counts from the last sync
+    modified = Column(Integer, nullable=False, default=0)
+    removed = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Date
+from app.database import Base
+
+
+class CategoryRegressionState(Base):
+    __tablename__ = "category_regression_state"
+
+    # Running sums of the (day, cumulative spend) points of one category in one month
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    category = Column(String, primary_key=True)
+    month = Column(Date, primary_key=True)  # first day of the month
+    n = Column(Integer, nullable=False, default=0)
+    sum_x = Column(Float, nullable=False, default=0)
+    sum_y = Column(Float, nullable=False, default=0)
+    sum_xy = Column(Float, nullable=False, default=0)
+    sum_xx = Column(Float, nullable=False, default=0)
+    last_day = Column(Integer, nullable=False, default=0)  # latest day-of-month with spending
+    last_total = Column(Float, nullable=False, default=0)  # cumulative spend at last_day
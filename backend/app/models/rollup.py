@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Date
+from app.database import Base
+
+
+class DailyCategorySpend(Base):
+    __tablename__ = "daily_category_spend"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    category = Column(String, primary_key=True)  # "*" holds the user's total across all categories
+    day = Column(Date, primary_key=True)
+    amount = Column(Float, nullable=False, default=0)
+    txn_count = Column(Integer, nullable=False, default=0)
@@ -1,17 +1,35 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Date
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Date, Index, Boolean
+from sqlalchemy.orm import relationship
 from app.database import Base
+from app.models.category import TransactionCategory
 
 class Transaction(Base):
     __tablename__ = "transactions"
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     transaction_id = Column(String, unique=True, index=True)
     account_id = Column(String, index=True)
     name = Column(String)
     merchant_name = Column(String, nullable=True)
     amount = Column(Float)
     date = Column(Date)
-    category = Column(String)  # JSON Stringified Array
+    category = Column(String)  # JSON Stringified Array, kept for API responses
     payment_channel = Column(String)
     currency = Column(String, nullable=True)
+    is_fraud = Column(Boolean, nullable=True)  # None until scored by the fraud model
 
+    __table_args__ = (
+        # Every per-user query filters on the owner and a date range
+        Index("ix_transactions_user_date", "user_id", "date"),
+        # /transactions filtered to one account; id rides along as the rowid for keyset pages
+        Index("ix_transactions_user_account_date", "user_id", "account_id", "date"),
+    )
+
+    # Normalized, indexed copy of `category` used for filtering in SQL
+    categories = relationship(
+        TransactionCategory,
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        order_by=TransactionCategory.depth,
+    )
@@ -18,15 +18,8 @@ class User(Base):
     is_alert = Column(Boolean, nullable=True)
     alert_transaction = Column(String, nullable=True)
     access_token = Column(String, nullable=True)
+    plaid_item_id = Column(String, nullable=True, index=True)  # matches webhooks to the user
     checkings = Column(Float, nullable=True)
     savings = Column(Float, nullable=True)
-    food_spending = Column(Float, nullable=True)
-    entertainment_spending = Column(Float, nullable=True)
-    travel_spending = Column(Float, nullable=True)
-    food_spending_goal = Column(Float, nullable=True)
-    entertainment_spending_goal = Column(Float, nullable=True)
-    travel_spending_goal = Column(Float, nullable=True)
-    food_spending_predicted = Column(Float, nullable=True)
-    entertainment_spending_predicted = Column(Float, nullable=True)
-    travel_spending_predicted = Column(Float, nullable=True)
 
+    data_version = Column(Integer, nullable=True)  # bumped by every write to the user's data, see app.response_cache
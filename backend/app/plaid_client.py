@@ -0,0 +1,174 @@
+import os
+import time
+import random
+import asyncio
+import threading
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PLAID_CLIENT_ID = os.getenv("PLAID_CLIENT_ID")
+PLAID_SECRET = os.getenv("PLAID_SECRET")
+# Point at app.fake_plaid (e.g. http://127.0.0.1:8001) to run without Plaid credentials
+PLAID_BASE_URL = os.getenv("PLAID_BASE_URL", "https://sandbox.plaid.com")
+
+PLAID_TIMEOUT_SECONDS = float(os.getenv("PLAID_TIMEOUT_SECONDS", "30"))  # per request, once connected
+PLAID_CONNECT_TIMEOUT_SECONDS = float(os.getenv("PLAID_CONNECT_TIMEOUT_SECONDS", "5"))
+PLAID_MAX_RETRIES = int(os.getenv("PLAID_MAX_RETRIES", "4"))
+PLAID_POOL_SIZE = int(os.getenv("PLAID_POOL_SIZE", "20"))  # kept-alive connections to Plaid
+
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 16
+
+# Plaid errors worth retrying; anything else is returned to the caller straight away
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+RETRYABLE_ERROR_CODES = {"RATE_LIMIT_EXCEEDED", "INTERNAL_SERVER_ERROR", "PLANNED_MAINTENANCE", "INSTITUTION_DOWN"}
+
+# Calls that are safe to repeat after Plaid may have acted on them (a repeated
+# /link/token/create just leaves an unused token to expire). Everything else, such as
+# /item/public_token/exchange, is retried only when Plaid can't have seen the request:
+# it never went out, or was turned away by rate limiting.
+IDEMPOTENT_PATHS = {
+    "/transactions/sync", "/accounts/get", "/accounts/balance/get", "/item/get",
+    "/webhook_verification_key/get", "/link/token/create",
+}
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class PlaidError(Exception):
+    def __init__(self, status_code: int, body: dict):
+        self.status_code = status_code
+        self.body = body
+        self.error_code = body.get("error_code")
+        super().__init__(f"Plaid error {status_code}: {body}")
+
+
+def backoff_delay(attempt: int):
+    """Exponential backoff with full jitter: uniform in [0, min(max, base * 2^attempt)].
+
+    The jitter spreads out clients that failed together, so they don't retry in lockstep.
+    """
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+def _retryable(path: str, response: httpx.Response = None, error: Exception = None):
+    idempotent = path in IDEMPOTENT_PATHS
+    if error is not None:
+        return isinstance(error, NOT_SENT_ERRORS) or (idempotent and isinstance(error, httpx.TransportError))
+    if response.status_code == 429:
+        return True
+    if not idempotent:
+        return False
+    if response.status_code in RETRYABLE_STATUS:
+        return True
+    try:
+        return response.json().get("error_code") in RETRYABLE_ERROR_CODES
+    except ValueError:
+        return False
+
+
+def _result(response: httpx.Response):
+    try:
+        body = response.json()
+    except ValueError:
+        body = {"error_message": response.text}
+    if response.status_code >= 400:
+        raise PlaidError(response.status_code, body)
+    return body
+
+
+def _client_options(pool_size: int, timeout: float):
+    return {
+        "base_url": PLAID_BASE_URL,
+        "timeout": httpx.Timeout(timeout, connect=PLAID_CONNECT_TIMEOUT_SECONDS),
+        "limits": httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+    }
+
+
+class PlaidClient:
+    """Thread-safe Plaid client over one pooled keep-alive connection set.
+
+    post() adds the credentials, times out instead of hanging, and retries with jittered
+    exponential backoff: rate limits and failed connections always, 5xx responses and
+    dropped or timed-out requests only for IDEMPOTENT_PATHS. The
+    connection pool (and its TLS context) is created on the first call, not at import.
+    """
+
+    def __init__(self, pool_size: int = PLAID_POOL_SIZE, timeout: float = PLAID_TIMEOUT_SECONDS,
+                 max_retries: int = PLAID_MAX_RETRIES, **http_options):
+        self.max_retries = max_retries
+        self._options = {**_client_options(pool_size, timeout), **http_options}
+        self._http = None
+        self._lock = threading.Lock()
+
+    def _client(self):
+        if self._http is None:
+            with self._lock:
+                if self._http is None:
+                    self._http = httpx.Client(**self._options)
+        return self._http
+
+    def post(self, path: str, payload: dict):
+        payload = {"client_id": PLAID_CLIENT_ID, "secret": PLAID_SECRET, **payload}
+        http = self._client()
+        for attempt in range(self.max_retries + 1):
+            response = error = None
+            try:
+                response = http.post(path, json=payload)
+            except httpx.HTTPError as e:
+                error = e
+            if attempt == self.max_retries or not _retryable(path, response, error):
+                if error is not None:
+                    raise error
+                return _result(response)
+            time.sleep(backoff_delay(attempt))
+
+    def close(self):
+        if self._http is not None:
+            self._http.close()
+            self._http = None
+
+
+class AsyncPlaidClient:
+    """asyncio counterpart of PlaidClient, for `async def` endpoints and fan-out jobs."""
+
+    def __init__(self, pool_size: int = PLAID_POOL_SIZE, timeout: float = PLAID_TIMEOUT_SECONDS,
+                 max_retries: int = PLAID_MAX_RETRIES, **http_options):
+        self.max_retries = max_retries
+        self._options = {**_client_options(pool_size, timeout), **http_options}
+        self._http = None
+        self._loop = None
+
+    def _client(self):
+        # httpx.AsyncClient connections belong to the event loop that opened them
+        loop = asyncio.get_running_loop()
+        if self._http is None or self._loop is not loop:
+            self._http = httpx.AsyncClient(**self._options)
+            self._loop = loop
+        return self._http
+
+    async def post(self, path: str, payload: dict):
+        payload = {"client_id": PLAID_CLIENT_ID, "secret": PLAID_SECRET, **payload}
+        http = self._client()
+        for attempt in range(self.max_retries + 1):
+            response = error = None
+            try:
+                response = await http.post(path, json=payload)
+            except httpx.HTTPError as e:
+                error = e
+            if attempt == self.max_retries or not _retryable(path, response, error):
+                if error is not None:
+                    raise error
+                return _result(response)
+            await asyncio.sleep(backoff_delay(attempt))
+
+    async def close(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+
+# Shared per process so connections (and their TLS sessions) are reused across requests
+plaid_client = PlaidClient()
+async_plaid_client = AsyncPlaidClient()
@@ -0,0 +1,299 @@
+import os
+import time
+import argparse
+import threading
+import traceback
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
+from app.database import SessionLocal, upgrade_schema
+from app.models.user import User
+from app.models.transaction import Transaction
+from app.models.plaid_sync import PlaidSyncState
+from app.categories import parse_categories, category_rows
+from app.ingest import CHUNK_SIZE, transaction_fields, ingest_pages
+from app.rollup import record_transaction, forget_transaction, rebuild_rollup
+from app.regression import rebuild_all_states
+from app.recompute import recompute_worker
+from app.plaid_client import PlaidError, plaid_client
+from app.response_cache import data_versions
+
+SYNC_PAGE_SIZE = int(os.getenv("PLAID_SYNC_PAGE_SIZE", "500"))  # Plaid's maximum
+SYNC_INTERVAL_SECONDS = float(os.getenv("PLAID_SYNC_INTERVAL_SECONDS", "0"))  # 0 disables the scheduled job
+# Items synced in parallel by sync_all. Fetches overlap; SQLite still takes one writer at a time.
+SYNC_WORKERS = int(os.getenv("PLAID_SYNC_WORKERS", "4"))
+MAX_PAGINATION_RESTARTS = 3
+
+# Above this many changed rows the user's rollups are rebuilt once, instead of being
+# adjusted row by row (an initial pull can be thousands of transactions)
+REBUILD_THRESHOLD = 50
+
+LOOKUP_CHUNK = 500  # transaction_ids per IN (...) query
+
+
+class PlaidSyncError(Exception):
+    pass
+
+
+class PaginationRestart(Exception):
+    """The item changed mid-pagination; Plaid invalidated the pages returned so far."""
+
+
+def sync_pages(access_token: str, cursor: str = None, page_size: int = SYNC_PAGE_SIZE):
+    """Yield /transactions/sync pages from `cursor` until has_more is false.
+
+    Raises PaginationRestart when everything yielded so far has to be discarded and the
+    pull restarted from the original cursor.
+    """
+    while True:
+        payload = {"access_token": access_token, "count": page_size}
+        if cursor:
+            payload["cursor"] = cursor
+        try:
+            result = plaid_client.post("/transactions/sync", payload)
+        except PlaidError as e:
+            if e.error_code == "TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION":
+                raise PaginationRestart()
+            raise PlaidSyncError(f"Error syncing transactions: {e.body}")
+
+        yield result
+        if not result["has_more"]:
+            return
+        cursor = result["next_cursor"]
+
+
+def load_existing(db: Session, user_id: int, transaction_ids):
+    """The user's own transactions among `transaction_ids`, by Plaid id, with their categories."""
+    existing = {}
+    for start in range(0, len(transaction_ids), LOOKUP_CHUNK):
+        chunk = transaction_ids[start:start + LOOKUP_CHUNK]
+        for tx in db.query(Transaction).options(selectinload(Transaction.categories)).filter(
+            Transaction.user_id == user_id, Transaction.transaction_id.in_(chunk)
+        ):
+            existing[tx.transaction_id] = tx
+    return existing
+
+
+def owned_elsewhere(db: Session, user_id: int, transaction_ids):
+    """The ids among `transaction_ids` that already belong to another user (or to none)."""
+    taken = set()
+    for start in range(0, len(transaction_ids), LOOKUP_CHUNK):
+        chunk = transaction_ids[start:start + LOOKUP_CHUNK]
+        taken.update(db.scalars(select(Transaction.transaction_id).where(
+            Transaction.transaction_id.in_(chunk), Transaction.user_id.is_distinct_from(user_id),
+        )))
+    return taken
+
+
+def apply_changes(db: Session, user_id: int, upserts, removed):
+    """Upsert added/modified transactions and delete removed ones through the ORM. Does not commit.
+
+    Rollups and regression sums are adjusted per row, like /add_transaction does. Meant
+    for small deltas; ingest_pages handles bulk pulls. As there, a transaction_id that
+    belongs to another user is skipped: it is neither taken over nor deleted.
+    Returns the number of rows written or deleted.
+    """
+    latest = {tx["transaction_id"]: tx for tx in upserts}
+    removed_ids = [tx["transaction_id"] for tx in removed]
+    for transaction_id in removed_ids:
+        latest.pop(transaction_id, None)  # e.g. a pending transaction replaced by its posted one
+    existing = load_existing(db, user_id, list(latest) + removed_ids)
+    taken = owned_elsewhere(db, user_id, [transaction_id for transaction_id in latest if transaction_id not in existing])
+
+    changed = 0
+    for transaction_id, tx in latest.items():
+        if transaction_id in taken:
+            continue
+        fields = transaction_fields(tx, user_id)
+        categories = parse_categories(tx.get("category"))
+        row = existing.get(transaction_id)
+        if row is None:
+            row = Transaction(**fields, categories=category_rows(categories))
+            db.add(row)
+        else:
+            forget_transaction(db, row)
+            for column, value in fields.items():
+                if column != "user_id":  # a transaction never changes owner
+                    setattr(row, column, value)
+            if [c.category for c in row.categories] != categories:
+                row.categories = category_rows(categories)
+        record_transaction(db, row)
+        changed += 1
+
+    for transaction_id in removed_ids:
+        row = existing.get(transaction_id)
+        if row is not None:
+            forget_transaction(db, row)
+            db.delete(row)
+            changed += 1
+    return changed
+
+
+def _pull(db: Session, user_id: int, access_token: str, cursor, chunk_size: int):
+    """Apply every page since `cursor`; returns (stats, next_cursor). Does not commit."""
+    pages = sync_pages(access_token, cursor)
+    first = next(pages)
+    changes = len(first["added"]) + len(first["modified"]) + len(first["removed"])
+
+    if cursor is not None and not first["has_more"] and changes <= REBUILD_THRESHOLD:
+        start = time.perf_counter()
+        rows = apply_changes(db, user_id, first["added"] + first["modified"], first["removed"])
+        seconds = time.perf_counter() - start
+        stats = {
+            "added": len(first["added"]), "modified": len(first["modified"]), "removed": len(first["removed"]),
+            "rows": rows, "seconds": seconds, "rows_per_second": rows / seconds if seconds else 0.0,
+        }
+        return stats, first["next_cursor"]
+
+    last = first
+
+    def stream():
+        nonlocal last
+        yield first
+        for page in pages:
+            last = page
+            yield page
+
+    stats = ingest_pages(db, user_id, stream(), chunk_size)
+    if stats["rows"]:
+        rebuild_rollup(db, user_id)
+        rebuild_all_states(db, user_id)
+    return stats, last["next_cursor"]
+
+
+def sync_user(db: Session, user: User, chunk_size: int = CHUNK_SIZE):
+    """Pull the user's transaction changes since the stored cursor and apply them in one commit.
+
+    Small deltas go through the ORM with per-row rollup upkeep. An initial pull or a large
+    delta is streamed page by page into chunked bulk upserts, and the user's rollups are
+    rebuilt once at the end.
+    """
+    if not user.access_token:
+        raise PlaidSyncError(f"User {user.username} has no linked Plaid item")
+    user_id, username, access_token = user.id, user.username, user.access_token
+
+    for _ in range(MAX_PAGINATION_RESTARTS + 1):
+        state = db.get(PlaidSyncState, user_id)
+        if state is None:
+            state = PlaidSyncState(user_id=user_id)
+            db.add(state)
+        try:
+            stats, next_cursor = _pull(db, user_id, access_token, state.cursor, chunk_size)
+            break
+        except PaginationRestart:
+            db.rollback()
+    else:
+        raise PlaidSyncError("Item kept changing during pagination, try again later")
+
+    # The cursor only advances together with the rows it covers
+    state.cursor = next_cursor
+    state.last_synced_at = datetime.now()
+    state.added, state.modified, state.removed = stats["added"], stats["modified"], stats["removed"]
+    if stats["rows"]:
+        data_versions.bump(db, user_id)
+    db.commit()
+
+    if stats["rows"]:
+        recompute_worker.schedule(user_id)
+    return {"username": username, **stats}
+
+
+def sync_all(session_factory=SessionLocal, username: str = None, chunk_size: int = CHUNK_SIZE,
+             workers: int = SYNC_WORKERS):
+    """Sync every user with a linked item, `workers` at a time, each in its own session.
+
+    One failure doesn't stop the rest; it is logged and retried on the next run.
+    """
+    db = session_factory()
+    try:
+        query = db.query(User.id).filter(User.access_token.isnot(None))
+        if username is not None:
+            query = query.filter(User.username == username)
+        user_ids = [row.id for row in query]
+    finally:
+        db.close()
+
+    def sync_one(user_id):
+        db = session_factory()
+        try:
+            return sync_user(db, db.get(User, user_id), chunk_size)
+        except Exception as e:
+            print(f"Error syncing transactions for user {user_id}: {str(e)}")
+            traceback.print_exc()
+            db.rollback()
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return [result for result in pool.map(sync_one, user_ids) if result is not None]
+
+
+class SyncScheduler:
+    """Daemon thread running sync_all every `interval` seconds until stop()."""
+
+    def __init__(self, interval: float = SYNC_INTERVAL_SECONDS, session_factory=SessionLocal):
+        self.interval = interval
+        self.session_factory = session_factory
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="plaid-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            sync_all(self.session_factory)
+            self._stopping.wait(self.interval)
+
+
+sync_scheduler = SyncScheduler()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental Plaid transaction sync")
+    parser.add_argument("username", nargs="?", help="sync only this user (default: every linked user)")
+    parser.add_argument("--every", type=float, metavar="SECONDS", help="keep running, syncing on this interval")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="rows per bulk upsert statement")
+    args = parser.parse_args()
+
+    upgrade_schema()
+    while args.every:
+        for result in sync_all(username=args.username, chunk_size=args.chunk_size):
+            print(describe(result))
+        recompute_worker.flush()
+        time.sleep(args.every)
+
+    if args.username is None:
+        for result in sync_all(chunk_size=args.chunk_size):
+            print(describe(result))
+        return
+
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.username == args.username).first()
+        if not user:
+            raise SystemExit(f"User {args.username} not found")
+        print(describe(sync_user(db, user, args.chunk_size)))
+    finally:
+        db.close()
+
+
+def describe(result):
+    return (
+        f"{result['username']}: {result['added']} added, {result['modified']} modified, "
+        f"{result['removed']} removed ({result['rows_per_second']:.0f} rows/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
+    recompute_worker.stop()
+    print("Plaid transactions are in sync.")
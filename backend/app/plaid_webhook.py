@@ -0,0 +1,196 @@
+import os
+import hmac
+import time
+import hashlib
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from app.database import SessionLocal
+from app.models.user import User
+from app.plaid_client import async_plaid_client
+from app.plaid_sync import SYNC_WORKERS, sync_user
+
+# Public URL of /plaid/webhook, registered with Plaid when an item is linked
+PLAID_WEBHOOK_URL = os.getenv("PLAID_WEBHOOK_URL")
+# Set to 0 only for local development against an endpoint that doesn't sign its webhooks
+WEBHOOK_VERIFY = os.getenv("PLAID_WEBHOOK_VERIFY", "1") == "1"
+WEBHOOK_MAX_AGE_SECONDS = 5 * 60  # Plaid's recommendation for the JWT's iat
+# Events for one item within this window after the first one share a single sync
+WEBHOOK_DEBOUNCE_SECONDS = float(os.getenv("PLAID_WEBHOOK_DEBOUNCE_SECONDS", "1"))
+
+# TRANSACTIONS webhooks that mean /transactions/sync has something new for the item
+SYNC_WEBHOOK_CODES = {"SYNC_UPDATES_AVAILABLE", "DEFAULT_UPDATE"}
+
+# A cached verification key is fetched again once older than this, so a key Plaid has
+# since expired or rotated out stops being trusted. Matches the token's iat window.
+WEBHOOK_KEY_TTL_SECONDS = float(os.getenv("PLAID_WEBHOOK_KEY_TTL_SECONDS", str(WEBHOOK_MAX_AGE_SECONDS)))
+
+_verification_keys = {}  # key_id -> (monotonic fetch time, JWK from /webhook_verification_key/get)
+
+
+class WebhookVerificationError(Exception):
+    pass
+
+
+async def verification_key(key_id: str):
+    cached = _verification_keys.get(key_id)
+    if cached is not None and time.monotonic() - cached[0] < WEBHOOK_KEY_TTL_SECONDS:
+        return cached[1]
+    key = (await async_plaid_client.post("/webhook_verification_key/get", {"key_id": key_id}))["key"]
+    _verification_keys[key_id] = (time.monotonic(), key)
+    return key
+
+
+async def verify_webhook(body: bytes, token: str):
+    """Check the Plaid-Verification JWT against the raw request body; returns the body's SHA-256.
+
+    The JWT must be ES256-signed by a current Plaid key, at most five minutes old, and carry
+    the hash of exactly this body.
+    """
+    digest = hashlib.sha256(body).hexdigest()
+    if not WEBHOOK_VERIFY:
+        return digest
+    if not token:
+        raise WebhookVerificationError("Missing Plaid-Verification header")
+
+    import jwt  # PyJWT, with cryptography for ES256
+
+    try:
+        header = jwt.get_unverified_header(token)
+    except jwt.InvalidTokenError as e:
+        raise WebhookVerificationError(f"Malformed verification token: {str(e)}")
+    if header.get("alg") != "ES256" or not header.get("kid"):
+        raise WebhookVerificationError("Verification token is not an ES256 Plaid token")
+
+    key = await verification_key(header["kid"])
+    if key.get("expired_at"):
+        raise WebhookVerificationError("Verification key has expired")
+    try:
+        claims = jwt.decode(token, jwt.PyJWK(key).key, algorithms=["ES256"], options={"require": ["iat"]})
+    except jwt.InvalidTokenError as e:
+        raise WebhookVerificationError(f"Invalid verification token: {str(e)}")
+
+    if time.time() - claims["iat"] > WEBHOOK_MAX_AGE_SECONDS:
+        raise WebhookVerificationError("Verification token is too old")
+    if not hmac.compare_digest(str(claims.get("request_body_sha256", "")), digest):
+        raise WebhookVerificationError("Webhook body does not match its signature")
+    return digest
+
+
+class WebhookSyncQueue:
+    """Incremental syncs triggered by webhooks, deduplicated and coalesced per item.
+
+    The first event for an item starts a debounce window and every further event inside it
+    joins the same sync. An event arriving while its item is syncing queues one follow-up
+    sync, since the running one may have fetched before the change. A redelivery of an event
+    the queued or running sync already covers is dropped.
+    """
+
+    def __init__(self, debounce: float = WEBHOOK_DEBOUNCE_SECONDS, workers: int = SYNC_WORKERS,
+                 session_factory=SessionLocal):
+        self.debounce = debounce
+        self.workers = workers
+        self.session_factory = session_factory
+        self.counts = {"queued": 0, "coalesced": 0, "duplicate": 0, "synced": 0}
+        self._cond = threading.Condition()
+        self._due = {}  # item_id -> monotonic time its sync runs
+        self._pending = {}  # item_id -> ids of the events the queued sync covers
+        self._running = {}  # item_id -> ids of the events the running sync covers
+        self._thread = None
+        self._pool = None
+        self._stopping = False
+
+    def enqueue(self, item_id: str, event_id: str):
+        """Queue a sync for the item; returns "queued", "coalesced" or "duplicate"."""
+        with self._cond:
+            if event_id in self._pending.get(item_id, ()) or event_id in self._running.get(item_id, ()):
+                status = "duplicate"
+            elif item_id in self._due:
+                status = "coalesced"
+            else:
+                status = "queued"
+                self._due[item_id] = time.monotonic() + self.debounce
+            if status != "duplicate":
+                self._pending.setdefault(item_id, set()).add(event_id)
+            self.counts[status] += 1
+
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._pool = ThreadPoolExecutor(max_workers=max(1, self.workers), thread_name_prefix="webhook-sync")
+                self._thread = threading.Thread(target=self._run, name="webhook-queue", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+            return status
+
+    def flush(self):
+        """Run every queued sync now, in the calling thread."""
+        with self._cond:
+            item_ids = [item_id for item_id in self._due if item_id not in self._running]
+            for item_id in item_ids:
+                del self._due[item_id]
+                self._running[item_id] = self._pending.pop(item_id, set())
+        for item_id in item_ids:
+            self._sync(item_id)
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+        # Plaid doesn't resend delivered webhooks, so don't drop queued ones
+        self.flush()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopping:
+                    now = time.monotonic()
+                    # An item that is already syncing waits for that sync to finish
+                    waiting = {item_id: due for item_id, due in self._due.items() if item_id not in self._running}
+                    ready = [item_id for item_id, due in waiting.items() if due <= now]
+                    if ready:
+                        break
+                    self._cond.wait(min(waiting.values()) - now if waiting else None)
+                if self._stopping:
+                    return
+                for item_id in ready:
+                    del self._due[item_id]
+                    self._running[item_id] = self._pending.pop(item_id, set())
+            for item_id in ready:
+                self._pool.submit(self._sync, item_id)
+
+    def _sync(self, item_id: str):
+        db = self.session_factory()
+        try:
+            user = db.query(User).filter(User.plaid_item_id == item_id).first()
+            if user is None:
+                print(f"Webhook for unknown Plaid item {item_id} ignored")
+            else:
+                sync_user(db, user)
+                with self._cond:
+                    self.counts["synced"] += 1
+        except Exception as e:
+            # The next webhook or scheduled sync picks the changes up from the stored cursor
+            print(f"Error syncing Plaid item {item_id}: {str(e)}")
+            traceback.print_exc()
+            db.rollback()
+        finally:
+            db.close()
+            with self._cond:
+                self._running.pop(item_id, None)
+                self._cond.notify()
+
+
+webhook_queue = WebhookSyncQueue()
+
+
+def handle_webhook(event: dict, event_id: str):
+    """Queue a sync for the item a TRANSACTIONS update webhook is about; other webhooks are ignored."""
+    if event.get("webhook_type") != "TRANSACTIONS" or event.get("webhook_code") not in SYNC_WEBHOOK_CODES:
+        return "ignored"
+    if not event.get("item_id"):
+        return "ignored"
+    return webhook_queue.enqueue(event["item_id"], event_id)
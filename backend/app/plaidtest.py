@@ -118,143 +118,71 @@
 #------------------------------------------------------------
 
 
-import os
-import json
-import time
-import requests
-import datetime
+import sys
 from sqlalchemy.orm import Session
-from dotenv import load_dotenv
-from app.database import SessionLocal
-from app.models.transaction import Transaction
+from app.database import SessionLocal, upgrade_schema
+from app.models.user import User
+from app.models.plaid_sync import PlaidSyncState
+from app.plaid_client import PlaidError, plaid_client
+from app.plaid_sync import PlaidSyncError, sync_user
+from app.plaid_webhook import PLAID_WEBHOOK_URL
+from app.recompute import recompute_worker
 
-load_dotenv()
-
-PLAID_CLIENT_ID = os.getenv("PLAID_CLIENT_ID")
-PLAID_SECRET = os.getenv("PLAID_SECRET")
-PLAID_SANDBOX_URL = "https://sandbox.plaid.com"
+# Transactions are stored for this user: python -m app.plaidtest [username]
+username = sys.argv[1] if len(sys.argv) > 1 else "user_good"
 
 # Connect to database
+upgrade_schema()
 db: Session = SessionLocal()
-
-### Step 1: Fetch Transactions (Keeping Your Code Intact) ###
-public_token_url = f"{PLAID_SANDBOX_URL}/sandbox/public_token/create"
-public_token_payload = {
-    "client_id": PLAID_CLIENT_ID,
-    "secret": PLAID_SECRET,
-    "institution_id": "ins_109512",
-    "initial_products": ["transactions"]
-}
-
-response = requests.post(public_token_url, json=public_token_payload)
-public_token_response = response.json()
-
-if "public_token" not in public_token_response:
-    print("Error creating public token:", public_token_response)
+user = db.query(User).filter(User.username == username).first()
+if not user:
+    print(f"User {username} not found, log in once to create it")
     exit()
 
-public_token = public_token_response["public_token"]
-
-exchange_url = f"{PLAID_SANDBOX_URL}/item/public_token/exchange"
-exchange_payload = {
-    "client_id": PLAID_CLIENT_ID,
-    "secret": PLAID_SECRET,
-    "public_token": public_token
-}
-
-response = requests.post(exchange_url, json=exchange_payload)
-exchange_response = response.json()
-
-if "access_token" not in exchange_response:
-    print("Error exchanging public token:", exchange_response)
+### Step 1: Link a sandbox item ###
+# With PLAID_WEBHOOK_URL set, Plaid tells the backend's /plaid/webhook when the item's
+# transactions are ready instead of us polling for them
+options = {"webhook": PLAID_WEBHOOK_URL} if PLAID_WEBHOOK_URL else {}
+try:
+    public_token_response = plaid_client.post("/sandbox/public_token/create", {
+        "institution_id": "ins_109512",
+        "initial_products": ["transactions"],
+        "options": options,
+    })
+    public_token = public_token_response["public_token"]
+
+    exchange_response = plaid_client.post("/item/public_token/exchange", {
+        "public_token": public_token
+    })
+except PlaidError as e:
+    print("Error linking sandbox item:", e.body)
     exit()
 
-access_token = exchange_response["access_token"]
-
-accounts_url = f"{PLAID_SANDBOX_URL}/accounts/get"
-accounts_payload = {
-    "client_id": PLAID_CLIENT_ID,
-    "secret": PLAID_SECRET,
-    "access_token": access_token
-}
-
-response = requests.post(accounts_url, json=accounts_payload)
-accounts_response = response.json()
-
-if "accounts" not in accounts_response:
-    print("Error fetching accounts:", accounts_response)
-    exit()
-
-account_id = accounts_response["accounts"][0]["account_id"]
-
-webhook_url = f"{PLAID_SANDBOX_URL}/sandbox/item/fire_webhook"
-webhook_payload = {
-    "client_id": PLAID_CLIENT_ID,
-    "secret": PLAID_SECRET,
-    "access_token": access_token,
-    "webhook_code": "DEFAULT_UPDATE"
-}
-
-response = requests.post(webhook_url, json=webhook_payload)
-webhook_response = response.json()
-
-# Wait for transactions to be available
-max_retries = 5
-retry_wait = 5  # Wait time in seconds
-
-transactions_data = None
-
-for attempt in range(max_retries):
-    print(f"🔄 Attempt {attempt + 1}: Fetching transactions...")
-
-    transactions_url = f"{PLAID_SANDBOX_URL}/transactions/get"
-    transactions_payload = {
-        "client_id": PLAID_CLIENT_ID,
-        "secret": PLAID_SECRET,
-        "access_token": access_token,
-        "start_date": "2024-01-01",
-        "end_date": "2025-01-01",
-        "options": {
-            "account_ids": [account_id]
-        }
-    }
-
-    response = requests.post(transactions_url, json=transactions_payload)
-    transactions_response = response.json()
-
-    if "transactions" in transactions_response:
-        transactions_data = transactions_response["transactions"]  # Extract transactions list
-        print("✅ Transactions found!")
-        break  # Exit loop if transactions are found
-
-    print("⌛ Waiting for transactions to populate...")
-    time.sleep(retry_wait)
-
-if transactions_data is None:
-    print("Error fetching transactions after multiple retries.")
-    exit()
-
-
-
-## Step 2: Extract & Store Transactions in SQLite ###
-
-for tx in transactions_data:
-    new_transaction = Transaction(
-        transaction_id=tx["transaction_id"],
-        account_id=tx["account_id"],
-        name=tx["name"],
-        merchant_name=tx.get("merchant_name"),
-        amount=tx["amount"],
-        date=datetime.datetime.strptime(tx["date"], "%Y-%m-%d").date(),  # ✅ Fix applied here
-        category=json.dumps(tx["category"]),  # Store category as JSON string
-        payment_channel=tx["payment_channel"],
-        currency=tx.get("iso_currency_code"),
-    )
-
-    db.add(new_transaction)
-
+# New item: forget any cursor of the previous one
+user.access_token = exchange_response["access_token"]
+user.plaid_item_id = exchange_response["item_id"]
+db.query(PlaidSyncState).filter(PlaidSyncState.user_id == user.id).delete()
 db.commit()
-db.close()
 
-print("✅ Transactions successfully saved to database!")
+### Step 2: Sync ###
+if PLAID_WEBHOOK_URL:
+    # Plaid sends SYNC_UPDATES_AVAILABLE once the history is ready; firing one now
+    # covers items whose data is already there. The running backend does the sync.
+    try:
+        plaid_client.post("/sandbox/item/fire_webhook", {
+            "access_token": user.access_token,
+            "webhook_code": "SYNC_UPDATES_AVAILABLE",
+        })
+        print(f"✅ Item linked, the backend syncs it when the webhook reaches {PLAID_WEBHOOK_URL}")
+    except PlaidError as e:
+        print("Error firing webhook:", e.body)
+else:
+    # No webhook: one incremental sync now; python -m app.plaid_sync picks up the rest later
+    try:
+        result = sync_user(db, user)
+        print(f"✅ {result['added']} transactions synced!")
+    except PlaidSyncError as e:
+        print(str(e))
 
+db.close()
+recompute_worker.stop()
@@ -0,0 +1,37 @@
+import sys
+from app.database import SessionLocal, upgrade_schema
+from app.models.user import User
+from app.rollup import rebuild_rollup
+from app.regression import rebuild_all_states
+from app.forecast import refresh_forecast
+
+
+def rebuild_rollups(username: str = None):
+    """Recompute daily_category_spend from raw transactions, then the regression sums from it,
+    then this month's user_category_metrics.
+
+    Run after backfill_categories / assign_transaction_owner, or whenever the
+    rollup is suspected to have drifted from the transactions table.
+    """
+    upgrade_schema()
+    db = SessionLocal()
+    try:
+        user_id = None
+        if username is not None:
+            user = db.query(User).filter(User.username == username).first()
+            if not user:
+                raise SystemExit(f"User {username} not found")
+            user_id = user.id
+        rebuild_rollup(db, user_id)
+        rebuild_all_states(db, user_id)
+        db.commit()
+        users = db.query(User).all() if user_id is None else [db.get(User, user_id)]
+        for user in users:
+            refresh_forecast(db, user)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    rebuild_rollups(sys.argv[1] if len(sys.argv) > 1 else None)
+    print("Daily category spend rollups, regression sums and category metrics have been rebuilt.")
@@ -0,0 +1,112 @@
+import os
+import threading
+import time
+import traceback
+from datetime import datetime
+from app.database import SessionLocal
+from app.models.user import User
+from app.forecast import refresh_forecast
+
+# Writes within this window after the first one are folded into a single recompute
+DEBOUNCE_SECONDS = float(os.getenv("RECOMPUTE_DEBOUNCE_SECONDS", "2"))
+
+
+class RecomputeWorker:
+    """Background thread that refreshes derived spending values, coalesced per user.
+
+    schedule() only marks a user as dirty. The first mark starts a debounce window;
+    every further mark inside it is absorbed, so a burst of inserts costs one forecast
+    refresh instead of one per row.
+    """
+
+    def __init__(self, debounce: float = DEBOUNCE_SECONDS, session_factory=SessionLocal):
+        self.debounce = debounce
+        self.session_factory = session_factory
+        self._cond = threading.Condition()
+        self._due = {}  # user_id -> monotonic time the recompute runs
+        self._stale_since = {}  # user_id -> wall time of the first unprocessed write
+        self._refreshed_at = {}  # user_id -> wall time of the last successful recompute
+        self._running = set()
+        self._thread = None
+        self._stopping = False
+
+    def schedule(self, user_id: int):
+        with self._cond:
+            if user_id not in self._due:
+                self._due[user_id] = time.monotonic() + self.debounce
+                self._stale_since.setdefault(user_id, datetime.now())
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name="recompute-worker", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def status(self, user_id: int):
+        with self._cond:
+            stale_since = self._stale_since.get(user_id)
+            refreshed_at = self._refreshed_at.get(user_id)
+            return {
+                "stale": stale_since is not None,
+                "stale_since": stale_since.isoformat() if stale_since else None,
+                "last_refreshed": refreshed_at.isoformat() if refreshed_at else None,
+                "pending": user_id in self._due or user_id in self._running,
+            }
+
+    def flush(self):
+        """Run every pending recompute now, in the calling thread."""
+        with self._cond:
+            user_ids = list(self._due)
+            self._due.clear()
+            self._running.update(user_ids)
+        for user_id in user_ids:
+            self._recompute(user_id)
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopping:
+                    now = time.monotonic()
+                    ready = [user_id for user_id, due in self._due.items() if due <= now]
+                    if ready:
+                        break
+                    timeout = min(self._due.values()) - now if self._due else None
+                    self._cond.wait(timeout)
+                if self._stopping:
+                    return
+                for user_id in ready:
+                    del self._due[user_id]
+                self._running.update(ready)
+            for user_id in ready:
+                self._recompute(user_id)
+
+    def _recompute(self, user_id: int):
+        started = datetime.now()
+        db = self.session_factory()
+        try:
+            user = db.query(User).filter(User.id == user_id).first()
+            if user:
+                refresh_forecast(db, user)
+            with self._cond:
+                self._refreshed_at[user_id] = started
+                # Writes that arrived while we were running keep the user stale
+                if user_id not in self._due:
+                    self._stale_since.pop(user_id, None)
+        except Exception as e:
+            print(f"Error recomputing forecast for user {user_id}: {str(e)}")
+            traceback.print_exc()
+            db.rollback()
+        finally:
+            db.close()
+            with self._cond:
+                self._running.discard(user_id)
+
+
+recompute_worker = RecomputeWorker()
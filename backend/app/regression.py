@@ -0,0 +1,140 @@
+from sqlalchemy import and_, case, delete, insert, literal, update
+from sqlalchemy.orm import Session
+from app.models.regression import CategoryRegressionState
+from app.models.rollup import DailyCategorySpend
+
+state_table = CategoryRegressionState.__table__
+
+
+def _key(user_id: int, category: str, month):
+    return and_(
+        state_table.c.user_id == user_id,
+        state_table.c.category == category,
+        state_table.c.month == month,
+    )
+
+
+def record_spend(db: Session, user_id: int, day, categories, amount: float):
+    """Fold a newly inserted transaction into each category's running regression sums.
+
+    Spending on or after the latest point of the month is O(1) arithmetic. Back-dated
+    spending shifts every later cumulative point, so that month is rebuilt from its
+    daily rollup rows instead (at most 31), never from raw transactions. Where UPDATE ...
+    RETURNING is available, every category's O(1) case is a single statement.
+    """
+    month = day.replace(day=1)
+    x = day.day
+    c = state_table.c
+    if db.get_bind().dialect.update_returning:
+        # Both O(1) cases in one UPDATE for all categories. `appended` is 1 for a new
+        # latest point (x, last_total + amount), 0 for more spending on its day.
+        appended = case((c.last_day < x, 1), else_=0)
+        dy = literal(amount) + appended * c.last_total
+        updated = db.execute(update(state_table).where(
+            c.user_id == user_id, c.month == month, c.category.in_(categories), c.last_day <= x,
+        ).values(
+            n=c.n + appended,
+            sum_x=c.sum_x + appended * x,
+            sum_xx=c.sum_xx + appended * (x * x),
+            sum_y=c.sum_y + dy,
+            sum_xy=c.sum_xy + x * dy,
+            last_day=x,
+            last_total=c.last_total + amount,
+        ).returning(c.category)).scalars().all()
+        for category in set(categories) - set(updated):
+            rebuild_state(db, user_id, category, month)
+        return
+
+    for category in categories:
+        key = _key(user_id, category, month)
+
+        # New latest point: (x, last_total + amount)
+        y = c.last_total + amount
+        appended = db.execute(update(state_table).where(key, c.last_day < x).values(
+            n=c.n + 1,
+            sum_x=c.sum_x + x,
+            sum_xx=c.sum_xx + x * x,
+            sum_y=c.sum_y + y,
+            sum_xy=c.sum_xy + x * y,
+            last_day=x,
+            last_total=y,
+        ))
+        if appended.rowcount:
+            continue
+
+        # More spending on the latest point's day: only its y moves
+        extended = db.execute(update(state_table).where(key, c.last_day == x).values(
+            sum_y=c.sum_y + amount,
+            sum_xy=c.sum_xy + x * amount,
+            last_total=c.last_total + amount,
+        ))
+        if extended.rowcount:
+            continue
+
+        rebuild_state(db, user_id, category, month)
+
+
+def forget_spend(db: Session, user_id: int, day, categories):
+    """Update the sums after a delete. Removing a point can change any later point, so the
+    month is rebuilt from the (already updated) daily rollup."""
+    month = day.replace(day=1)
+    for category in categories:
+        rebuild_state(db, user_id, category, month)
+
+
+def sums_from_daily(daily):
+    """Regression sums over ordered (day, amount) rollup rows of one month."""
+    sums = {"n": 0, "sum_x": 0.0, "sum_y": 0.0, "sum_xy": 0.0, "sum_xx": 0.0, "last_day": 0, "last_total": 0.0}
+    for day, amount in daily:
+        x = day.day
+        sums["last_total"] += amount
+        y = sums["last_total"]
+        sums["n"] += 1
+        sums["sum_x"] += x
+        sums["sum_xx"] += x * x
+        sums["sum_y"] += y
+        sums["sum_xy"] += x * y
+        sums["last_day"] = x
+    return sums
+
+
+def rebuild_state(db: Session, user_id: int, category: str, month):
+    """Recompute one (user, category, month) state from its daily rollup rows."""
+    next_month = month.replace(year=month.year + 1, month=1) if month.month == 12 else month.replace(month=month.month + 1)
+    daily = db.query(DailyCategorySpend.day, DailyCategorySpend.amount).filter(
+        DailyCategorySpend.user_id == user_id,
+        DailyCategorySpend.category == category,
+        DailyCategorySpend.day >= month,
+        DailyCategorySpend.day < next_month,
+    ).order_by(DailyCategorySpend.day).all()
+
+    db.execute(delete(state_table).where(_key(user_id, category, month)))
+    if daily:
+        db.execute(insert(state_table).values(
+            user_id=user_id, category=category, month=month, **sums_from_daily(daily)
+        ))
+
+
+def rebuild_all_states(db: Session, user_id: int = None):
+    """Recompute every regression state from the daily rollup, for one user or everyone. Does not commit."""
+    clear = delete(state_table)
+    query = db.query(
+        DailyCategorySpend.user_id, DailyCategorySpend.category, DailyCategorySpend.day, DailyCategorySpend.amount
+    )
+    if user_id is not None:
+        clear = clear.where(state_table.c.user_id == user_id)
+        query = query.filter(DailyCategorySpend.user_id == user_id)
+    db.execute(clear)
+
+    groups = {}
+    for row_user, category, day, amount in query.order_by(
+        DailyCategorySpend.user_id, DailyCategorySpend.category, DailyCategorySpend.day
+    ).yield_per(1000):
+        groups.setdefault((row_user, category, day.replace(day=1)), []).append((day, amount))
+
+    rows = [
+        {"user_id": key[0], "category": key[1], "month": key[2], **sums_from_daily(daily)}
+        for key, daily in groups.items()
+    ]
+    if rows:
+        db.execute(insert(state_table), rows)
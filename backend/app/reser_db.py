@@ -1,16 +1,29 @@
 from app.database import engine
 from app.models.user import User
-from sqlalchemy import MetaData, Table
+from sqlalchemy import MetaData
 
 def reset_users_table():
     meta = MetaData()
     meta.reflect(bind=engine)
     users_table = meta.tables.get('users')
     if users_table is not None:
+        # Foreign keys are enforced, so every row that points at a user goes first.
+        # Transactions are kept, detached from their owner; assign_transaction_owner reassigns
+        # them and rebuild_rollups then restores the derived rollups and metrics. Everything
+        # else that references users (sync cursors, ledgers, idempotency keys, ...) belongs to
+        # the users being dropped and is deleted.
+        with engine.begin() as conn:
+            for table in meta.sorted_tables:
+                if table is users_table or not any(fk.column.table is users_table for fk in table.foreign_keys):
+                    continue
+                if table.name == 'transactions':
+                    conn.execute(table.update().values(user_id=None))
+                else:
+                    conn.execute(table.delete())
         print("Dropping users table...")
         users_table.drop(engine)
     User.__table__.create(engine)
 
 if __name__ == "__main__":
     reset_users_table()
-    print("Users table has been reset.")
\ No newline at end of file
+    print("Users table has been reset.")
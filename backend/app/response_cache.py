@@ -0,0 +1,107 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+from app.database import engine, async_engine
+from app.models.user import User
+
+# Serialized GET responses kept in process; 0 entries disables the cache
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2048"))
+# Upper bound on how stale a response or a 304 can get when a write bypasses bump();
+# 0 turns off both the cache and 304s
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+
+users_table = User.__table__
+
+
+class DataVersions:
+    """Per-user counter in users.data_version, bumped by every write to that user's data.
+
+    bump() runs inside the write's own transaction, so the counter moves exactly when
+    the data does, whichever process wrote it (API workers, the Plaid sync CLI, ...),
+    and ETags stay valid across restarts and agree between workers.
+    """
+
+    def _query(self, username: str):
+        return select(func.coalesce(users_table.c.data_version, 0)).where(users_table.c.username == username)
+
+    def get(self, username: str):
+        """The user's version, or None for an unknown user. One indexed read."""
+        with engine.connect() as conn:
+            return conn.execute(self._query(username)).scalar()
+
+    async def get_async(self, username: str):
+        """get() on the async engine, for the event loop: no threadpool slot is held."""
+        async with async_engine.connect() as conn:
+            return (await conn.execute(self._query(username))).scalar()
+
+    def bump(self, db: Session, user_id: int):
+        """Call inside the write's transaction, before its commit. Does not commit."""
+        db.execute(update(users_table).where(users_table.c.id == user_id).values(
+            data_version=func.coalesce(users_table.c.data_version, 0) + 1
+        ))
+
+    def bucket(self):
+        """Counts TTL-sized intervals. Part of the ETag and cache key, so that writes
+        which bypass bump() (ad hoc SQL) are picked up within RESPONSE_CACHE_TTL_SECONDS."""
+        return int(time.time() // RESPONSE_CACHE_TTL_SECONDS)
+
+
+class ResponseCache:
+    """LRU of response bodies with a TTL.
+
+    Keys include the user's data version, so a write leaves their older entries
+    unreachable; those are evicted by age or by LRU order rather than purged.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (monotonic expiry, body)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, body: bytes):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def status(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+def etag_matches(if_none_match: str, etag: str):
+    """True if an If-None-Match header value names `etag` (or is *)."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+data_versions = DataVersions()
+response_cache = ResponseCache()
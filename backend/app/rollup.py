@@ -0,0 +1,126 @@
+from sqlalchemy import delete, func, insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models.rollup import DailyCategorySpend
+from app.models.transaction import Transaction
+from app.models.category import TransactionCategory
+from app.regression import record_spend, forget_spend
+
+# Pseudo-category holding a user's total spend across all categories
+ALL_CATEGORIES = "*"
+
+spend_table = DailyCategorySpend.__table__
+
+
+def _rollup_categories(transaction: Transaction):
+    return [ALL_CATEGORIES] + [row.category for row in transaction.categories]
+
+
+def _upsert_statement(dialect_name: str):
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        return None
+    statement = dialect_insert(spend_table)
+    return statement.on_conflict_do_update(
+        index_elements=["user_id", "category", "day"],
+        set_={
+            "amount": spend_table.c.amount + statement.excluded.amount,
+            "txn_count": spend_table.c.txn_count + statement.excluded.txn_count,
+        },
+    )
+
+
+def _apply(db: Session, user_id: int, day, categories, amount: float, count: int):
+    statement = _upsert_statement(db.get_bind().dialect.name) if count > 0 else None
+    if statement is not None:
+        # One multi-row upsert for the day's rows of every category
+        db.execute(statement.values([
+            {"user_id": user_id, "category": category, "day": day, "amount": amount, "txn_count": count}
+            for category in categories
+        ]))
+        return
+
+    for category in categories:
+        key = (
+            spend_table.c.user_id == user_id,
+            spend_table.c.category == category,
+            spend_table.c.day == day,
+        )
+        result = db.execute(update(spend_table).where(*key).values(
+            amount=spend_table.c.amount + amount,
+            txn_count=spend_table.c.txn_count + count,
+        ))
+        if result.rowcount == 0:
+            if count > 0:
+                db.execute(insert(spend_table).values(
+                    user_id=user_id, category=category, day=day, amount=amount, txn_count=count
+                ))
+        elif count < 0:
+            # Drop days with no transactions left so they stop showing up as graph points
+            db.execute(delete(spend_table).where(*key, spend_table.c.txn_count <= 0))
+
+
+def record_transaction(db: Session, transaction: Transaction):
+    """Add a new transaction to the rollup and regression sums. Call before the commit that inserts it."""
+    if transaction.user_id is None:
+        return
+    categories = _rollup_categories(transaction)
+    _apply(db, transaction.user_id, transaction.date, categories, transaction.amount or 0, 1)
+    record_spend(db, transaction.user_id, transaction.date, categories, transaction.amount or 0)
+
+
+def forget_transaction(db: Session, transaction: Transaction):
+    """Remove a transaction from the rollup and regression sums. Call before the commit that deletes it."""
+    if transaction.user_id is None:
+        return
+    categories = _rollup_categories(transaction)
+    _apply(db, transaction.user_id, transaction.date, categories, -(transaction.amount or 0), -1)
+    forget_spend(db, transaction.user_id, transaction.date, categories)
+
+
+def daily_spend_query(user_id: int, category: str, start, end=None):
+    """SELECT of (day, amount) rows for one user and category, ordered by day; at most one row per day."""
+    query = select(DailyCategorySpend.day, DailyCategorySpend.amount).where(
+        DailyCategorySpend.user_id == user_id,
+        DailyCategorySpend.category == category,
+        DailyCategorySpend.day >= start,
+    )
+    if end is not None:
+        query = query.where(DailyCategorySpend.day < end)
+    return query.order_by(DailyCategorySpend.day)
+
+
+def daily_spend(db: Session, user_id: int, category: str, start, end=None):
+    return db.execute(daily_spend_query(user_id, category, start, end)).all()
+
+
+async def daily_spend_async(db: AsyncSession, user_id: int, category: str, start, end=None):
+    return (await db.execute(daily_spend_query(user_id, category, start, end))).all()
+
+
+def rebuild_rollup(db: Session, user_id: int = None):
+    """Recompute the rollup from raw transactions, for one user or everyone. Does not commit."""
+    clear = delete(spend_table)
+    if user_id is not None:
+        clear = clear.where(spend_table.c.user_id == user_id)
+    db.execute(clear)
+
+    owned = Transaction.user_id.isnot(None) if user_id is None else Transaction.user_id == user_id
+    columns = ["user_id", "category", "day", "amount", "txn_count"]
+
+    per_category = select(
+        Transaction.user_id, TransactionCategory.category, Transaction.date,
+        func.sum(Transaction.amount), func.count(),
+    ).join(
+        TransactionCategory, TransactionCategory.transaction_id == Transaction.id
+    ).where(owned).group_by(Transaction.user_id, TransactionCategory.category, Transaction.date)
+    db.execute(insert(spend_table).from_select(columns, per_category))
+
+    totals = select(
+        Transaction.user_id, literal(ALL_CATEGORIES), Transaction.date,
+        func.sum(Transaction.amount), func.count(),
+    ).where(owned).group_by(Transaction.user_id, Transaction.date)
+    db.execute(insert(spend_table).from_select(columns, totals))
@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+from typing import Dict, Optional
+
+class SavingGoal(BaseModel):
+    amount: Optional[float] = None
+    time_months: Optional[int] = None
+    saving_goal: Optional[float] = None
+
+class CategorySpending(BaseModel):
+    # This month's actual, goal and predicted month-end spend, as last recomputed
+    spending: Optional[float] = None
+    spending_goal: Optional[float] = None
+    predicted: Optional[float] = None
+
+class DashboardResponse(BaseModel):
+    # Only the selected fields are present in the response
+    bank_balance: Optional[float] = None
+    savings_balance: Optional[float] = None
+    goal: Optional[SavingGoal] = None
+    categories: Optional[Dict[str, CategorySpending]] = None  # keyed by Plaid category
+    predicted_spending: Optional[float] = None
+    cumulative_spending: Optional[Dict[str, float]] = None  # this month, all categories
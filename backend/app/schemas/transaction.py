@@ -16,6 +16,7 @@ class TransactionBase(BaseModel):
 class AddTransactionRequest(BaseModel):
     # transaction_id: str
     # account_id: str
+    username: str
     name: str
     merchant_name: Optional[str] = None
     amount: float
@@ -24,6 +25,13 @@ class AddTransactionRequest(BaseModel):
     payment_channel: str
     currency: Optional[str] = None
 
+class BatchAlertRequest(BaseModel):
+    # Score the given transactions, or every transaction in the date range (inclusive)
+    username: str
+    transaction_ids: Optional[List[str]] = None
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+
 class TransactionCreate(TransactionBase):
     pass  # Used for inserting transactions
 
@@ -0,0 +1,177 @@
+"""Columnar snapshots of each user's transactions for offline analytics.
+
+Run:  python -m app.snapshot [username] [--every SECONDS]
+Every user gets a directory of monthly partitions plus a _meta.json holding the category
+and merchant dictionaries the partitions' integer codes refer to:
+
+    snapshots/user_id=7/_meta.json
+    snapshots/user_id=7/month=2025-02/part-0.parquet
+
+Partitions are Parquet (pyarrow is in requirements.txt); without pyarrow they fall back to
+.npy files of the frame's structured array, which read_snapshot memory-maps. Multi-month
+reports (GET /spending_report) read these through read_snapshot instead of querying the
+SQLite file serving requests.
+"""
+import os
+import json
+import time
+import shutil
+import argparse
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models.user import User
+from app.frame import FRAME_DTYPE, TransactionFrame, build_frame, frame_query
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+SNAPSHOT_DIR = Path(os.getenv("ANALYTICS_SNAPSHOT_DIR", BACKEND_DIR / "snapshots"))
+META_FILE = "_meta.json"
+
+
+def parquet_available():
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def user_dir(user_id: int, snapshot_dir: Path = SNAPSHOT_DIR):
+    return Path(snapshot_dir) / f"user_id={user_id}"
+
+
+def _write_partition(rows: np.ndarray, directory: Path, file_format: str):
+    directory.mkdir(parents=True)
+    if file_format == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.table({name: rows[name] for name in FRAME_DTYPE.names})  # dates become date32
+        pq.write_table(table, directory / "part-0.parquet", compression="zstd")
+    else:
+        np.save(directory / "part-0.npy", rows)
+
+
+def _read_partitions(directories, file_format: str):
+    if file_format != "parquet":
+        parts = [np.load(directory / "part-0.npy", mmap_mode="r") for directory in directories]
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+    import pyarrow.parquet as pq
+
+    # One dataset read decodes the partitions in parallel
+    table = pq.ParquetDataset([str(directory / "part-0.parquet") for directory in directories]).read()
+    rows = np.empty(table.num_rows, dtype=FRAME_DTYPE)
+    for name in FRAME_DTYPE.names:
+        rows[name] = table.column(name).to_numpy()
+    return rows
+
+
+def write_snapshot(db: Session, user_id: int, snapshot_dir: Path = SNAPSHOT_DIR, file_format: str = None):
+    """Replace the user's snapshot with their current transactions.
+
+    The new snapshot is written next to the old one and swapped in by renames, so readers
+    never see a half-written directory.
+    """
+    start = time.perf_counter()
+    file_format = file_format or ("parquet" if parquet_available() else "npy")
+    frame = build_frame(db.execute(frame_query(user_id)))
+
+    target = user_dir(user_id, snapshot_dir)
+    staging = target.with_name(f"{target.name}.tmp-{os.getpid()}")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+
+    # Rows are ordered by date, so each month is one contiguous slice
+    months, starts = np.unique(frame.rows["date"].astype("M8[M]"), return_index=True)
+    bounds = list(starts) + [len(frame)]
+    for i, month in enumerate(months):
+        _write_partition(frame.rows[bounds[i]:bounds[i + 1]], staging / f"month={month}", file_format)
+    (staging / META_FILE).write_text(json.dumps({
+        "user_id": user_id,
+        "format": file_format,
+        "rows": len(frame),
+        "categories": frame.categories,
+        "merchants": frame.merchants,
+        "written_at": datetime.now().isoformat(),
+    }))
+
+    previous = target.with_name(f"{target.name}.old-{os.getpid()}")
+    if target.exists():
+        target.rename(previous)
+    staging.rename(target)
+    shutil.rmtree(previous, ignore_errors=True)
+    return {"user_id": user_id, "rows": len(frame), "partitions": len(months), "format": file_format,
+            "seconds": time.perf_counter() - start}
+
+
+def snapshot_info(user_id: int, snapshot_dir: Path = SNAPSHOT_DIR):
+    """The snapshot's _meta.json contents, or None if the user has no snapshot."""
+    try:
+        return json.loads((user_dir(user_id, snapshot_dir) / META_FILE).read_text())
+    except FileNotFoundError:
+        return None
+
+
+def read_snapshot(user_id: int, start=None, end=None, snapshot_dir: Path = SNAPSHOT_DIR):
+    """The user's snapshotted transactions with start <= date <= end as a TransactionFrame.
+
+    Only the partitions of months overlapping the range are opened. Returns None if the
+    user has no snapshot.
+    """
+    meta = snapshot_info(user_id, snapshot_dir)
+    if meta is None:
+        return None
+    first = np.datetime64(start, "M") if start is not None else None
+    last = np.datetime64(end, "M") if end is not None else None
+
+    partitions = []
+    for partition in sorted(user_dir(user_id, snapshot_dir).glob("month=*")):
+        month = np.datetime64(partition.name.split("=", 1)[1], "M")
+        if (first is None or month >= first) and (last is None or month <= last):
+            partitions.append(partition)
+    rows = _read_partitions(partitions, meta["format"]) if partitions else np.empty(0, dtype=FRAME_DTYPE)
+    return TransactionFrame(rows, meta["categories"], meta["merchants"]).between(start, end)
+
+
+def snapshot_all(session_factory=SessionLocal, username: str = None, snapshot_dir: Path = SNAPSHOT_DIR,
+                 file_format: str = None):
+    """Snapshot every user (or one), each from its own read; failures are logged and skipped."""
+    db = session_factory()
+    try:
+        query = db.query(User.id)
+        if username is not None:
+            query = query.filter(User.username == username)
+        user_ids = [row.id for row in query]
+        results = []
+        for user_id in user_ids:
+            try:
+                results.append(write_snapshot(db, user_id, snapshot_dir, file_format))
+            except Exception as e:
+                print(f"Error writing snapshot for user {user_id}: {str(e)}")
+            db.rollback()  # end the read transaction so the next user sees fresh data
+        return results
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write columnar transaction snapshots")
+    parser.add_argument("username", nargs="?", help="snapshot only this user (default: every user)")
+    parser.add_argument("--dir", type=Path, default=SNAPSHOT_DIR, help="snapshot root directory")
+    parser.add_argument("--format", choices=["parquet", "npy"], help="default: parquet if pyarrow is installed")
+    parser.add_argument("--every", type=float, metavar="SECONDS", help="keep running, snapshotting on this interval")
+    args = parser.parse_args()
+
+    while True:
+        for result in snapshot_all(username=args.username, snapshot_dir=args.dir, file_format=args.format):
+            print(f"user {result['user_id']}: {result['rows']} rows in {result['partitions']} "
+                  f"{result['format']} partitions ({result['seconds']:.2f}s)")
+        if not args.every:
+            return
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import os
+import json
+import base64
+from datetime import date
+from sqlalchemy import select, tuple_
+from app.database import AsyncSessionLocal
+from app.models.transaction import Transaction
+from app.models.category import TransactionCategory
+
+DEFAULT_PAGE_SIZE = int(os.getenv("TRANSACTIONS_PAGE_SIZE", "500"))
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 1000  # rows fetched per round trip while streaming NDJSON
+
+# Only the columns the response needs; no ORM objects are built
+COLUMNS = (Transaction.id, Transaction.date, Transaction.amount, Transaction.category,
+           Transaction.merchant_name, Transaction.account_id)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(day: date, transaction_id: int):
+    """Opaque position after the (date, id) of the last row returned."""
+    return base64.urlsafe_b64encode(f"{day.isoformat()}:{transaction_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        day, transaction_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+        return date.fromisoformat(day), int(transaction_id)
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidCursor(f"Invalid cursor: {cursor}")
+
+
+def transactions_query(user_id: int, start: date = None, end: date = None, account_id: str = None,
+                       category: str = None, cursor: str = None):
+    """SELECT of a user's transactions, newest first, ordered by (date, id) so pages never overlap.
+
+    A cursor continues strictly after the row it was made from (keyset pagination), so each
+    page is an index range scan however deep into the history it is.
+    """
+    query = select(*COLUMNS).where(Transaction.user_id == user_id)
+    if start is not None:
+        query = query.where(Transaction.date >= start)
+    if end is not None:
+        query = query.where(Transaction.date <= end)
+    if account_id is not None:
+        query = query.where(Transaction.account_id == account_id)
+    if category is not None:
+        query = query.where(Transaction.id.in_(
+            select(TransactionCategory.transaction_id).where(TransactionCategory.category == category)
+        ))
+    if cursor is not None:
+        query = query.where(tuple_(Transaction.date, Transaction.id) < decode_cursor(cursor))
+    return query.order_by(Transaction.date.desc(), Transaction.id.desc())
+
+
+def transaction_row(row):
+    return {
+        "date": row.date.strftime("%Y-%m-%d"),
+        "amount": row.amount,
+        "category": row.category,
+        "merchant_name": row.merchant_name,
+        "account_id": row.account_id,
+    }
+
+
+async def transactions_page(db, query, limit: int = DEFAULT_PAGE_SIZE):
+    """(rows, next_cursor) for one page; next_cursor is None on the last page."""
+    rows = (await db.execute(query.limit(limit + 1))).all()
+    if len(rows) <= limit:
+        return [transaction_row(row) for row in rows], None
+    rows = rows[:limit]
+    return [transaction_row(row) for row in rows], encode_cursor(rows[-1].date, rows[-1].id)
+
+
+async def stream_ndjson(query, limit: int = None):
+    """Yield the query's rows as NDJSON lines from a server-side cursor, in constant memory.
+
+    Opens its own session: the request's session is closed before a streamed body is sent.
+    """
+    if limit is not None:
+        query = query.limit(limit)
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=STREAM_BATCH_SIZE))
+        async for rows in result.partitions():
+            yield "".join(json.dumps(transaction_row(row)) + "\n" for row in rows)
@@ -0,0 +1,108 @@
+import os
+import threading
+from collections import OrderedDict
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models.user import User
+
+# username -> id mappings kept across requests; 0 disables the cache
+USER_ID_CACHE_SIZE = int(os.getenv("USER_ID_CACHE_SIZE", "10000"))
+
+
+class UserIdCache:
+    """Bounded LRU of username -> user id.
+
+    Ids never change for a username, so entries only go stale when a user is deleted or
+    renamed; the mapper events below drop them when that happens through the ORM here.
+    Scripts that recreate the users table (reser_db) need the API restarted.
+    """
+
+    def __init__(self, max_entries: int = USER_ID_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._ids = OrderedDict()
+
+    def get(self, username: str):
+        with self._lock:
+            user_id = self._ids.get(username)
+            if user_id is not None:
+                self._ids.move_to_end(username)
+            return user_id
+
+    def put(self, username: str, user_id: int):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._ids[username] = user_id
+            self._ids.move_to_end(username)
+            while len(self._ids) > self.max_entries:
+                self._ids.popitem(last=False)
+
+    def invalidate(self, username: str):
+        with self._lock:
+            self._ids.pop(username, None)
+
+    def clear(self):
+        with self._lock:
+            self._ids.clear()
+
+
+user_ids = UserIdCache()
+
+
+@event.listens_for(User, "after_insert")
+@event.listens_for(User, "after_delete")
+def _forget_user(mapper, connection, target):
+    user_ids.invalidate(target.username)
+
+
+@event.listens_for(User, "after_update")
+def _forget_renamed_user(mapper, connection, target):
+    history = inspect(target).attrs.username.history
+    for username in (history.deleted or ()):
+        user_ids.invalidate(username)
+
+
+def _checked(user: User, username: str):
+    # A cached id that no longer belongs to `username` is dropped and looked up again
+    if user is not None and user.username == username:
+        return user
+    user_ids.invalidate(username)
+    return None
+
+
+def find_user(db: Session, username: str):
+    """The user named `username`, or None.
+
+    With the id cached this is a primary-key get, answered from the session's identity
+    map when the user is already loaded in this request.
+    """
+    user_id = user_ids.get(username)
+    user = _checked(db.get(User, user_id), username) if user_id is not None else None
+    if user is None:
+        user = db.query(User).filter(User.username == username).first()
+        if user is not None:
+            user_ids.put(username, user.id)
+    return user
+
+
+async def find_user_async(db: AsyncSession, username: str):
+    """find_user for an AsyncSession."""
+    user_id = user_ids.get(username)
+    user = _checked(await db.get(User, user_id), username) if user_id is not None else None
+    if user is None:
+        user = (await db.execute(select(User).where(User.username == username))).scalars().first()
+        if user is not None:
+            user_ids.put(username, user.id)
+    return user
+
+
+async def find_user_id_async(db: AsyncSession, username: str):
+    """Just the id of the user named `username`, or None; no query when it is cached."""
+    user_id = user_ids.get(username)
+    if user_id is None:
+        user_id = (await db.execute(select(User.id).where(User.username == username))).scalar()
+        if user_id is not None:
+            user_ids.put(username, user_id)
+    return user_id
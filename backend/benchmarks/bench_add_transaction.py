@@ -0,0 +1,80 @@
+"""Count SQL statements and time per /add_transaction call.
+
+Run from backend/:  python -m benchmarks.bench_add_transaction [inserts]
+Uses a throwaway SQLite database, plaid_app.db is not touched.
+"""
+import sys
+import os
+import time
+import tempfile
+import datetime
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from fastapi.testclient import TestClient
+
+# Settings are read at import, so point the app at a scratch database first
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'app.db')}"
+
+from app.main import app
+from app.database import Base, get_db
+from app.recompute import recompute_worker
+
+CATEGORIES = [["Food and Drink", "Restaurants"], ["Travel", "Taxi"], ["Entertainment"], ["Shops"]]
+
+
+def main(inserts: int = 200):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def get_bench_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    app.dependency_overrides[get_db] = get_bench_db
+    recompute_worker.session_factory = SessionLocal
+
+    client = TestClient(app)
+    client.post("/login", json={"username": "bench_user", "password": "bench"})
+
+    # Dates in order (each insert on or after the month's latest day: the O(1) rollup path),
+    # then cycling through last month (mostly back-dated: that month's sums are rebuilt)
+    first_day = datetime.date.today().replace(day=1)
+    last_month = (first_day - datetime.timedelta(days=1)).replace(day=1)
+    runs = [
+        ("in date order", [first_day + datetime.timedelta(days=i * 27 // inserts) for i in range(inserts)]),
+        ("back-dated", [last_month + datetime.timedelta(days=i % 27) for i in range(inserts)]),
+    ]
+    request_statements = 0
+    for label, dates in runs:
+        statements.clear()
+        start = time.perf_counter()
+        for i, day in enumerate(dates):
+            client.post("/add_transaction", json={
+                "username": "bench_user",
+                "name": f"Purchase {i}",
+                "merchant_name": "Bench Merchant",
+                "amount": 5 + i % 40,
+                "date": str(day),
+                "category": CATEGORIES[i % len(CATEGORIES)],
+                "payment_channel": "online",
+            })
+        elapsed = time.perf_counter() - start
+        request_statements = len(statements)
+        selects = sum(1 for sql in statements if sql.lstrip().upper().startswith("SELECT"))
+        print(f"{label}: {inserts} inserts in {elapsed:.2f}s ({elapsed / inserts * 1000:.2f} ms/insert), "
+              f"{request_statements / inserts:.1f} SQL statements per insert request ({selects / inserts:.1f} SELECTs)")
+    app.dependency_overrides.clear()
+
+    # Derived values are recomputed in the background; count that work separately
+    recompute_worker.stop()
+    print(f"{len(statements) - request_statements} SQL statements of coalesced background recompute")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,95 @@
+"""Concurrent /graph_data reads: sync def on the threadpool vs the async def endpoint.
+
+Run from backend/:  python -m benchmarks.bench_async_reads [requests] [concurrency]
+A sync twin of /graph_data is mounted for the comparison. Every async request carries a
+distinct query parameter, so it misses the response cache and goes through the full
+conditional-GET middleware and the handler. Reports throughput and the peak number of
+threadpool slots held, which is what runs out under load (40 by default); the async
+path should hold none. Uses a throwaway SQLite database, plaid_app.db is not touched.
+"""
+import sys
+import os
+import time
+import asyncio
+import tempfile
+import datetime
+import anyio.to_thread
+import httpx
+from fastapi import Depends
+from sqlalchemy.orm import Session
+
+# Settings are read at import, so point the app at a scratch database first
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'app.db')}"
+
+from app.main import app
+from app.database import get_db
+from app.models.user import User
+from app.rollup import ALL_CATEGORIES, daily_spend
+from app.graph import cumulative_series
+from app.recompute import recompute_worker
+
+USERNAME = "bench_user"
+
+
+def graph_data_sync(username: str, db: Session = Depends(get_db)):
+    # /graph_data as it was before the async read path
+    user = db.query(User).filter(User.username == username).first()
+    first_day = datetime.date.today().replace(day=1)
+    return {"cumulative_spending": cumulative_series(daily_spend(db, user.id, ALL_CATEGORIES, first_day))}
+
+
+async def fire(client, path, requests, concurrency):
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    semaphore = asyncio.Semaphore(concurrency)
+    peak = 0
+
+    async def one(i):
+        nonlocal peak
+        async with semaphore:
+            response = await client.get(path, params={"username": USERNAME, "n": i})
+            response.raise_for_status()
+            peak = max(peak, limiter.borrowed_tokens)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return time.perf_counter() - start, peak
+
+
+async def run(requests, concurrency):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.post("/login", json={"username": USERNAME, "password": "bench"})
+        first_day = datetime.date.today().replace(day=1)
+        for i in range(60):
+            await client.post("/add_transaction", json={
+                "username": USERNAME,
+                "name": f"Purchase {i}",
+                "merchant_name": "Bench Merchant",
+                "amount": 5 + i % 40,
+                "date": str(first_day + datetime.timedelta(days=i % 27)),
+                "category": ["Food and Drink"],
+                "payment_channel": "online",
+            })
+
+        peaks = {}
+        for label, path in [("sync def", "/bench/graph_data_sync"), ("async def", "/graph_data")]:
+            elapsed, peaks[label] = await fire(client, path, requests, concurrency)
+            print(f"{label:>10}: {requests / elapsed:8.1f} requests/s   peak threadpool slots {peaks[label]:3d}"
+                  f" of {anyio.to_thread.current_default_thread_limiter().total_tokens:.0f}")
+        return peaks
+
+
+def main(requests: int = 1000, concurrency: int = 100):
+    app.add_api_route("/bench/graph_data_sync", graph_data_sync, methods=["GET"])
+    print(f"{requests} GETs, {concurrency} in flight")
+    peaks = asyncio.run(run(requests, concurrency))
+    recompute_worker.stop()
+    if peaks["async def"]:
+        sys.exit(f"FAILED: the async path held {peaks['async def']} threadpool slots")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 1000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 100,
+    )
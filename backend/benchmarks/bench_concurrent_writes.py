@@ -0,0 +1,103 @@
+"""Write throughput of concurrent /add_transaction and /transfer_to_savings calls.
+
+Run from backend/:  python -m benchmarks.bench_concurrent_writes [requests] [workers]
+Compares SQLite's default journaling (rollback journal, synchronous=FULL) with the
+pragmas app.database applies (WAL, synchronous=NORMAL, cache size, busy timeout).
+Uses throwaway SQLite databases, plaid_app.db is not touched.
+"""
+import sys
+import os
+import time
+import tempfile
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+from fastapi.testclient import TestClient
+
+# Settings are read at import, so point the app at a scratch database first
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'app.db')}"
+
+from app.main import app
+from app.database import Base, get_db, create_app_engine
+from app.recompute import recompute_worker
+
+CONFIGS = {
+    "default journal": {"journal_mode": "DELETE", "synchronous": "FULL"},
+    "WAL + NORMAL": {},  # app.database defaults
+}
+USERS = 4
+
+
+def run(label, sqlite_options, requests, workers):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_app_engine(f"sqlite:///{path}", **sqlite_options)
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def get_bench_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = get_bench_db
+    recompute_worker.session_factory = SessionLocal
+
+    first_day = datetime.date.today().replace(day=1)
+
+    def write(i):
+        username = f"bench_user_{i % USERS}"
+        if i % 2:
+            return client.post("/transfer_to_savings", params={"username": username, "transfer_amt": 1})
+        return client.post("/add_transaction", json={
+            "username": username,
+            "name": f"Purchase {i}",
+            "merchant_name": "Bench Merchant",
+            "amount": 5 + i % 40,
+            "date": str(first_day + datetime.timedelta(days=i % 27)),
+            "category": ["Food and Drink", "Restaurants"],
+            "payment_channel": "online",
+        })
+
+    with TestClient(app) as client:
+        for u in range(USERS):
+            client.post("/login", json={"username": f"bench_user_{u}", "password": "bench"})
+            client.post("/simulate_income", params={"username": f"bench_user_{u}", "amt": requests})
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            statuses = [response.status_code for response in pool.map(write, range(requests))]
+        elapsed = time.perf_counter() - start
+
+    app.dependency_overrides.clear()
+    failed = sum(1 for status in statuses if status != 200)
+    print(f"{label:>16}: {requests / elapsed:8.1f} requests/s  {elapsed / requests * 1000:6.2f} ms/request  {failed} failed")
+
+    # The same number of single-statement commits without the request path around them,
+    # to separate what the journal settings cost from the ORM/HTTP overhead
+    def commit(i):
+        with engine.begin() as conn:
+            conn.execute(text("UPDATE users SET savings = coalesce(savings, 0) + 1 WHERE username = :u"),
+                         {"u": f"bench_user_{i % USERS}"})
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(commit, range(requests)))
+    elapsed = time.perf_counter() - start
+    print(f"{'':>16}  {requests / elapsed:8.1f} commits/s   {elapsed / requests * 1000:6.2f} ms/commit (bare UPDATE)")
+    engine.dispose()
+
+
+def main(requests: int = 400, workers: int = 8):
+    print(f"{requests} writes from {workers} concurrent clients")
+    for label, sqlite_options in CONFIGS.items():
+        run(label, sqlite_options, requests, workers)
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 400,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 8,
+    )
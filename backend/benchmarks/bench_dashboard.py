@@ -0,0 +1,68 @@
+"""Rendering the home screen: one request per value vs a single /dashboard request.
+
+Run from backend/:  python -m benchmarks.bench_dashboard [round_trip_ms]
+Fetches the same values both ways with the response cache disabled and reports SQL
+statements and server time, plus the total with `round_trip_ms` of network latency per
+request (default 80, a typical mobile round trip), made sequentially like the app does.
+Uses a throwaway SQLite database, plaid_app.db is not touched.
+"""
+import os
+import sys
+import time
+import asyncio
+import tempfile
+
+# Settings are read at import, so point the app at the scratch database first
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+import httpx
+from sqlalchemy import event
+from app.main import app
+from app.database import async_engine
+from app.response_cache import response_cache
+
+USERNAME = "bench_user"
+ROUTES = [
+    "/bank_balance", "/savings_balance", "/get_goal", "/graph_data",
+    "/get_food_spending", "/get_entertainment_spending", "/get_travel_spending",
+    "/get_food_spending_goal", "/get_entertainment_spending_goal", "/get_travel_spending_goal",
+    "/get_food_predicted", "/get_entertainment_predicted", "/get_travel_predicted",
+]
+statements = 0
+
+
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def count_statement(*args):
+    global statements
+    statements += 1
+
+
+async def measure(label, client, routes, round_trip_ms, repeats=50):
+    global statements
+    statements = 0
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for route in routes:
+            (await client.get(route, params={"username": USERNAME})).raise_for_status()
+    server_ms = (time.perf_counter() - start) * 1000 / repeats
+    total_ms = server_ms + round_trip_ms * len(routes)
+    print(f"{label:>16}: {len(routes):2d} requests   {statements / repeats:4.0f} statements   "
+          f"{server_ms:6.1f} ms server   {total_ms:7.1f} ms with latency")
+
+
+async def run(round_trip_ms):
+    response_cache.max_entries = 0
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.post("/login", json={"username": USERNAME, "password": "bench"})
+        await client.post("/set_goal", json={"username": USERNAME, "amount": 600, "time_months": 6})
+        await measure("separate routes", client, ROUTES, round_trip_ms)
+        await measure("/dashboard", client, ["/dashboard"], round_trip_ms)
+
+
+def main(round_trip_ms: float = 80):
+    asyncio.run(run(round_trip_ms))
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 80)
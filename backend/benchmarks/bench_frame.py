@@ -0,0 +1,126 @@
+"""Batch fraud scoring input: ORM objects vs the column-only TransactionFrame.
+
+Run from backend/:  python -m benchmarks.bench_frame [transactions]
+Loads one user's transactions the way /alert/batch used to (Transaction objects with
+their categories, then feature_matrix) and through load_frame + frame_feature_matrix,
+checks both give the same matrix, and reports time and peak Python memory of each.
+Needs the fraud encoder but not a model call; without FRAUD_ENCODER_PATH's file it fits
+a stand-in encoder on the benchmark's own labels (leaving some unseen, as real data does).
+Uses a throwaway SQLite database, plaid_app.db is not touched.
+"""
+import os
+import sys
+import json
+import pickle
+import time
+import random
+import tempfile
+import tracemalloc
+from datetime import date, timedelta
+
+# Settings are read at import, so point the app at the scratch database first
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+import numpy as np
+from sqlalchemy import insert, select
+from sqlalchemy.orm import selectinload
+from app.database import SessionLocal, upgrade_schema
+from app.models.user import User
+from app.models.transaction import Transaction
+from app.models.category import TransactionCategory
+from app.categories import parse_categories
+from app.frame import load_frame
+from app.fraud import registry, feature_matrix, frame_feature_matrix, PLACEHOLDER_TRANS_NUM
+
+CATEGORIES = [["Food and Drink", "Restaurants"], ["Travel", "Taxi"], ["Shops"], ["Entertainment"]]
+MERCHANTS = ["McDonald's", "Starbucks", "Uber", "Target", "AMC Theatres", None]
+
+
+def fill(count):
+    db = SessionLocal()
+    user = User(username="bench_user", password="bench")
+    db.add(user)
+    db.commit()
+    user_id = user.id
+    rng = random.Random(7)
+    today = date.today()
+    rows = [{
+        "user_id": user_id, "transaction_id": f"bench-{i}", "account_id": "acc", "name": "Bench",
+        "merchant_name": rng.choice(MERCHANTS), "amount": round(rng.uniform(2, 150), 2),
+        "date": today - timedelta(days=i * 1500 // count), "category": json.dumps(rng.choice(CATEGORIES)),
+        "payment_channel": "online",
+    } for i in range(count)]
+    db.execute(insert(Transaction), rows)
+    ids = dict(db.execute(select(Transaction.transaction_id, Transaction.id)).all())
+    db.execute(insert(TransactionCategory), [
+        {"transaction_id": ids[row["transaction_id"]], "category": name, "depth": depth}
+        for row in rows for depth, name in enumerate(parse_categories(row["category"]))
+    ])
+    db.commit()
+    db.close()
+    return user_id
+
+
+def fixture_encoder():
+    # Same shape as encoder.pkl: a fitted LabelEncoder per categorical column
+    from sklearn.preprocessing import LabelEncoder
+
+    labels = {
+        "merchant": [m for m in MERCHANTS if m][:3],
+        "category": [c[0] for c in CATEGORIES[:2]],
+        "trans_num": [PLACEHOLDER_TRANS_NUM],
+    }
+    path = os.path.join(tempfile.mkdtemp(), "encoder.pkl")
+    with open(path, "wb") as file:
+        pickle.dump({col: LabelEncoder().fit(values) for col, values in labels.items()}, file)
+    return path
+
+
+def orm_features(user_id):
+    db = SessionLocal()
+    transactions = db.query(Transaction).options(selectinload(Transaction.categories)).filter(
+        Transaction.user_id == user_id
+    ).order_by(Transaction.date, Transaction.id).all()
+    matrix = feature_matrix(transactions)
+    db.close()
+    return matrix
+
+
+def frame_features(user_id):
+    db = SessionLocal()
+    matrix = frame_feature_matrix(load_frame(db, user_id))
+    db.close()
+    return matrix
+
+
+def measure(fn, user_id):
+    start = time.perf_counter()
+    result = fn(user_id)
+    elapsed = (time.perf_counter() - start) * 1000
+    tracemalloc.start()
+    fn(user_id)
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main(count: int = 100000):
+    upgrade_schema()
+    user_id = fill(count)
+    if not os.path.isfile(registry.encoder_path):
+        print(f"{registry.encoder_path} not found, using a fixture encoder")
+        registry.encoder_path = fixture_encoder()
+    registry.lookups  # load the encoder outside the timings
+    print(f"{count} transactions")
+    orm, orm_ms, orm_peak = measure(orm_features, user_id)
+    frame, frame_ms, frame_peak = measure(frame_features, user_id)
+    print(f"{'ORM objects':>16}: {orm_ms:8.0f} ms   peak {orm_peak:7.1f} MiB")
+    print(f"{'TransactionFrame':>16}: {frame_ms:8.0f} ms   peak {frame_peak:7.1f} MiB")
+    same = np.array_equal(orm, frame, equal_nan=True)
+    print(f"same feature matrix: {same}")
+    if not same:
+        sys.exit("FAILED: ORM and TransactionFrame feature matrices differ")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
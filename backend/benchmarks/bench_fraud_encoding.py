@@ -0,0 +1,74 @@
+"""Compare the old pandas + LabelEncoder.transform feature path with the lookup tables.
+
+Run from backend/:  python -m benchmarks.bench_fraud_encoding [batch_size]
+Only labels known to the encoder are used, since the old path raises on unseen ones.
+Needs the trained model files (FRAUD_MODEL_PATH, FRAUD_ENCODER_PATH); exits with a
+message naming the missing ones otherwise.
+"""
+import sys
+import time
+import datetime
+from types import SimpleNamespace
+import pandas as pd
+
+from app.fraud import registry, feature_matrix, FEATURES, CATEGORICAL, PLACEHOLDER_TRANS_NUM, PLACEHOLDER_HOUR
+
+
+def labelencoder_frame(transactions):
+    # The per-call path /alert used before the lookup tables
+    encoder = registry.encoder
+    frame = pd.DataFrame({
+        'merchant': [tx.merchant_name for tx in transactions],
+        'category': [tx.categories[0].category for tx in transactions],
+        'amt': [tx.amount for tx in transactions],
+        'trans_num': PLACEHOLDER_TRANS_NUM,
+        'hour': PLACEHOLDER_HOUR,
+        'day_of_week': [tx.date.weekday() for tx in transactions],
+        'day_of_month': [tx.date.day for tx in transactions],
+        'month': [tx.date.month for tx in transactions],
+    }, columns=FEATURES)
+    for col in CATEGORICAL:
+        frame[col] = encoder[col].transform(frame[col])
+    return frame
+
+
+def sample_transactions(count):
+    encoder = registry.encoder
+    merchants = encoder['merchant'].classes_.tolist()
+    categories = encoder['category'].classes_.tolist()
+    today = datetime.date.today()
+    return [
+        SimpleNamespace(
+            merchant_name=merchants[i % len(merchants)],
+            categories=[SimpleNamespace(category=categories[i % len(categories)])],
+            category=None,
+            amount=float(i % 500),
+            date=today - datetime.timedelta(days=i % 365),
+        )
+        for i in range(count)
+    ]
+
+
+def timed(fn, transactions, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(transactions)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main(batch_size: int = 10000):
+    missing = registry.missing_files()
+    if missing:
+        sys.exit(f"Fraud model files not found: {', '.join(missing)}. "
+                 "Point FRAUD_MODEL_PATH and FRAUD_ENCODER_PATH at the trained model to run this benchmark.")
+    single = sample_transactions(1)
+    batch = sample_transactions(batch_size)
+
+    for label, transactions, repeat in [("single row", single, 2000), (f"{batch_size} rows", batch, 20)]:
+        old = timed(labelencoder_frame, transactions, repeat)
+        new = timed(feature_matrix, transactions, repeat)
+        print(f"{label:>12}: LabelEncoder {old:10.1f} us   lookup tables {new:10.1f} us   ({old / new:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
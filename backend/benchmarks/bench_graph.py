@@ -0,0 +1,82 @@
+"""Multi-year /graph requests: daily series vs weekly/monthly buckets vs a point budget.
+
+Run from backend/:  python -m benchmarks.bench_graph [transactions]
+Fills one user with four years of transactions and their daily rollup, then reports the
+latency and JSON payload size of a whole-history cumulative chart at each setting.
+Uses a throwaway SQLite database, plaid_app.db is not touched.
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import tempfile
+from datetime import date, timedelta
+
+# Settings are read at import, so point the app at the scratch database first
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+import httpx
+from sqlalchemy import insert, literal, select
+from app.main import app
+from app.database import SessionLocal
+from app.models.user import User
+from app.models.transaction import Transaction
+from app.models.category import TransactionCategory
+from app.rollup import rebuild_rollup
+
+USERNAME = "bench_user"
+DAYS = 4 * 365
+SETTINGS = [
+    {"bucket": "day"},
+    {"bucket": "day", "points": 200},
+    {"bucket": "week"},
+    {"bucket": "month"},
+]
+
+
+def fill(count):
+    db = SessionLocal()
+    user = db.query(User).filter(User.username == USERNAME).one()
+    rng = random.Random(7)
+    today = date.today()
+    rows = [{
+        "user_id": user.id, "transaction_id": f"bench-{i}", "account_id": "acc", "name": "Bench",
+        "amount": round(rng.uniform(2, 150), 2), "date": today - timedelta(days=rng.randrange(DAYS)),
+        "category": '["Food and Drink"]', "payment_channel": "online",
+    } for i in range(count)]
+    db.execute(insert(Transaction), rows)
+    db.execute(insert(TransactionCategory).from_select(
+        ["transaction_id", "category", "depth"],
+        select(Transaction.id, literal("Food and Drink"), literal(0)).where(Transaction.user_id == user.id),
+    ))
+    rebuild_rollup(db, user.id)
+    db.commit()
+    db.close()
+
+
+async def run(count, repeats=20):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.post("/login", json={"username": USERNAME, "password": "bench"})
+        fill(count)
+        start_date = (date.today() - timedelta(days=DAYS)).isoformat()
+        print(f"{count} transactions over {DAYS} days")
+        for setting in SETTINGS:
+            params = {"username": USERNAME, "start_date": start_date, "category": "Food and Drink", **setting}
+            await client.get("/graph", params=params)
+            start = time.perf_counter()
+            for _ in range(repeats):
+                response = await client.get("/graph", params=params)
+            elapsed = (time.perf_counter() - start) * 1000 / repeats
+            points = len(response.json()["cumulative_spending"])
+            label = ", ".join(f"{key}={value}" for key, value in setting.items())
+            print(f"{label:>22}: {elapsed:6.1f} ms   {points:5d} points   {len(response.content) / 1024:6.1f} KiB")
+
+
+def main(count: int = 50000):
+    asyncio.run(run(count))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -0,0 +1,86 @@
+"""Retry storm on /add_transaction: without Idempotency-Key vs with it.
+
+Run from backend/:  python -m benchmarks.bench_idempotency [writes] [retries]
+Sends every write `retries` extra times, as a client on a flaky connection would, and
+reports the rows inserted and the mean latency of first attempts and retries. With keys,
+retries are replayed from the in-process LRU; in the last run it is cleared after every
+first attempt, so each write's first retry is read back from the table. Exits non-zero
+if a keyed run inserts more than one row per write or a retry is not a byte-for-byte replay.
+Uses a throwaway SQLite database, plaid_app.db is not touched.
+"""
+import os
+import sys
+import time
+import asyncio
+import tempfile
+
+# Settings are read at import, so point the app at the scratch database first
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+import httpx
+from sqlalchemy import func, select
+from app.main import app
+from app.database import SessionLocal
+from app.models.transaction import Transaction
+from app.idempotency import stored_responses
+
+USERNAME = "bench_user"
+
+
+def row_count():
+    db = SessionLocal()
+    count = db.scalar(select(func.count()).select_from(Transaction))
+    db.close()
+    return count
+
+
+async def storm(client, label, writes, retries, keyed, clear_between=False):
+    """Returns the checks a keyed run failed; empty when every retry was a faithful replay."""
+    before = row_count()
+    first = retry = 0.0
+    mismatched = 0
+    for i in range(writes):
+        body = {"username": USERNAME, "name": f"Bench {i}", "amount": 12.5, "date": "2026-01-15",
+                "category": ["Food and Drink"], "payment_channel": "online"}
+        headers = {"Idempotency-Key": f"{label}-{i}"} if keyed else {}
+        start = time.perf_counter()
+        original = await client.post("/add_transaction", json=body, headers=headers)
+        first += time.perf_counter() - start
+        if clear_between:
+            stored_responses.clear()
+        start = time.perf_counter()
+        for _ in range(retries):
+            response = await client.post("/add_transaction", json=body, headers=headers)
+            if keyed and (response.status_code != 200 or response.content != original.content
+                          or response.headers.get("idempotent-replayed") != "true"):
+                mismatched += 1
+        retry += time.perf_counter() - start
+    rows = row_count() - before
+    print(f"{label:>15}: {rows:5d} rows for {writes} writes   "
+          f"first {first * 1000 / writes:6.2f} ms   retry {retry * 1000 / (writes * retries):6.2f} ms")
+    if not keyed:
+        return []
+    failures = [f"{label}: {rows} rows for {writes} writes"] if rows != writes else []
+    if mismatched:
+        failures.append(f"{label}: {mismatched} retries were not replays of the first response")
+    return failures
+
+
+async def run(writes, retries):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.post("/login", json={"username": USERNAME, "password": "bench"})
+        print(f"{writes} writes, each retried {retries} times")
+        await storm(client, "no key", writes, retries, keyed=False)
+        return (await storm(client, "key (memory)", writes, retries, keyed=True)
+                + await storm(client, "key (table)", writes, retries, keyed=True, clear_between=True))
+
+
+def main(writes: int = 200, retries: int = 3):
+    failures = asyncio.run(run(writes, retries))
+    if failures:
+        sys.exit("FAILED: " + "; ".join(failures))
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,96 @@
+"""Backfill throughput: per-row ORM inserts vs chunked bulk upserts.
+
+Run from backend/:  python -m benchmarks.bench_ingest [transactions]
+The ORM path is what plaidtest.py used to do (one db.add per transaction, one commit).
+The bulk path is app.ingest.ingest_pages at a few chunk sizes, followed by a second pass
+over the same pages where every row hits ON CONFLICT. Peak Python memory is measured in
+a separate pass so tracing doesn't skew the timings.
+Uses throwaway SQLite databases, plaid_app.db is not touched.
+"""
+import sys
+import os
+import time
+import tempfile
+import tracemalloc
+from datetime import date, timedelta
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_app_engine
+from app.models.user import User
+from app.models.transaction import Transaction
+from app.categories import parse_categories, category_rows
+from app.ingest import transaction_fields, ingest_pages
+from app.fake_plaid import FakeItem
+
+PAGE_SIZE = 500
+
+
+def plaid_pages(count):
+    """/transactions/sync-shaped pages of `count` added transactions, generated lazily."""
+    item = FakeItem(seed=42)
+    today = date.today()
+    for start in range(0, count, PAGE_SIZE):
+        added = [item.new_transaction(today - timedelta(days=i % 365)) for i in range(start, min(start + PAGE_SIZE, count))]
+        yield {"added": added, "modified": [], "removed": []}
+
+
+def fresh_session():
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_app_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    user = User(username="bench_user", password="bench")
+    db.add(user)
+    db.commit()
+    return db, user.id
+
+
+def orm_ingest(db, user_id, pages):
+    for page in pages:
+        for tx in page["added"]:
+            db.add(Transaction(**transaction_fields(tx, user_id), categories=category_rows(parse_categories(tx["category"]))))
+    db.commit()
+
+
+def bulk_ingest(db, user_id, pages, chunk_size):
+    ingest_pages(db, user_id, pages, chunk_size)
+    db.commit()
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def peak_memory(fn, *args):
+    tracemalloc.start()
+    fn(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 2**20
+
+
+def main(count: int = 20000):
+    print(f"{count} transactions in pages of {PAGE_SIZE}")
+
+    db, user_id = fresh_session()
+    elapsed = timed(orm_ingest, db, user_id, plaid_pages(count))
+    print(f"{'ORM per row':>22}: {count / elapsed:9.0f} rows/s  ({elapsed:.2f}s)")
+
+    for chunk_size in (100, 1000, 5000):
+        db, user_id = fresh_session()
+        elapsed = timed(bulk_ingest, db, user_id, plaid_pages(count), chunk_size)
+        again = timed(bulk_ingest, db, user_id, plaid_pages(count), chunk_size)
+        print(f"{f'bulk, chunk {chunk_size}':>22}: {count / elapsed:9.0f} rows/s  ({elapsed:.2f}s)"
+              f"   re-delivered: {count / again:9.0f} rows/s")
+
+    db, user_id = fresh_session()
+    orm_peak = peak_memory(orm_ingest, db, user_id, plaid_pages(count))
+    db, user_id = fresh_session()
+    bulk_peak = peak_memory(bulk_ingest, db, user_id, plaid_pages(count), 1000)
+    print(f"peak Python memory: ORM {orm_peak:.1f} MiB, bulk (chunk 1000) {bulk_peak:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,131 @@
+"""Concurrent transfers: read-modify-write on the user row vs the atomic ledger.
+
+Run from backend/:  python -m benchmarks.bench_ledger [threads] [transfers_per_thread]
+Starts a user with 1000 in checkings and has every thread move 1 to savings at a time,
+more times in total than the balance allows. The first run reads the user, adjusts
+the balances in Python and commits, the way /transfer_to_savings used to. The second
+goes through app.ledger.transfer. Checks that exactly 1000 transfers succeed, that no
+money is created or lost, and that the ledger rebuilds the same balances; exits non-zero
+if the ledger run breaks any of these.
+Uses a throwaway SQLite database, plaid_app.db is not touched.
+"""
+import os
+import sys
+import time
+import tempfile
+import threading
+
+# Settings are read at import, so point the app at the scratch database first
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+from sqlalchemy import func, select
+from app.database import SessionLocal, upgrade_schema
+from app.models import ledger  # noqa: F401  (registers the ledger tables)
+from app.models.user import User
+from app.models.ledger import BalanceEntry
+from app.ledger import CHECKINGS, SAVINGS, InsufficientFunds, ledger_balance, set_balance, transfer
+
+OPENING_BALANCE = 1000
+
+
+def read_modify_write(user_id):
+    db = SessionLocal()
+    try:
+        user = db.get(User, user_id)
+        if user.checkings < 1:
+            return False
+        user.checkings -= 1
+        user.savings = (user.savings or 0) + 1
+        db.commit()
+        return True
+    finally:
+        db.close()
+
+
+def ledger_transfer(user_id):
+    db = SessionLocal()
+    try:
+        transfer(db, user_id, CHECKINGS, SAVINGS, 1)
+        db.commit()
+        return True
+    except InsufficientFunds:
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+
+def hammer(label, fn, threads, per_thread):
+    db = SessionLocal()
+    user = User(username=f"bench_{label}", password="bench")
+    db.add(user)
+    db.commit()
+    user_id = user.id
+    set_balance(db, user_id, CHECKINGS, OPENING_BALANCE)
+    set_balance(db, user_id, SAVINGS, 0)
+    db.commit()
+    db.close()
+
+    succeeded = []
+    errors = []
+
+    def worker():
+        count = 0
+        for _ in range(per_thread):
+            try:
+                count += fn(user_id)
+            except Exception as e:
+                errors.append(e)
+        succeeded.append(count)
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    db = SessionLocal()
+    user = db.get(User, user_id)
+    done = sum(succeeded)
+    expected = min(threads * per_thread, OPENING_BALANCE)
+    balances = (user.checkings, user.savings)
+    exact = done == expected and balances == (OPENING_BALANCE - expected, expected)
+    print(f"{label:>18}: {done:5d} succeeded   checkings {user.checkings:7.1f}   savings {user.savings:7.1f}   "
+          f"{threads * per_thread / elapsed:6.0f} attempts/s   {len(errors)} errors   exact: {exact}")
+    result = {"succeeded": done, "expected": expected, "balances": balances, "errors": errors}
+    if label == "ledger":
+        result["entries"] = db.scalar(
+            select(func.count()).select_from(BalanceEntry).where(BalanceEntry.user_id == user_id)
+        )
+        result["rebuilt"] = (ledger_balance(db, user_id, CHECKINGS), ledger_balance(db, user_id, SAVINGS))
+        print(f"{'':>18}  {result['entries']} ledger entries, balances rebuilt from the ledger: {result['rebuilt']}")
+    db.close()
+    return result
+
+
+def ledger_failures(result):
+    """The invariants the ledger run broke; empty when it was exact."""
+    expected = result["expected"]
+    checks = {
+        "no transfer raised": not result["errors"],
+        f"exactly {expected} transfers succeeded": result["succeeded"] == expected,
+        "no money created or lost": result["balances"] == (OPENING_BALANCE - expected, expected),
+        "the ledger rebuilds the stored balances": result["rebuilt"] == result["balances"],
+        "two entries per transfer, plus the two opening sets": result["entries"] == 2 * result["succeeded"] + 2,
+    }
+    return [check for check, held in checks.items() if not held]
+
+
+def main(threads: int = 16, per_thread: int = 100):
+    upgrade_schema()
+    print(f"{threads} threads x {per_thread} transfers of 1 from a balance of {OPENING_BALANCE}")
+    hammer("read-modify-write", read_modify_write, threads, per_thread)  # expected to lose updates
+    failures = ledger_failures(hammer("ledger", ledger_transfer, threads, per_thread))
+    if failures:
+        sys.exit("FAILED: " + "; ".join(failures))
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
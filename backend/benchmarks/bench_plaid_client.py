@@ -0,0 +1,171 @@
+"""Plaid call latency and reliability: bare requests.post vs the pooled, retrying client.
+
+Run from backend/:  python -m benchmarks.bench_plaid_client [items]
+Starts app.fake_plaid on a local port with FAKE_PLAID_LATENCY_MS of simulated network
+delay, then compares
+  - per-call connections (requests.post, as before) with one kept-alive pool,
+  - fetching every item one after another vs 8 at a time, from threads sharing the
+    pooled client (as sync_all does) and from the async client,
+  - call success rate against a 20% failure rate with and without retries.
+First checks, without a server, that only idempotent calls are retried once they may
+have reached Plaid; exits non-zero if not.
+"""
+import sys
+import os
+import time
+import socket
+import asyncio
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import httpx
+import requests
+
+from app.plaid_client import PlaidClient, AsyncPlaidClient, PlaidError
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+LATENCY_MS = 20
+CONCURRENCY = 8
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_fake_plaid(port: int = None, **env):
+    port = port or free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.fake_plaid:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=dict(os.environ, PYTHONPATH=str(BACKEND_DIR), FAKE_PLAID_HISTORY="50", **env),
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            requests.post(f"{base_url}/fake/advance", json={"access_token": "", "added": 0}, timeout=1)
+            return process, base_url
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    process.kill()
+    raise SystemExit("fake Plaid server did not start")
+
+
+def link_items(client, count):
+    # The exchange isn't retried by the client, so a failed link starts over with a new token
+    tokens = []
+    while len(tokens) < count:
+        try:
+            public_token = client.post("/sandbox/public_token/create", {})["public_token"]
+            tokens.append(client.post("/item/public_token/exchange", {"public_token": public_token})["access_token"])
+        except PlaidError:
+            pass
+    return tokens
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def attempts(path, failure):
+    """How many times PlaidClient sends `path` when every attempt ends in `failure`."""
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        if isinstance(failure, Exception):
+            raise failure
+        return httpx.Response(failure, json={})
+
+    client = PlaidClient(base_url="http://plaid.test", max_retries=2, transport=httpx.MockTransport(handler))
+    try:
+        client.post(path, {})
+    except (PlaidError, httpx.HTTPError):
+        pass
+    return len(calls)
+
+
+def check_retry_policy():
+    expected = [
+        # (path, failure, attempts with max_retries=2)
+        ("/transactions/sync", 500, 3),
+        ("/transactions/sync", httpx.ReadTimeout("timed out"), 3),
+        ("/item/public_token/exchange", 500, 1),
+        ("/item/public_token/exchange", httpx.ReadTimeout("timed out"), 1),
+        ("/item/public_token/exchange", httpx.ConnectError("refused"), 3),
+        ("/item/public_token/exchange", 429, 3),
+    ]
+    failed = False
+    for path, failure, want in expected:
+        got = attempts(path, failure)
+        label = type(failure).__name__ if isinstance(failure, Exception) else failure
+        print(f"{path:>30} {label!s:>12}: {got} attempts" + ("" if got == want else f"  (expected {want})"))
+        failed = failed or got != want
+    if failed:
+        sys.exit("FAILED: retry policy")
+
+
+def main(items: int = 40):
+    check_retry_policy()
+    process, base_url = start_fake_plaid(FAKE_PLAID_LATENCY_MS=str(LATENCY_MS))
+    try:
+        client = PlaidClient(base_url=base_url)
+        tokens = link_items(client, items)
+        payloads = [{"access_token": token, "count": 500} for token in tokens]
+        print(f"{items} items, {LATENCY_MS} ms simulated latency per call")
+
+        def bare():
+            for payload in payloads:
+                requests.post(f"{base_url}/transactions/sync", json=payload, timeout=30).json()
+
+        def pooled():
+            for payload in payloads:
+                client.post("/transactions/sync", payload)
+
+        def threaded():
+            with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+                list(pool.map(lambda payload: client.post("/transactions/sync", payload), payloads))
+
+        async def fan_out():
+            async_client = AsyncPlaidClient(base_url=base_url)
+            semaphore = asyncio.Semaphore(CONCURRENCY)
+
+            async def one(payload):
+                async with semaphore:
+                    return await async_client.post("/transactions/sync", payload)
+
+            await asyncio.gather(*(one(payload) for payload in payloads))
+            await async_client.close()
+
+        print(f"{'requests.post, sequential':>30}: {timed(bare):8.0f} ms")
+        print(f"{'pooled client, sequential':>30}: {timed(pooled):8.0f} ms")
+        print(f"{f'pooled client, {CONCURRENCY} threads':>30}: {timed(threaded):8.0f} ms")
+        print(f"{f'async client, {CONCURRENCY} in flight':>30}: {timed(lambda: asyncio.run(fan_out())):8.0f} ms")
+        client.close()
+    finally:
+        process.terminate()
+        process.wait()
+
+    process, base_url = start_fake_plaid(FAKE_PLAID_FAILURE_RATE="0.2")
+    try:
+        tokens = link_items(PlaidClient(base_url=base_url, max_retries=10), 1)
+        for retries in (0, PlaidClient(base_url=base_url).max_retries):
+            client = PlaidClient(base_url=base_url, max_retries=retries)
+            succeeded = 0
+            for _ in range(200):
+                try:
+                    client.post("/transactions/sync", {"access_token": tokens[0]})
+                    succeeded += 1
+                except PlaidError:
+                    pass
+            print(f"{f'20% failures, {retries} retries':>30}: {succeeded / 2:.1f}% of calls succeed")
+            client.close()
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 40)
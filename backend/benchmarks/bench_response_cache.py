@@ -0,0 +1,99 @@
+"""Dashboard refreshes with nothing new written: uncached vs response cache vs 304.
+
+Run from backend/:  python -m benchmarks.bench_response_cache [refreshes]
+One refresh is a GET of every dashboard read route. Reports the time per refresh with
+the response cache disabled, served from the cache, and answered 304 Not Modified from
+the ETags of the previous refresh, plus the bytes sent each way.
+Uses a throwaway SQLite database, plaid_app.db is not touched.
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import tempfile
+from datetime import date, timedelta
+
+# Settings are read at import, so point the app at the scratch database first
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+import httpx
+from sqlalchemy import insert, literal, select
+from app.main import app
+from app.database import SessionLocal
+from app.models.user import User
+from app.models.transaction import Transaction
+from app.models.category import TransactionCategory
+from app.rollup import rebuild_rollup
+from app.response_cache import response_cache
+
+USERNAME = "bench_user"
+ROUTES = [
+    "/bank_balance", "/savings_balance", "/get_goal", "/transactions", "/graph_data",
+    "/graph_data_food", "/graph_data_travel", "/graph_data_entertainment",
+    "/get_food_spending", "/get_entertainment_spending", "/get_travel_spending",
+    "/get_food_spending_goal", "/get_entertainment_spending_goal", "/get_travel_spending_goal",
+    "/get_food_predicted", "/get_entertainment_predicted", "/get_travel_predicted",
+]
+
+
+def fill(count):
+    db = SessionLocal()
+    user = db.query(User).filter(User.username == USERNAME).one()
+    rng = random.Random(7)
+    today = date.today()
+    rows = [{
+        "user_id": user.id, "transaction_id": f"bench-{i}", "account_id": "acc", "name": "Bench",
+        "amount": round(rng.uniform(2, 150), 2), "date": today - timedelta(days=rng.randrange(today.day)),
+        "category": '["Food and Drink"]', "payment_channel": "online",
+    } for i in range(count)]
+    db.execute(insert(Transaction), rows)
+    db.execute(insert(TransactionCategory).from_select(
+        ["transaction_id", "category", "depth"],
+        select(Transaction.id, literal("Food and Drink"), literal(0)).where(Transaction.user_id == user.id),
+    ))
+    rebuild_rollup(db, user.id)
+    db.commit()
+    db.close()
+
+
+async def refresh(client, etags=None):
+    """GET every route; returns ({route: etag}, response bytes)."""
+    responses = [
+        await client.get(route, params={"username": USERNAME},
+                         headers={"If-None-Match": etags[route]} if etags else None)
+        for route in ROUTES
+    ]
+    return {route: r.headers.get("etag") for route, r in zip(ROUTES, responses)}, sum(len(r.content) for r in responses)
+
+
+async def timed(label, client, refreshes, etags=None):
+    start = time.perf_counter()
+    for _ in range(refreshes):
+        tags, sent = await refresh(client, etags)
+    elapsed = (time.perf_counter() - start) * 1000 / refreshes
+    print(f"{label:>16}: {elapsed:7.1f} ms per refresh   {sent / 1024:6.1f} KiB")
+    return tags
+
+
+async def run(refreshes, transactions):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.post("/login", json={"username": USERNAME, "password": "bench"})
+        fill(transactions)
+        print(f"{len(ROUTES)} routes per refresh, {transactions} transactions this month")
+
+        max_entries, response_cache.max_entries = response_cache.max_entries, 0
+        await timed("uncached", client, refreshes)
+        response_cache.max_entries = max_entries
+        await refresh(client)
+        etags = await timed("response cache", client, refreshes)
+        await timed("304 Not Modified", client, refreshes, etags)
+
+
+def main(refreshes: int = 50, transactions: int = 5000):
+    asyncio.run(run(refreshes, transactions))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
@@ -0,0 +1,123 @@
+"""Monthly spend per category over a long history: SQL on the live database vs columnar snapshots.
+
+Run from backend/:  python -m benchmarks.bench_snapshot [transactions]
+Fills one user with a few years of transactions, writes the snapshot as Parquet (if
+pyarrow is installed) and as .npy, then compares the time for monthly totals of one
+category through ORM objects, through a GROUP BY, and through read_snapshot + NumPy.
+The totals are checked against each other. Uses a throwaway SQLite database and
+snapshot directory, plaid_app.db is not touched.
+"""
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+from pathlib import Path
+from datetime import date, timedelta
+
+# Settings are read at import, so point the app at the scratch database first
+SCRATCH = Path(tempfile.mkdtemp())
+os.environ["DATABASE_URL"] = f"sqlite:///{SCRATCH / 'bench.db'}"
+
+import numpy as np
+from sqlalchemy import func, insert, select
+from app.database import SessionLocal, engine, upgrade_schema
+from app.models.user import User
+from app.models.transaction import Transaction
+from app.models.category import TransactionCategory
+from app.categories import FOOD, parse_categories
+from app.snapshot import parquet_available, write_snapshot, read_snapshot
+
+CATEGORIES = [["Food and Drink", "Restaurants"], ["Travel", "Taxi"], ["Shops"], ["Entertainment"]]
+MERCHANTS = ["McDonald's", "Starbucks", "Uber", "Target", "AMC Theatres", None]
+
+
+def fill(count):
+    db = SessionLocal()
+    user = User(username="bench_user", password="bench")
+    db.add(user)
+    db.commit()
+    user_id = user.id
+    rng = random.Random(7)
+    today = date.today()
+    rows = []
+    for i in range(count):
+        category = rng.choice(CATEGORIES)
+        rows.append({
+            "user_id": user_id, "transaction_id": f"bench-{i}", "account_id": "acc", "name": "Bench",
+            "merchant_name": rng.choice(MERCHANTS), "amount": round(rng.uniform(2, 150), 2),
+            "date": today - timedelta(days=i * 1500 // count), "category": json.dumps(category),
+            "payment_channel": "online",
+        })
+    db.execute(insert(Transaction), rows)
+    ids = db.execute(select(Transaction.transaction_id, Transaction.id)).all()
+    by_key = dict(ids)
+    db.execute(insert(TransactionCategory), [
+        {"transaction_id": by_key[row["transaction_id"]], "category": name, "depth": depth}
+        for row in rows for depth, name in enumerate(parse_categories(row["category"]))
+    ])
+    db.commit()
+    db.close()
+    return user_id
+
+
+def orm_monthly(user_id):
+    db = SessionLocal()
+    totals = {}
+    for tx in db.query(Transaction).filter(Transaction.user_id == user_id):
+        if FOOD in parse_categories(tx.category):
+            month = tx.date.strftime("%Y-%m")
+            totals[month] = totals.get(month, 0) + tx.amount
+    db.close()
+    return totals
+
+
+def sql_monthly(user_id):
+    db = SessionLocal()
+    month = func.strftime("%Y-%m", Transaction.date)
+    rows = db.execute(select(month, func.sum(Transaction.amount)).join(
+        TransactionCategory, TransactionCategory.transaction_id == Transaction.id
+    ).where(Transaction.user_id == user_id, TransactionCategory.category == FOOD).group_by(month)).all()
+    db.close()
+    return dict(rows)
+
+
+def snapshot_monthly(user_id, snapshot_dir):
+    months, totals = read_snapshot(user_id, snapshot_dir=snapshot_dir).totals_by("M", FOOD)
+    return dict(zip(months.astype(str), totals))
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return (time.perf_counter() - start) * 1000, result
+
+
+def main(count: int = 200000):
+    upgrade_schema()
+    user_id = fill(count)
+    print(f"{count} transactions over {1500 // 30} months")
+
+    reference = None
+    for label, fn, args in [("ORM objects", orm_monthly, (user_id,)), ("SQL GROUP BY", sql_monthly, (user_id,))]:
+        ms, totals = timed(fn, *args)
+        reference = reference or totals
+        print(f"{label:>22}: {ms:8.1f} ms")
+
+    for file_format in (["parquet"] if parquet_available() else []) + ["npy"]:
+        snapshot_dir = SCRATCH / file_format
+        db = SessionLocal()
+        stats = write_snapshot(db, user_id, snapshot_dir, file_format)
+        db.close()
+        size = sum(path.stat().st_size for path in snapshot_dir.rglob("part-0.*")) / 2**20
+        snapshot_monthly(user_id, snapshot_dir)  # warm the file cache
+        ms, totals = timed(snapshot_monthly, user_id, snapshot_dir)
+        matches = totals.keys() == reference.keys() and all(np.isclose(totals[k], reference[k]) for k in reference)
+        print(f"{f'{file_format} snapshot':>22}: {ms:8.1f} ms   (written in {stats['seconds']:.2f}s, "
+              f"{stats['partitions']} partitions, {size:.1f} MiB, totals match: {matches})")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
@@ -0,0 +1,93 @@
+"""Import-time budget and cold-start benchmark for app.main.
+
+Run from backend/:  python -m benchmarks.bench_startup
+Exits non-zero if importing app.main takes more than IMPORT_BUDGET_RATIO times as long
+as importing the framework stack it is built on (FastAPI, SQLAlchemy, httpx, ...), or
+pulls in one of the heavy ML modules that should only load on first use. The ratio
+holds on fast and slow machines alike, which a fixed number of milliseconds doesn't.
+The PREWARM_MODELS=1 start is skipped when the fraud model files are missing.
+"""
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+IMPORT_BUDGET_RATIO = float(os.getenv("IMPORT_BUDGET_RATIO", "1.6"))
+LAZY_MODULES = ["pandas", "xgboost", "sklearn"]
+# What app.main can't avoid importing; the budget is relative to this
+FRAMEWORK_IMPORTS = ("fastapi, fastapi.middleware.cors, sqlalchemy.orm, sqlalchemy.ext.asyncio, "
+                     "httpx, pydantic, dotenv, dateutil.relativedelta")
+RUNS = 3  # each import is timed in this many fresh interpreters; the median counts
+
+STARTUP_SCRIPT = """
+import time
+start = time.perf_counter()
+import app.main
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as client:
+    ready = time.perf_counter()
+    client.get("/model_status")
+print(f"{(ready - start) * 1000:.0f}")
+"""
+
+
+def run_python(args, env_overrides=None):
+    # Fresh interpreter in a scratch directory so plaid_app.db is not touched
+    env = dict(os.environ, PYTHONPATH=str(BACKEND_DIR), **(env_overrides or {}))
+    return subprocess.run(
+        [sys.executable, *args], cwd=tempfile.mkdtemp(), env=env,
+        capture_output=True, text=True, check=True,
+    )
+
+
+def import_times(statement):
+    """{module: cumulative ms} for one run of `statement`, plus the run's total under "*"."""
+    stderr = run_python(["-X", "importtime", "-c", statement]).stderr
+    cumulative = {"*": 0.0}
+    for line in stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)", line)
+        if match:
+            cumulative[match.group(4)] = int(match.group(2)) / 1000
+            if len(match.group(3)) == 1:  # top-level import
+                cumulative["*"] += int(match.group(2)) / 1000
+    return cumulative
+
+
+def median_run(statement):
+    runs = sorted((import_times(statement) for _ in range(RUNS)), key=lambda run: run["*"])
+    return runs[len(runs) // 2]
+
+
+def main():
+    framework = median_run(f"import {FRAMEWORK_IMPORTS}")["*"]
+    cumulative = median_run("import app.main")
+    total = cumulative["app.main"]
+    ratio = total / framework
+    print(f"import app.main: {total:.0f} ms, {ratio:.2f}x the {framework:.0f} ms framework import "
+          f"(budget {IMPORT_BUDGET_RATIO:.2f}x)")
+    for name, ms in sorted(cumulative.items(), key=lambda item: -item[1])[2:9]:
+        print(f"  {name:<40} {ms:8.1f} ms")
+
+    eager = [name for name in LAZY_MODULES if name in cumulative]
+    if eager:
+        print(f"eagerly imported: {', '.join(eager)}")
+
+    cold = run_python(["-c", STARTUP_SCRIPT]).stdout.strip()
+    print(f"cold start to first request: {cold} ms (lazy models)")
+    from app.fraud import registry
+    missing = registry.missing_files()
+    if missing:
+        print(f"PREWARM_MODELS=1 start skipped, model files not found: {', '.join(missing)}")
+    else:
+        warm = run_python(["-c", STARTUP_SCRIPT], {"PREWARM_MODELS": "1"}).stdout.strip().splitlines()[-1]
+        print(f"cold start to first request: {warm} ms (PREWARM_MODELS=1)")
+
+    if ratio > IMPORT_BUDGET_RATIO or eager:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
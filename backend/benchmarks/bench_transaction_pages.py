@@ -0,0 +1,125 @@
+"""/transactions over a long history: full ORM load vs keyset pages vs NDJSON streaming.
+
+Run from backend/:  python -m benchmarks.bench_transaction_pages [transactions]
+Fills one user with a few years of transactions, then times
+  - loading the whole range into ORM objects and a list, as /transactions used to,
+  - a page of 100 at the start and near the end of the history, by keyset cursor and by OFFSET,
+  - exporting everything as NDJSON, with peak Python memory for the list vs the stream.
+Uses a throwaway SQLite database, plaid_app.db is not touched.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import tempfile
+import tracemalloc
+from datetime import date, timedelta
+
+# Settings are read at import, so point the app at the scratch database first
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+from sqlalchemy import insert, select
+from app.database import AsyncSessionLocal, SessionLocal, async_engine, upgrade_schema
+from app.models.user import User
+from app.models.transaction import Transaction
+from app.transaction_pages import encode_cursor, transactions_query, transactions_page, transaction_row, stream_ndjson
+
+PAGE = 100
+START = date(2000, 1, 1)
+
+
+def fill(count):
+    db = SessionLocal()
+    user = User(username="bench_user", password="bench")
+    db.add(user)
+    db.commit()
+    user_id = user.id
+    today = date.today()
+    rows = [{
+        "user_id": user_id, "transaction_id": f"bench-{i}", "account_id": f"acc-{i % 3}", "name": "Bench",
+        "merchant_name": "Bench", "amount": 10.0, "date": today - timedelta(days=i * 1500 // count),
+        "category": '["Shops"]', "payment_channel": "online",
+    } for i in range(count)]
+    db.execute(insert(Transaction), rows)
+    db.commit()
+    db.close()
+    return user_id
+
+
+async def orm_load(user_id):
+    # What /transactions did: every matching row as an ORM object, then a list of dicts
+    async with AsyncSessionLocal() as db:
+        transactions = (await db.execute(
+            select(Transaction).where(Transaction.user_id == user_id, Transaction.date >= START)
+            .order_by(Transaction.date.desc())
+        )).scalars().all()
+        return [{"date": tx.date.strftime("%Y-%m-%d"), "amount": tx.amount, "category": tx.category,
+                 "merchant_name": tx.merchant_name} for tx in transactions]
+
+
+async def keyset_page(user_id, cursor):
+    async with AsyncSessionLocal() as db:
+        return await transactions_page(db, transactions_query(user_id, START, cursor=cursor), PAGE)
+
+
+async def offset_page(user_id, offset):
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(transactions_query(user_id, START).offset(offset).limit(PAGE))).all()
+        return [transaction_row(row) for row in rows]
+
+
+async def export_list(user_id):
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(transactions_query(user_id, START))).all()
+        return "".join(json.dumps(transaction_row(row)) + "\n" for row in rows)
+
+
+async def export_stream(user_id):
+    size = 0
+    async for chunk in stream_ndjson(transactions_query(user_id, START)):
+        size += len(chunk)  # a client would write the chunk out here
+    return size
+
+
+async def timed(coroutine):
+    start = time.perf_counter()
+    await coroutine
+    return (time.perf_counter() - start) * 1000
+
+
+async def peak_memory(coroutine):
+    tracemalloc.start()
+    await coroutine
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 2**20
+
+
+async def run(count):
+    user_id = fill(count)
+    async with AsyncSessionLocal() as db:
+        # Cursor of the row PAGE from the end, i.e. the last page
+        deep = (await db.execute(transactions_query(user_id, START).offset(count - PAGE - 1).limit(1))).one()
+    deep_cursor = encode_cursor(deep.date, deep.id)
+    await orm_load(user_id)  # warm the page cache
+
+    print(f"{count} transactions")
+    print(f"{'full ORM load (old)':>28}: {await timed(orm_load(user_id)):8.1f} ms")
+    print(f"{'first page, keyset':>28}: {await timed(keyset_page(user_id, None)):8.1f} ms")
+    print(f"{'last page, keyset':>28}: {await timed(keyset_page(user_id, deep_cursor)):8.1f} ms")
+    print(f"{'last page, OFFSET':>28}: {await timed(offset_page(user_id, count - PAGE)):8.1f} ms")
+    print(f"{'NDJSON export, list':>28}: {await timed(export_list(user_id)):8.1f} ms"
+          f"   peak {await peak_memory(export_list(user_id)):6.1f} MiB")
+    print(f"{'NDJSON export, streamed':>28}: {await timed(export_stream(user_id)):8.1f} ms"
+          f"   peak {await peak_memory(export_stream(user_id)):6.1f} MiB")
+    await async_engine.dispose()
+
+
+def main(count: int = 100000):
+    upgrade_schema()
+    asyncio.run(run(count))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
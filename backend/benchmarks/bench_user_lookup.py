@@ -0,0 +1,72 @@
+"""User lookups per request with and without the username -> id cache.
+
+Run from backend/:  python -m benchmarks.bench_user_lookup [requests]
+Sends the same mix of read and write requests with app.users' id cache disabled and
+enabled (the response cache is off for both) and reports SQL statements and time per
+request. Id-only routes (/transactions, /graph*, /forecast_status) need no user query
+at all once the id is cached.
+Uses a throwaway SQLite database, plaid_app.db is not touched.
+"""
+import os
+import sys
+import time
+import asyncio
+import tempfile
+
+# Settings are read at import, so point the app at the scratch database first
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+import httpx
+from sqlalchemy import event
+from app.main import app
+from app.database import engine, async_engine
+from app.response_cache import response_cache
+from app.users import user_ids
+
+USERNAME = "bench_user"
+REQUESTS = [
+    ("GET", "/transactions", {}), ("GET", "/graph", {}), ("GET", "/graph_data_food", {}),
+    ("GET", "/forecast_status", {}), ("GET", "/bank_balance", {}), ("GET", "/get_food_spending", {}),
+    ("POST", "/simulate_income", {"amt": 1}), ("POST", "/set_savings_balance", {"balance": 5}),
+]
+statements = 0
+
+
+def count_statement(*args):
+    global statements
+    statements += 1
+
+
+async def measure(label, client, repeats):
+    global statements
+    statements = 0
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for method, route, params in REQUESTS:
+            response = await client.request(method, route, params={"username": USERNAME, **params})
+            response.raise_for_status()
+    count = repeats * len(REQUESTS)
+    elapsed = (time.perf_counter() - start) * 1000 / count
+    print(f"{label:>16}: {statements / count:5.2f} statements   {elapsed:6.2f} ms per request")
+
+
+async def run(repeats):
+    event.listen(engine, "before_cursor_execute", count_statement)
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count_statement)
+    response_cache.max_entries = 0
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.post("/login", json={"username": USERNAME, "password": "bench"})
+        max_entries, user_ids.max_entries = user_ids.max_entries, 0
+        user_ids.clear()
+        await measure("no id cache", client, repeats)
+        user_ids.max_entries = max_entries
+        await measure("id cache", client, repeats)
+
+
+def main(repeats: int = 100):
+    asyncio.run(run(repeats))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100)
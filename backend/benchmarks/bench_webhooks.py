@@ -0,0 +1,113 @@
+"""Webhook-driven sync: how a burst of events collapses, and how soon new data lands.
+
+Run from backend/:  python -m benchmarks.bench_webhooks [events]
+Links a few items on a local app.fake_plaid, then feeds WebhookSyncQueue a burst of
+events spread over the items, a third of them redeliveries, and counts the syncs it
+actually runs. Then measures the time from one webhook to its rows being committed,
+which replaces plaidtest.py's loop of up to five 5-second polls.
+Uses a throwaway SQLite database, plaid_app.db is not touched.
+"""
+import os
+import sys
+import time
+import random
+import socket
+import tempfile
+
+# Settings are read at import, so point the app at the scratch database and server first
+with socket.socket() as sock:
+    sock.bind(("127.0.0.1", 0))
+    PORT = sock.getsockname()[1]
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+os.environ["PLAID_BASE_URL"] = f"http://127.0.0.1:{PORT}"
+
+from benchmarks.bench_plaid_client import start_fake_plaid, link_items
+from app.database import SessionLocal, upgrade_schema
+from app.models.user import User
+from app.models.transaction import Transaction
+from app.plaid_client import plaid_client
+from app.plaid_sync import sync_user
+from app.plaid_webhook import WebhookSyncQueue
+from app.recompute import recompute_worker
+
+ITEMS = 4
+
+
+def link_users(count):
+    db = SessionLocal()
+    users = []
+    for n, access_token in enumerate(link_items(plaid_client, count)):
+        item_id = plaid_client.post("/accounts/get", {"access_token": access_token})["item"]["item_id"]
+        user = User(username=f"bench_{n}", password="bench", access_token=access_token, plaid_item_id=item_id)
+        db.add(user)
+        db.commit()
+        sync_user(db, user)
+        users.append((user.id, access_token, item_id))
+    db.close()
+    return users
+
+
+def transaction_count():
+    db = SessionLocal()
+    try:
+        return db.query(Transaction).count()
+    finally:
+        db.close()
+
+
+def burst(users, events, debounce):
+    for _, access_token, _ in users:
+        plaid_client.post("/fake/advance", {"access_token": access_token, "added": 5, "modified": 2, "removed": 1})
+    queue = WebhookSyncQueue(debounce=debounce)
+    sent = []
+    start = time.perf_counter()
+    for _ in range(events):
+        if sent and random.random() < 1 / 3:
+            item_id, event_id = random.choice(sent)  # Plaid redelivering an event
+        else:
+            item_id, event_id = random.choice(users)[2], os.urandom(8).hex()
+            sent.append((item_id, event_id))
+        queue.enqueue(item_id, event_id)
+        time.sleep(0.5 / events)
+    queue.stop()
+    elapsed = time.perf_counter() - start
+    counts = queue.counts
+    print(f"{events} events over {len(users)} items, debounce {debounce * 1000:.0f} ms: "
+          f"{counts['synced']} syncs, {counts['coalesced']} coalesced, {counts['duplicate']} duplicates "
+          f"({elapsed * 1000:.0f} ms)")
+
+
+def latency(user, debounce):
+    _, access_token, item_id = user
+    plaid_client.post("/fake/advance", {"access_token": access_token, "added": 5, "modified": 0, "removed": 0})
+    before = transaction_count()
+    queue = WebhookSyncQueue(debounce=debounce)
+    start = time.perf_counter()
+    queue.enqueue(item_id, os.urandom(8).hex())
+    while transaction_count() == before:
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    queue.stop()
+    return elapsed * 1000
+
+
+def main(events: int = 200):
+    process, _ = start_fake_plaid(PORT)
+    try:
+        upgrade_schema()
+        users = link_users(ITEMS)
+        expected = transaction_count() + ITEMS * 4  # 5 added, 1 removed per item
+        burst(users, events, 0.2)
+        print(f"transactions: {transaction_count()} (expected {expected})")
+
+        for debounce in (0.0, 0.2):
+            runs = sorted(latency(users[0], debounce) for _ in range(10))
+            print(f"webhook to committed rows, debounce {debounce * 1000:.0f} ms: median {runs[5]:.0f} ms, max {runs[-1]:.0f} ms")
+    finally:
+        recompute_worker.stop()
+        process.terminate()
+        process.wait()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
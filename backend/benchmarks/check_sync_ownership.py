@@ -0,0 +1,103 @@
+"""Two users whose Plaid syncs share transaction_ids: neither may move or delete the other's rows.
+
+Run from backend/:  python -m benchmarks.check_sync_ownership
+User A owns T1 and T2. User B's sync then delivers T1 (modified) and removes T2, first
+through the small-delta path (plaid_sync.apply_changes), then through the bulk path
+(ingest.ingest_pages). A's rows, categories, rollups and regression sums must come out
+unchanged, B must get only its own new transaction, and A's own updates must still
+apply. Exits non-zero on any violation.
+Uses a throwaway SQLite database, plaid_app.db is not touched.
+"""
+import os
+import sys
+import tempfile
+from datetime import date
+
+# Settings are read at import, so point the app at the scratch database first
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+from sqlalchemy import select
+from app.database import SessionLocal, upgrade_schema
+from app.models import transaction, category, rollup, regression, metrics  # noqa: F401  (registers the tables)
+from app.models.user import User
+from app.models.transaction import Transaction
+from app.models.category import TransactionCategory
+from app.models.rollup import DailyCategorySpend
+from app.models.regression import CategoryRegressionState
+from app.plaid_sync import apply_changes
+from app.ingest import ingest_pages
+
+DAY = date.today().replace(day=1).isoformat()
+
+
+def plaid_tx(transaction_id, amount, category):
+    return {"transaction_id": transaction_id, "account_id": "acc", "name": "Bench", "amount": amount,
+            "date": DAY, "category": [category], "payment_channel": "online"}
+
+
+def owned_state(db, user_id):
+    """Everything of a user's that a foreign sync must not change."""
+    return {
+        "transactions": sorted(db.execute(select(
+            Transaction.transaction_id, Transaction.user_id, Transaction.amount, Transaction.category,
+        ).where(Transaction.user_id == user_id)).all()),
+        "categories": sorted(db.execute(select(Transaction.transaction_id, TransactionCategory.category).join(
+            TransactionCategory, TransactionCategory.transaction_id == Transaction.id,
+        ).where(Transaction.user_id == user_id)).all()),
+        "rollups": sorted(db.execute(select(
+            DailyCategorySpend.category, DailyCategorySpend.day, DailyCategorySpend.amount, DailyCategorySpend.txn_count,
+        ).where(DailyCategorySpend.user_id == user_id)).all()),
+        "regression": sorted(db.execute(select(
+            CategoryRegressionState.category, CategoryRegressionState.n, CategoryRegressionState.sum_y,
+        ).where(CategoryRegressionState.user_id == user_id)).all()),
+    }
+
+
+def foreign_sync(db, path, user_id, upserts, removed):
+    if path == "small delta":
+        apply_changes(db, user_id, upserts, removed)
+    else:
+        ingest_pages(db, user_id, [{"added": upserts, "modified": [], "removed": removed}])
+    db.commit()
+
+
+def check(path):
+    failures = []
+    db = SessionLocal()
+    a, b = User(username=f"a {path}", password="x"), User(username=f"b {path}", password="x")
+    db.add_all([a, b])
+    db.commit()
+    t1, t2, t3 = (f"{path}-{name}" for name in ("t1", "t2", "t3"))
+    apply_changes(db, a.id, [plaid_tx(t1, 10, "Travel"), plaid_tx(t2, 20, "Shops")], [])
+    db.commit()
+    before = owned_state(db, a.id)
+
+    foreign_sync(db, path, b.id, [plaid_tx(t1, 99, "Entertainment"), plaid_tx(t3, 5, "Travel")],
+                 [{"transaction_id": t2}])
+    db.expire_all()
+    if owned_state(db, a.id) != before:
+        failures.append(f"{path}: user B's sync changed user A's data")
+    b_ids = sorted(db.scalars(select(Transaction.transaction_id).where(Transaction.user_id == b.id)))
+    if b_ids != [t3]:
+        failures.append(f"{path}: user B ended up with {b_ids}, expected only {t3}")
+
+    # The owner's own changes still go through
+    foreign_sync(db, path, a.id, [plaid_tx(t1, 11, "Travel")], [{"transaction_id": t2}])
+    db.expire_all()
+    a_rows = dict(db.execute(select(Transaction.transaction_id, Transaction.amount).where(Transaction.user_id == a.id)).all())
+    if a_rows != {t1: 11}:
+        failures.append(f"{path}: user A's own update and removal gave {a_rows}")
+    db.close()
+    print(f"{path:>12}: {'ok' if not failures else 'FAILED'}")
+    return failures
+
+
+def main():
+    upgrade_schema()
+    failures = check("small delta") + check("bulk")
+    if failures:
+        sys.exit("FAILED: " + "; ".join(failures))
+
+
+if __name__ == "__main__":
+    main()
@@ -47,11 +47,11 @@ export default function HomeScreen() {
     try {
       // Fetch all data in parallel
       const [transactionsRes, allRes, foodRes, travelRes, entertainmentRes] = await Promise.all([
-        fetch(`${API_URL}/transactions`),
-        fetch(`${API_URL}/graph_data`),
-        fetch(`${API_URL}/graph_data_food`),
-        fetch(`${API_URL}/graph_data_travel`),
-        fetch(`${API_URL}/graph_data_entertainment`)
+        fetch(`${API_URL}/transactions?username=user_good`),
+        fetch(`${API_URL}/graph_data?username=user_good`),
+        fetch(`${API_URL}/graph_data_food?username=user_good`),
+        fetch(`${API_URL}/graph_data_travel?username=user_good`),
+        fetch(`${API_URL}/graph_data_entertainment?username=user_good`)
       ]);
 
       // Process all responses in parallel
@@ -89,7 +89,7 @@ export default function HomeScreen() {
 
   const checkAlertStatus = async () => {
     try {
-      const response = await fetch(`${API_URL}/alert_status`);
+      const response = await fetch(`${API_URL}/alert_status?username=user_good`);
       const data = await response.json();
       console.log('Alert Status Response:', data);
       
@@ -119,7 +119,7 @@ export default function HomeScreen() {
 
   const handleAlertResolve = async (action: "yes" | "report") => {
     try {
-      const response = await fetch(`${API_URL}/alert_resolve`, {
+      const response = await fetch(`${API_URL}/alert_resolve?username=user_good`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -168,10 +168,10 @@ export default function HomeScreen() {
       try {
         // Fetch spending graph data
         const [allRes, foodRes, travelRes, entertainmentRes] = await Promise.all([
-          fetch(`${API_URL}/graph_data`),
-          fetch(`${API_URL}/graph_data_food`),
-          fetch(`${API_URL}/graph_data_travel`),
-          fetch(`${API_URL}/graph_data_entertainment`)
+          fetch(`${API_URL}/graph_data?username=user_good`),
+          fetch(`${API_URL}/graph_data_food?username=user_good`),
+          fetch(`${API_URL}/graph_data_travel?username=user_good`),
+          fetch(`${API_URL}/graph_data_entertainment?username=user_good`)
         ]);
 
         const [allData, foodData, travelData, entertainmentData] = await Promise.all([